@@ -0,0 +1,99 @@
+"""
+Утренний дайджест (dtimebot.scheduling.digest) на большом числе пользователей: у каждого — личная
+директория с --tasks задачами, раскиданными по году, и общая директория на --group пользователей.
+Для каждого размера из --users измеряется полная рассылка run() (захват пачек, загрузка задач, сборка
+дайджестов; отправка — пустой notifier) в SQLite во временном каталоге: время на пользователя
+должно оставаться постоянным.
+
+Запуск из корня проекта (нужен каталог data/ для логов):
+    python -m benchmarks.digest [--users 1000 4000 16000] [--tasks 200] [--group 20] [--chunk 500]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+async def _run(users: int, tasks: int, group: int, chunk: int) -> None:
+	from sqlalchemy import insert
+
+	from dtimebot import configs, database, scheduling
+	from dtimebot.models.directories import Directory
+	from dtimebot.models.members import Member
+	from dtimebot.models.tasks import Task
+	from dtimebot.models.users import User
+	from dtimebot.scheduling import digest
+	from dtimebot.scheduling.triggers import IntervalTrigger
+
+	random.seed(1)
+	now = datetime.utcnow()
+	today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+	with tempfile.TemporaryDirectory() as tmp:
+		configs.main_config = {'database': {'url': f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.sqlite3")}'}}
+		# Время дайджеста (UTC) — текущий час, чтобы все пользователи попали в рассылку
+		scheduling.config = scheduling.SchedulingConfig(digest={'hour': now.hour, 'chunk_size': chunk})
+		await database.start()
+		try:
+			await database.update_models()
+			groups = (users + group - 1) // group
+			async with database.get_session() as session:
+				await session.execute(insert(User), [{'id': i, 'telegram_id': i} for i in range(1, users + 1)])
+				# Директории 1..users — личные, дальше — общие
+				await session.execute(insert(Directory), [
+					{'id': i, 'owner_id': i, 'name': f'dir {i}', 'description': '', 'is_self': True}
+					for i in range(1, users + 1)
+				] + [
+					{'id': users + g + 1, 'owner_id': g * group + 1, 'name': f'group {g}', 'description': '', 'is_self': False}
+					for g in range(groups)
+				])
+				await session.execute(insert(Member), [
+					{'directory_id': users + (i - 1) // group + 1, 'user_id': i, 'is_active': True}
+					for i in range(1, users + 1)
+				])
+				rows = []
+				for directory_id in range(1, users + groups + 1):
+					for _ in range(tasks):
+						time_start = today + timedelta(days=random.randrange(-300, 65), minutes=30 * random.randrange(48))
+						rows.append({
+							'owner_id': min(directory_id, users), 'directory_id': directory_id, 'title': 'task', 'time_start': time_start,
+							'time_end': time_start + timedelta(minutes=30 * random.randint(1, 4)),
+							'recurrence': IntervalTrigger(days=1) if random.random() < 0.005 else None,
+						})
+				for offset in range(0, len(rows), 50_000):
+					await session.execute(insert(Task), rows[offset:offset + 50_000])
+				await session.commit()
+
+			sent = 0
+			async def notifier(digests):
+				nonlocal sent
+				sent += len(digests)
+			digest.notifier = notifier
+
+			started = time.perf_counter()
+			processed = await digest.run()
+			elapsed = time.perf_counter() - started
+			print(
+				f'{users:6d} users, {len(rows):,} tasks: {processed} processed, {sent} digests in {elapsed * 1000:7.0f} ms '
+				f'({elapsed / max(processed, 1) * 1e6:6.0f} us/user)'
+			)
+		finally:
+			digest.notifier = None
+			await database.stop()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--users', type=int, nargs='+', default=[1000, 4000, 16000])
+	parser.add_argument('--tasks', type=int, default=200)
+	parser.add_argument('--group', type=int, default=20)
+	parser.add_argument('--chunk', type=int, default=500)
+	args = parser.parse_args()
+	for users in args.users:
+		asyncio.run(_run(users, args.tasks, args.group, args.chunk))
+
+
+if __name__ == '__main__':
+	main()
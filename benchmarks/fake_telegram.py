@@ -0,0 +1,138 @@
+"""
+Фейковый Telegram для локальной проверки режима webhook.
+
+Поднимает заглушку Bot API (отвечает на sendMessage, setWebhook и т.д.), ждёт, пока бот вызовет
+setWebhook, и от имени нескольких пользователей отправляет апдейты на адрес webhook с секретом
+из setWebhook. Каждый пользователь шлёт следующее сообщение после ответа бота на предыдущее,
+по ответам считается задержка и пропускная способность.
+
+Бот запускается отдельно с конфигом вида:
+    bot:
+      token: "123456:TEST"
+      mode: "webhook"
+      api_url: "http://127.0.0.1:8081"
+      webhook:
+        url: "http://127.0.0.1:8080/webhook"
+        secret_token: "local-secret"
+
+Запуск:
+    python -m benchmarks.fake_telegram [--users 50] [--updates 20] [--text /me]
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from typing import Optional
+
+from aiohttp import ClientSession, web
+
+
+class FakeTelegram:
+	def __init__(self):
+		self.webhook_url: Optional[str] = None
+		self.secret_token: Optional[str] = None
+		self.webhook_set = asyncio.Event()
+		self.replies: dict[int, asyncio.Queue] = {}
+		self.calls: dict[str, int] = {}
+		self._ids = itertools.count(1)
+
+	def make_app(self) -> web.Application:
+		app = web.Application()
+		app.router.add_post('/bot{token}/{method}', self._handle)
+		return app
+
+	async def _handle(self, request: web.Request) -> web.Response:
+		method = request.match_info['method']
+		params = dict(await request.post())
+		self.calls[method] = self.calls.get(method, 0) + 1
+
+		if method == 'setWebhook':
+			self.webhook_url = params['url']
+			self.secret_token = params.get('secret_token')
+			self.webhook_set.set()
+			return web.json_response({'ok': True, 'result': True})
+		if method == 'getMe':
+			return web.json_response({'ok': True, 'result': {'id': 123456, 'is_bot': True, 'first_name': 'dtimebot', 'username': 'dtimebot'}})
+		if method in ('sendMessage', 'editMessageText'):
+			chat_id = int(params['chat_id'])
+			if chat_id in self.replies:
+				self.replies[chat_id].put_nowait(params.get('text'))
+			return web.json_response({'ok': True, 'result': {
+				'message_id': next(self._ids),
+				'date': int(time.time()),
+				'chat': {'id': chat_id, 'type': 'private'},
+				'text': params.get('text', ''),
+			}})
+		return web.json_response({'ok': True, 'result': True})
+
+	def make_update(self, user_id: int, text: str) -> dict:
+		update_id = next(self._ids)
+		return {
+			'update_id': update_id,
+			'message': {
+				'message_id': update_id,
+				'date': int(time.time()),
+				'chat': {'id': user_id, 'type': 'private'},
+				'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'},
+				'text': text,
+			},
+		}
+
+
+async def run_user(fake: FakeTelegram, http: ClientSession, user_id: int, updates: int, text: str, latencies: list[float]) -> None:
+	replies = fake.replies[user_id] = asyncio.Queue()
+	headers = {'X-Telegram-Bot-Api-Secret-Token': fake.secret_token or ''}
+	for _ in range(updates):
+		started = time.perf_counter()
+		async with http.post(fake.webhook_url, json=fake.make_update(user_id, text), headers=headers) as response:
+			response.raise_for_status()
+		await asyncio.wait_for(replies.get(), timeout=30)
+		latencies.append(time.perf_counter() - started)
+
+
+async def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--api-host', default='127.0.0.1')
+	parser.add_argument('--api-port', type=int, default=8081)
+	parser.add_argument('--users', type=int, default=50)
+	parser.add_argument('--updates', type=int, default=20, help='сообщений от одного пользователя')
+	parser.add_argument('--text', default='/me')
+	parser.add_argument('--first-user-id', type=int, default=10_000)
+	args = parser.parse_args()
+
+	fake = FakeTelegram()
+	runner = web.AppRunner(fake.make_app(), access_log=None)
+	await runner.setup()
+	await web.TCPSite(runner, args.api_host, args.api_port).start()
+	print(f'Fake Bot API on http://{args.api_host}:{args.api_port}, waiting for setWebhook...')
+
+	try:
+		await fake.webhook_set.wait()
+		print(f'Webhook: {fake.webhook_url}')
+
+		async with ClientSession() as http:
+			async with http.post(fake.webhook_url, json=fake.make_update(1, args.text), headers={'X-Telegram-Bot-Api-Secret-Token': 'wrong'}) as response:
+				print(f'Wrong secret token -> HTTP {response.status}')
+
+			latencies: list[float] = []
+			started = time.perf_counter()
+			await asyncio.gather(*(
+				run_user(fake, http, args.first_user_id + n, args.updates, args.text, latencies)
+				for n in range(args.users)
+			))
+			elapsed = time.perf_counter() - started
+	finally:
+		await runner.cleanup()
+
+	latencies.sort()
+	print(f'{len(latencies)} updates from {args.users} users in {elapsed:.2f}s = {len(latencies) / elapsed:,.0f} updates/s')
+	print(
+		f'latency p50 {statistics.median(latencies) * 1000:.1f} ms, '
+		f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms'
+	)
+	print(f'Bot API calls: {fake.calls}')
+
+
+if __name__ == '__main__':
+	asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Общее свободное время участников директории (dtimebot.services.freebusy_service) на больших данных:
+--members участников общей директории, у каждого — личная директория с --tasks задачами в рабочее время,
+раскиданными по году (часть — повторяющиеся). Измеряется get_free_busy() на неделю и на месяц, начиная за 35 дней до конца года
+задач, — как запрос «от текущего момента» при долгой истории (SQLite во временном каталоге), и отдельно
+объединение интервалов всех задач сразу.
+
+Запуск из корня проекта (нужен каталог data/ для логов):
+    python -m benchmarks.freebusy [--members 120] [--tasks 3000] [--repeat 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+START = datetime(2026, 1, 1)
+
+
+async def _run(members: int, tasks: int, repeat: int) -> None:
+	from sqlalchemy import insert
+
+	from dtimebot import configs, database
+	from dtimebot.models.directories import Directory
+	from dtimebot.models.members import Member
+	from dtimebot.models.tasks import Task
+	from dtimebot.models.users import User
+	from dtimebot.scheduling import intervals
+	from dtimebot.scheduling.triggers import IntervalTrigger
+	from dtimebot.services import freebusy_service
+
+	random.seed(1)
+	with tempfile.TemporaryDirectory() as tmp:
+		configs.main_config = {'database': {'url': f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.sqlite3")}'}}
+		await database.start()
+		try:
+			await database.update_models()
+			async with database.get_session() as session:
+				await session.execute(insert(User), [{'id': i, 'telegram_id': i} for i in range(1, members + 1)])
+				# Директория 1 — общая, остальные — личные
+				await session.execute(insert(Directory), [
+					{'id': i, 'owner_id': max(1, i - 1), 'name': f'dir {i}', 'description': '', 'is_self': i > 1}
+					for i in range(1, members + 2)
+				])
+				await session.execute(insert(Member), [
+					{'directory_id': directory_id, 'user_id': user_id, 'is_active': True}
+					for user_id in range(1, members + 1) for directory_id in (1, user_id + 1)
+				])
+				rows = []
+				for user_id in range(1, members + 1):
+					for _ in range(tasks):
+						# Рабочее время 09:00–18:00
+						time_start = START + timedelta(days=random.randrange(365), minutes=9 * 60 + 30 * random.randrange(18))
+						rows.append({
+							'owner_id': user_id, 'directory_id': user_id + 1, 'title': 'task', 'time_start': time_start,
+							'time_end': time_start + timedelta(minutes=30 * random.randint(1, 4)),
+							'recurrence': IntervalTrigger(weeks=1) if random.random() < 0.002 else None,
+						})
+				for offset in range(0, len(rows), 50_000):
+					await session.execute(insert(Task), rows[offset:offset + 50_000])
+				await session.commit()
+
+			print(f'{members} members x {tasks} tasks = {members * tasks:,} tasks')
+			for days in (7, 30):
+				since = START + timedelta(days=330)
+				until = since + timedelta(days=days)
+				result = await freebusy_service.get_free_busy(1, 1, since, until, min_free=timedelta(minutes=30), user_id=1)
+				started = time.perf_counter()
+				for _ in range(repeat):
+					await freebusy_service.get_free_busy(1, 1, since, until, min_free=timedelta(minutes=30), user_id=1)
+				elapsed = (time.perf_counter() - started) / repeat
+				print(f'  {days:>2} days: {len(result.busy):5d} busy / {len(result.free):5d} free intervals in {elapsed * 1000:7.1f} ms')
+
+			all_intervals = [(row['time_start'], row['time_end']) for row in rows]
+			started = time.perf_counter()
+			merged = intervals.merge(all_intervals)
+			print(f'  merge of all {len(all_intervals):,} intervals: {len(merged):,} busy in {(time.perf_counter() - started) * 1000:.0f} ms')
+		finally:
+			await database.stop()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--members', type=int, default=120)
+	parser.add_argument('--tasks', type=int, default=3000)
+	parser.add_argument('--repeat', type=int, default=5)
+	args = parser.parse_args()
+	asyncio.run(_run(args.members, args.tasks, args.repeat))
+
+
+if __name__ == '__main__':
+	main()
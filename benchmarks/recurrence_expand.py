@@ -0,0 +1,64 @@
+"""
+Разворачивание повторяющихся задач (dtimebot.scheduling.recurrence) на год вперёд — как при показе
+списка или расписания. Для сравнения — тот же cron перебором get_next_fire_time() APScheduler.
+
+Запуск из корня проекта (нужен каталог data/ для логов):
+    python -m benchmarks.recurrence_expand [--repeat 200]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.triggers.cron import CronTrigger as APSCronTrigger
+
+from dtimebot.models.tasks import Task
+from dtimebot.scheduling import recurrence
+from dtimebot.scheduling.triggers import CronTrigger, IntervalTrigger
+
+
+START = datetime(2026, 1, 1, 9, 0)
+RULES = {
+	'daily interval': IntervalTrigger(days=1),
+	'daily cron': CronTrigger(hour=9, minute=0),
+	'weekdays cron': CronTrigger(hour=9, minute=0, day_of_week='mon-fri'),
+	'weekdays cron, Europe/Moscow': CronTrigger(hour=9, minute=0, day_of_week='mon-fri', timezone='Europe/Moscow'),
+	'last day of month': CronTrigger(day='last', hour=18, minute=0),
+}
+
+
+def _measure(function, repeat: int) -> tuple[float, int]:
+	count = function()
+	started = time.perf_counter()
+	for _ in range(repeat):
+		function()
+	return (time.perf_counter() - started) / repeat, count
+
+
+def _aps_year(rule: CronTrigger) -> int:
+	trigger = APSCronTrigger(hour=rule.hour, minute=rule.minute, day=rule.day, day_of_week=rule.day_of_week, timezone='UTC')
+	until = (START + timedelta(days=365)).replace(tzinfo=timezone.utc)
+	previous, count = None, 0
+	current = START.replace(tzinfo=timezone.utc)
+	while (current := trigger.get_next_fire_time(previous, current)) is not None and current < until:
+		previous, count = current, count + 1
+		current += timedelta(microseconds=1)
+	return count
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--repeat', type=int, default=200)
+	args = parser.parse_args()
+
+	until = START + timedelta(days=365)
+	for name, rule in RULES.items():
+		task = Task(title=name, time_start=START, time_end=START + timedelta(hours=1), recurrence=rule)
+		elapsed, count = _measure(lambda: len(recurrence.occurrences(task, START, until)), args.repeat)
+		print(f'{name:>30}: {count:4d} occurrences in {elapsed * 1000:6.3f} ms')
+		if name == 'weekdays cron':
+			elapsed, count = _measure(lambda: _aps_year(rule), max(1, args.repeat // 20))
+			print(f'{"APScheduler get_next_fire_time":>30}: {count:4d} occurrences in {elapsed * 1000:6.3f} ms')
+
+
+if __name__ == '__main__':
+	main()
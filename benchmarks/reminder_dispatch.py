@@ -0,0 +1,194 @@
+"""
+Отправка большого числа разовых напоминаний: AsyncIOScheduler с заданием DateTrigger на каждое
+напоминание против колеса времени (dtimebot.scheduling.wheel).
+
+Сценарии (каждый — в отдельном процессе, чтобы память не смешивалась):
+- apscheduler — N заданий add_job(trigger='date') в MemoryJobStore, как если бы каждое напоминание было заданием;
+- wheel — N элементов в TimingWheel в памяти;
+- wheel+db — N строк в таблице reminder (SQLite во временном каталоге), отправку ведёт движок
+  напоминаний engine='wheel': расписание подгружается из БД пачками, напоминания отправляются пачками.
+
+Для каждого N измеряется время планирования, прирост RSS и время, за которое отработали
+все N напоминаний, наступивших одновременно (планировщик стоит на паузе, пока задания добавляются).
+
+Запуск из корня проекта (нужен каталог data/ для логов):
+    python -m benchmarks.reminder_dispatch [--sizes 10000 100000 1000000] [--engines apscheduler wheel wheel+db] [--timeout 600]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def _rss_mb() -> float:
+	"""Текущий RSS процесса в МиБ (на Linux), иначе пиковый."""
+	try:
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+	except OSError:
+		# ru_maxrss — в КиБ на Linux, в байтах на macOS
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _bench_apscheduler(n: int) -> dict:
+	from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+	fired = 0
+	done = asyncio.Event()
+
+	async def fire() -> None:
+		nonlocal fired
+		fired += 1
+		if fired == n:
+			done.set()
+
+	scheduler = AsyncIOScheduler(timezone='UTC')
+	scheduler.start(paused=True)
+	now = datetime.now(timezone.utc)
+	rss = _rss_mb()
+	started = time.perf_counter()
+	for i in range(n):
+		# Время по возрастанию — лучший случай для MemoryJobStore (вставка в конец списка)
+		scheduler.add_job(fire, 'date', run_date=now + timedelta(microseconds=i), misfire_grace_time=None)
+	schedule_time = time.perf_counter() - started
+	memory = _rss_mb() - rss
+
+	started = time.perf_counter()
+	scheduler.resume()
+	await done.wait()
+	dispatch_time = time.perf_counter() - started
+	scheduler.shutdown(wait=False)
+	return {'schedule': schedule_time, 'memory': memory, 'dispatch': dispatch_time}
+
+
+async def _bench_wheel(n: int) -> dict:
+	from dtimebot.scheduling.wheel import TimingWheel
+
+	now = time.time()
+	wheel: TimingWheel[int] = TimingWheel(start=now - 1)
+	rss = _rss_mb()
+	started = time.perf_counter()
+	for i in range(n):
+		wheel.add(now - 0.5 + i * 1e-7, i)
+	schedule_time = time.perf_counter() - started
+	memory = _rss_mb() - rss
+
+	fired = 0
+	started = time.perf_counter()
+	for _ in wheel.advance(time.time()):
+		fired += 1
+	dispatch_time = time.perf_counter() - started
+	assert fired == n
+	return {'schedule': schedule_time, 'memory': memory, 'dispatch': dispatch_time}
+
+
+async def _bench_wheel_db(n: int) -> dict:
+	from sqlalchemy import insert
+
+	from dtimebot import configs, database, scheduling
+	from dtimebot.models.directories import Directory
+	from dtimebot.models.reminders import Reminder
+	from dtimebot.models.tasks import Task
+	from dtimebot.models.users import User
+	from dtimebot.scheduling import reminders
+
+	with tempfile.TemporaryDirectory() as tmp:
+		configs.main_config = {
+			'database': {'url': f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.sqlite3")}'},
+			'scheduling': {'reminders': {'engine': 'wheel', 'batch_size': 1000}},
+		}
+		scheduling.config = scheduling.SchedulingConfig.model_validate(configs.get('scheduling'))
+		await database.start()
+		try:
+			await database.update_models()
+			now = datetime.utcnow()
+			async with database.get_session() as session:
+				await session.execute(insert(User).values(id=1, telegram_id=1))
+				await session.execute(insert(Directory).values(id=1, owner_id=1, name='bench', description='bench', is_self=True))
+				await session.execute(insert(Task), [
+					{'id': i + 1, 'owner_id': 1, 'directory_id': 1, 'title': f'task {i}', 'time_start': now}
+					for i in range(1000)
+				])
+				for offset in range(0, n, 50_000):
+					await session.execute(insert(Reminder), [
+						{'task_id': i % 1000 + 1, 'kind': 'start', 'fire_at': now - timedelta(seconds=2) + timedelta(microseconds=i)}
+						for i in range(offset, min(n, offset + 50_000))
+					])
+				await session.commit()
+
+			fired = 0
+			done = asyncio.Event()
+
+			async def notify(batch) -> None:
+				nonlocal fired
+				fired += len(batch)
+				if fired >= n:
+					done.set()
+
+			rss = _rss_mb()
+			started = time.perf_counter()
+			reminders.start(notify)
+			await done.wait()
+			dispatch_time = time.perf_counter() - started
+			memory = _rss_mb() - rss
+			await reminders.stop()
+		finally:
+			await database.stop()
+	# Планирование — это вставка строк в reminder вместе с задачей, в памяти ничего не хранится
+	return {'schedule': None, 'memory': memory, 'dispatch': dispatch_time}
+
+
+BENCHES = {
+	'apscheduler': _bench_apscheduler,
+	'wheel': _bench_wheel,
+	'wheel+db': _bench_wheel_db,
+}
+
+
+def _child(engine: str, n: int, queue) -> None:
+	logging.disable(logging.WARNING)
+	queue.put(asyncio.run(BENCHES[engine](n)))
+
+
+def run(engine: str, n: int, timeout: float) -> None:
+	context = multiprocessing.get_context('spawn')
+	queue = context.Queue()
+	process = context.Process(target=_child, args=(engine, n, queue))
+	process.start()
+	process.join(timeout)
+	if process.is_alive():
+		process.terminate()
+		process.join()
+		print(f'{engine:>12} {n:>9,}: did not finish in {timeout:.0f}s')
+		return
+	if process.exitcode != 0:
+		print(f'{engine:>12} {n:>9,}: failed with exit code {process.exitcode}')
+		return
+
+	result = queue.get()
+	schedule = f'{result["schedule"]:7.2f}s' if result['schedule'] is not None else '      -'
+	print(
+		f'{engine:>12} {n:>9,}: schedule {schedule}, +{result["memory"]:7.1f} MiB RSS, '
+		f'dispatch {result["dispatch"]:7.2f}s = {n / result["dispatch"]:>12,.0f} reminders/s'
+	)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+	parser.add_argument('--engines', nargs='+', choices=list(BENCHES), default=list(BENCHES))
+	parser.add_argument('--timeout', type=float, default=600, help='предел на один сценарий, секунды')
+	args = parser.parse_args()
+
+	for n in args.sizes:
+		for engine in args.engines:
+			run(engine, n, args.timeout)
+
+
+if __name__ == '__main__':
+	main()
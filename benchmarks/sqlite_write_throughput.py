@@ -0,0 +1,114 @@
+"""
+Пропускная способность записи в SQLite: PRAGMA по умолчанию против профиля из DatabaseConfig.sqlite_pragmas.
+
+Несколько конкурентных «апдейтов» создают задачи с тегами (по транзакции на задачу),
+параллельно читатели выбирают список задач — как /list_tasks во время /create_task.
+
+Запуск из корня проекта (нужен каталог data/ для логов); каталог для временной БД задаётся TMPDIR:
+    python -m benchmarks.sqlite_write_throughput [--writers 8] [--tasks 100] [--readers 2]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from dtimebot.database import Base, SQLitePragmasConfig, apply_sqlite_pragmas
+from dtimebot.models.directories import Directory
+from dtimebot.models.tasks import Task, TaskTag
+from dtimebot.models.users import User
+
+
+PROFILES = {
+	'default': SQLitePragmasConfig(**{name: None for name in SQLitePragmasConfig.model_fields}),
+	'tuned': SQLitePragmasConfig(),
+}
+
+
+async def run_profile(name: str, pragmas: SQLitePragmasConfig, writers: int, tasks: int, readers: int) -> None:
+	with tempfile.TemporaryDirectory() as tmp:
+		engine = create_async_engine(f'sqlite+aiosqlite:///{os.path.join(tmp, "bench.sqlite3")}')
+		apply_sqlite_pragmas(engine.sync_engine, pragmas)
+		try:
+			committed, errors, reads, elapsed = await _run(engine, writers, tasks, readers)
+		finally:
+			await engine.dispose()
+
+	print(
+		f'{name:>8}: {committed} commits in {elapsed:.2f}s = {committed / elapsed:,.0f} tx/s, '
+		f'{reads / elapsed:,.0f} reads/s, {errors} lock errors'
+	)
+
+
+async def _run(engine: AsyncEngine, writers: int, tasks: int, readers: int) -> tuple[int, int, int, float]:
+	Session = async_sessionmaker(engine, expire_on_commit=False)
+
+	async with engine.begin() as conn:
+		await conn.run_sync(Base.metadata.create_all)
+	async with Session() as session:
+		user = User(telegram_id=1, first_name='bench')
+		session.add(user)
+		await session.flush()
+		directory = Directory(owner_id=user.id, name='bench', description='bench', is_self=True)
+		session.add(directory)
+		await session.commit()
+
+	committed = errors = reads = 0
+	done = asyncio.Event()
+
+	async def writer(n: int) -> None:
+		nonlocal committed, errors
+		start = datetime(2025, 1, 1)
+		for i in range(tasks):
+			try:
+				async with Session() as session:
+					task = Task(
+						owner_id=user.id, directory_id=directory.id, title=f'task {n}-{i}',
+						time_start=start + timedelta(minutes=i), time_end=start + timedelta(minutes=i + 30),
+					)
+					session.add(task)
+					await session.flush()
+					session.add_all([TaskTag(task_id=task.id, tag='bench'), TaskTag(task_id=task.id, tag=f'w{n}')])
+					await session.commit()
+				committed += 1
+			except OperationalError:
+				errors += 1
+
+	async def reader() -> None:
+		nonlocal reads
+		while not done.is_set():
+			async with Session() as session:
+				await session.execute(
+					select(Task).where(Task.owner_id == user.id).order_by(Task.time_start).limit(5)
+				)
+			reads += 1
+			await asyncio.sleep(0)
+
+	reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+	started = time.perf_counter()
+	await asyncio.gather(*(writer(n) for n in range(writers)))
+	elapsed = time.perf_counter() - started
+	done.set()
+	await asyncio.gather(*reader_tasks)
+	return committed, errors, reads, elapsed
+
+
+async def main() -> None:
+	parser = argparse.ArgumentParser()
+	parser.add_argument('--writers', type=int, default=8)
+	parser.add_argument('--tasks', type=int, default=100, help='задач на одного писателя')
+	parser.add_argument('--readers', type=int, default=2)
+	args = parser.parse_args()
+
+	print(f'writers={args.writers} tasks/writer={args.tasks} readers={args.readers}')
+	for name, pragmas in PROFILES.items():
+		await run_profile(name, pragmas, args.writers, args.tasks, args.readers)
+
+
+if __name__ == '__main__':
+	asyncio.run(main())
@@ -7,11 +7,14 @@ async def start():
 	scheduling.start()
 	await database.start()
 	await database.update_models()
+	await scheduling.start_job_store()
 	await bot.start()
 	main_logger.info("dtimebot started")
 
 async def stop():
 	main_logger.info("Stopping dtimebot...")
 	await bot.stop()
+	await scheduling.stop_job_store()
 	scheduling.stop()
+	await database.stop()
 	main_logger.info("dtimebot stopped")
@@ -1,71 +1,123 @@
 from asyncio import Task
 import asyncio
+from datetime import timedelta
+from functools import partial
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 from aiogram import Bot, Dispatcher
-from aiogram.types import Message
-from aiogram.filters import CommandStart, CommandObject
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
-from dtimebot import configs
+from dtimebot import configs, scheduling
+from dtimebot.scheduling import digest, reminders
 from dtimebot.logs import main_logger
-from dtimebot.services import user_service
 
-from dtimebot.bot import handlers
+from dtimebot.bot import handlers, notifications
+from dtimebot.bot.middlewares import CommitBeforeSendMiddleware, SessionMiddleware, UserMiddleware, LoadersMiddleware
+from dtimebot.bot.outbox import Outbox, RateLimitConfig
+from dtimebot.bot.storage import DatabaseStorage
+from dtimebot.bot.webhook import WebhookConfig, WebhookServer
 
 
 logger = main_logger.getChild('bot')
 
+class FSMStorageConfig(BaseModel):
+	# 'database' — состояния диалогов хранятся в БД и переживают перезапуск, 'memory' — только в памяти процесса
+	type: Literal['memory', 'database'] = 'database'
+	# Через сколько секунд без изменений состояние считается брошенным
+	ttl: int = 24 * 60 * 60
+	# Сколько ключей держать в кэше (0 — без кэша)
+	cache_size: int = 1024
+	# Период удаления брошенных состояний, секунды
+	evict_interval: int = 60 * 60
+
+
 class BotConfig(BaseModel):
 	token: str
+	# 'polling' — getUpdates, 'webhook' — встроенный HTTP-сервер (нужна секция webhook)
+	mode: Literal['polling', 'webhook'] = 'polling'
+	webhook: Optional[WebhookConfig] = None
+	# Свой Bot API сервер (локальный telegram-bot-api или фейковый для тестов), например http://127.0.0.1:8081
+	api_url: Optional[str] = None
+	fsm_storage: FSMStorageConfig = FSMStorageConfig()
+	# Лимиты исходящих сообщений (см. dtimebot.bot.outbox)
+	rate_limit: RateLimitConfig = RateLimitConfig()
 
 config: Optional[BotConfig] = None
 
 main_bot: Optional[Bot] = None
 dp = Dispatcher()
+dp.update.outer_middleware(SessionMiddleware())
+dp.update.outer_middleware(UserMiddleware())
+dp.update.outer_middleware(LoadersMiddleware())
 polling_task: Optional[Task] = None
+webhook_server: Optional[WebhookServer] = None
+outbox: Optional[Outbox] = None
 
 
-@dp.message(CommandStart())
-async def on_hello(message: Message, command: CommandObject):
-	"""
-	Обработчик команды /start.
-	Регистрирует пользователя, если его еще нет в БД.
-	"""
-	user_telegram_id = message.from_user.id
-	user_full_name = message.from_user.full_name or ""
-	user_username = message.from_user.username or ""
-
-	try:
-		user = await user_service.get_or_create_user(message.from_user)
-		greeting_text = (
-			f"Привет, {user_full_name}!\n"
-			f"Имя пользователя: @{user_username if user_username else 'Не указано'}\n"
-			f"Вы успешно зарегистрированы в системе.\n"
-			f"Дата регистрации: {user.created_at.strftime('%d.%m.%Y %H:%M:%S') if user.created_at else 'Неизвестно'}\n"
-		)
-		await message.answer(greeting_text)
-	except Exception as e:
-		logger.error(f"Error while registering user {user_telegram_id}: {e}", exc_info=True)
-		await message.answer("Произошла ошибка при регистрации. Пожалуйста, попробуйте позже.")
+def setup_fsm_storage(storage_config: FSMStorageConfig) -> None:
+	if storage_config.type != 'database':
+		logger.info("Using in-memory FSM storage")
+		return
+
+	storage = DatabaseStorage(ttl=timedelta(seconds=storage_config.ttl), cache_size=storage_config.cache_size)
+	dp.fsm.storage = storage
+	scheduling.scheduler.add_job(
+		evict_fsm_storage, 'interval', seconds=storage_config.evict_interval,
+		id='fsm_storage_evict', jobstore=scheduling.persistent_jobstore(), replace_existing=True
+	)
+	logger.info("Using database FSM storage (ttl=%ss, cache_size=%s)", storage_config.ttl, storage_config.cache_size)
+
+async def evict_fsm_storage() -> None:
+	"""Задание удаления брошенных состояний FSM (функция модуля, чтобы задание сохранялось в БД)."""
+	if isinstance(dp.fsm.storage, DatabaseStorage):
+		await dp.fsm.storage.evict_expired()
 
 async def start():
-	global config, main_bot, dp, polling_task
+	global config, main_bot, dp, polling_task, webhook_server, outbox
 	logger.info("Starting aiogram bot...")
 
 	config = BotConfig.model_validate(configs.get('bot'))
-
-	main_bot = Bot(token=config.token)
-	await main_bot.delete_webhook(drop_pending_updates=True)
+	if config.mode == 'webhook' and config.webhook is None:
+		raise ValueError("bot.webhook section is required for webhook mode")
+	setup_fsm_storage(config.fsm_storage)
+
+	session = AiohttpSession(api=TelegramAPIServer.from_base(config.api_url)) if config.api_url else None
+	main_bot = Bot(token=config.token, session=session)
+	# Снаружи Outbox: транзакция апдейта фиксируется до ожидания лимитов
+	main_bot.session.middleware(CommitBeforeSendMiddleware())
+	if config.rate_limit.enabled:
+		outbox = Outbox(config.rate_limit)
+		main_bot.session.middleware(outbox)
 
 	# Подключаем роутер с обработчиками
 	dp.include_router(handlers.router)
+	reminders.start(partial(notifications.send_reminders, main_bot))
+	digest.start(partial(notifications.send_digests, main_bot))
+
+	if config.mode == 'webhook':
+		webhook_server = WebhookServer(dp, main_bot, config.webhook)
+		await dp.emit_startup(bot=main_bot, dispatcher=dp)
+		await webhook_server.start()
+		await main_bot.set_webhook(
+			config.webhook.url,
+			secret_token=config.webhook.secret_token,
+			max_connections=config.webhook.workers,
+			allowed_updates=dp.resolve_used_update_types(),
+			drop_pending_updates=config.webhook.drop_pending_updates
+		)
+		logger.info("Webhook set to %s", config.webhook.url)
+		return
 
+	await main_bot.delete_webhook(drop_pending_updates=True)
 	polling_task = asyncio.create_task(dp.start_polling(main_bot))
 
 async def stop():
-	global polling_task, main_bot
+	global polling_task, main_bot, webhook_server, outbox
 	logger.info("Stopping aiogram bot...")
+	await reminders.stop()
+	digest.stop()
 	if polling_task:
 		polling_task.cancel()
 		try:
@@ -73,7 +125,20 @@ async def stop():
 		except asyncio.CancelledError:
 			logger.info("Polling task cancelled")
 		polling_task = None
+	if webhook_server:
+		# Webhook не удаляем: пока бот выключен, Telegram копит апдейты и доставит их после запуска
+		await webhook_server.stop()
+		await dp.emit_shutdown(bot=main_bot, dispatcher=dp)
+		webhook_server = None
+	if outbox:
+		stats = outbox.stats()
+		logger.info(
+			"Outbox stats: sent %d interactive / %d bulk, %d flood waits",
+			stats.sent_interactive, stats.sent_bulk, stats.retry_after
+		)
+		outbox = None
 	if main_bot:
-		await main_bot.close()
+		# bot.close() — это метод Bot API close (выход с сервера Bot API), а не закрытие HTTP-сессии
+		await main_bot.session.close()
 		main_bot = None
-	logger.info("Aiogram bot stopped")
\ No newline at end of file
+	logger.info("Aiogram bot stopped")
@@ -1,3 +1,6 @@
+import asyncio
+import re
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, CommandObject
@@ -6,14 +9,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from datetime import datetime as _dt
-from datetime import datetime
-
-from sqlalchemy import select
-from dtimebot.database import get_session
+from datetime import datetime, timedelta, tzinfo
 
 from dtimebot.logs import main_logger
 from dtimebot.models.users import User
-from dtimebot.services import user_service, directory_service, task_service, invitation_service
+from dtimebot.services import user_service, directory_service, task_service, invitation_service, conflict_service, freebusy_service
+from dtimebot.services.loaders import Loaders
+from dtimebot.scheduling import recurrence, timezones
+from dtimebot.scheduling.triggers import CronTrigger, IntervalTrigger, JobTrigger
 
 logger = main_logger.getChild('bot.handlers')
 
@@ -52,26 +55,11 @@ class JoinStates(StatesGroup):
 # --- Команды общего назначения ---
 
 @router.message(Command("start"))
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, user: User):
     """Обработчик команды /start - регистрация пользователя."""
     try:
-        user = await user_service.get_or_create_user(message.from_user)
-        if user is None:
-            await message.answer("❌ Ошибка при регистрации пользователя.")
-            return
-
-        # Создаем личную директорию для пользователя, если её нет
-        personal_dirs = await directory_service.get_user_directories(message.from_user.id)
-        has_personal = any(dir_obj.is_self for dir_obj in personal_dirs)
-        
-        if not has_personal:
-            await directory_service.create_directory(
-                message.from_user.id, 
-                "Личная", 
-                "Личная директория пользователя",
-                is_self=True
-            )
-
+        # Пользователь уже найден или зарегистрирован в UserMiddleware
+        # вместе с личной директорией (user_service.get_or_create_user)
         welcome_text = (
             f"👋 Привет, {message.from_user.first_name}!\n\n"
             "🤖 Я бот для управления задачами и событиями.\n"
@@ -107,14 +95,14 @@ async def cmd_create_dir_name_received(message: Message, state: FSMContext):
 	await state.set_state(DirectoryStates.waiting_for_description)
 
 @router.message(DirectoryStates.waiting_for_description, Command("skip"))
-async def cmd_create_dir_skip_description(message: Message, state: FSMContext):
+async def cmd_create_dir_skip_description(message: Message, state: FSMContext, user: User):
 	"""Пропуск описания и создание директории."""
 	user_data = await state.get_data()
 	name = user_data['name']
 	description = ""
 	telegram_id = message.from_user.id
 
-	directory = await directory_service.create_directory(telegram_id, name, description)
+	directory = await directory_service.create_directory(telegram_id, name, description, user_id=user.id)
 	
 	if directory:
 		await message.answer(f"✅ Директория '<b>{name}</b>' успешно создана! ID: {directory.id}", parse_mode='HTML')
@@ -124,14 +112,14 @@ async def cmd_create_dir_skip_description(message: Message, state: FSMContext):
 	await state.clear()
 
 @router.message(DirectoryStates.waiting_for_description, F.text)
-async def cmd_create_dir_description_received(message: Message, state: FSMContext):
+async def cmd_create_dir_description_received(message: Message, state: FSMContext, user: User):
 	"""Получено описание, создание директории."""
 	user_data = await state.get_data()
 	name = user_data['name']
 	description = message.text
 	telegram_id = message.from_user.id
 
-	directory = await directory_service.create_directory(telegram_id, name, description)
+	directory = await directory_service.create_directory(telegram_id, name, description, user_id=user.id)
 	
 	if directory:
 		await message.answer(f"✅ Директория '<b>{name}</b>' успешно создана! ID: {directory.id}\nОписание: {description}", parse_mode='HTML')
@@ -140,39 +128,77 @@ async def cmd_create_dir_description_received(message: Message, state: FSMContex
 	
 	await state.clear()
 
-@router.message(Command("directories"))
-@router.message(Command("list_dirs"))
-async def cmd_list_dirs(message: Message):
-	"""Список директорий пользователя."""
-	telegram_id = message.from_user.id
-	
-	directories = await directory_service.get_user_directories(telegram_id)
-	
+DIRS_PAGE_SIZE = 10
+
+async def _render_dirs_page(telegram_id: int, user: User, loaders: Loaders, after_id: int | None = None, before_id: int | None = None) -> tuple[str, InlineKeyboardMarkup | None] | None:
+	"""Текст и клавиатура навигации для одной страницы директорий (None — страница пуста)."""
+	directories, has_prev, has_next = await directory_service.get_user_directories_page(
+		telegram_id, after_id=after_id, before_id=before_id, limit=DIRS_PAGE_SIZE, user_id=user.id
+	)
 	if not directories:
-		await message.answer("📭 У вас пока нет директорий. Создайте первую с помощью /create_dir")
-		return
+		return None
+
+	# Теги всех директорий страницы одним запросом
+	tags_by_dir = await loaders.directory_tags.load_many(dir_obj.id for dir_obj in directories)
 
 	response_text = "📁 Ваши директории:\n\n"
-	for i, dir_obj in enumerate(directories, 1):
-		# Получим теги для отображения
-		tags = await directory_service.get_directory_tags(telegram_id, dir_obj.id)
+	for dir_obj in directories:
+		tags = tags_by_dir.get(dir_obj.id)
 		tags_str = ', '.join(tags) if tags else '-'
 		response_text += (
-			f"<b>{i}. {dir_obj.name}</b>\n"
+			f"<b>{dir_obj.name}</b>\n"
 			f"   ID: {dir_obj.id}\n"
 			f"   Создана: {dir_obj.created_at.strftime('%d.%m.%Y %H:%M') if dir_obj.created_at else 'Неизвестно'}\n"
 			f"   Описание: {dir_obj.description or '-'}\n"
 			f"   Теги: {tags_str}\n\n"
 		)
-	
-	await message.answer(response_text, parse_mode='HTML')
+
+	builder = InlineKeyboardBuilder()
+	if has_prev:
+		builder.button(text="⬅️ Назад", callback_data=f"dirs_page_prev_{directories[0].id}")
+	if has_next:
+		builder.button(text="Вперёд ➡️", callback_data=f"dirs_page_next_{directories[-1].id}")
+	builder.adjust(2)
+	return response_text, (builder.as_markup() if has_prev or has_next else None)
+
+@router.message(Command("directories"))
+@router.message(Command("list_dirs"))
+async def cmd_list_dirs(message: Message, user: User, loaders: Loaders):
+	"""Список директорий пользователя (постранично)."""
+	page = await _render_dirs_page(user.telegram_id, user, loaders)
+
+	if page is None:
+		await message.answer("📭 У вас пока нет директорий. Создайте первую с помощью /create_dir")
+		return
+
+	response_text, markup = page
+	await message.answer(response_text, parse_mode='HTML', reply_markup=markup)
+
+@router.callback_query(F.data.startswith("dirs_page_"))
+async def cb_list_dirs_page(callback: CallbackQuery, user: User, loaders: Loaders):
+	"""Переход на соседнюю страницу списка директорий."""
+	parts = callback.data.split('_')
+	direction = parts[2]
+	directory_id = int(parts[3])
+	if direction == 'next':
+		page = await _render_dirs_page(user.telegram_id, user, loaders, after_id=directory_id)
+	else:
+		page = await _render_dirs_page(user.telegram_id, user, loaders, before_id=directory_id)
+
+	if page is None:
+		await callback.answer("Больше директорий нет")
+		return
+
+	response_text, markup = page
+	await callback.message.edit_text(response_text, parse_mode='HTML', reply_markup=markup)
+	await callback.answer()
 
 @router.message(Command("edit_dir"))
-async def cmd_edit_dir_start(message: Message, state: FSMContext):
+async def cmd_edit_dir_start(message: Message, state: FSMContext, user: User):
     """Начало редактирования директории: выбор директории."""
     telegram_id = message.from_user.id
     
-    directories = await directory_service.get_user_directories(telegram_id)
+    directories = await directory_service.get_user_directories(telegram_id, user_id=user.id)
     
     if not directories:
         await message.answer("📭 У вас нет директорий для редактирования.")
@@ -252,7 +278,7 @@ async def edit_directory_tags_callback(callback: CallbackQuery, state: FSMContex
 	await callback.answer()
 
 @router.message(DirectoryStates.waiting_for_edit_value, F.text)
-async def cmd_edit_dir_value_received(message: Message, state: FSMContext):
+async def cmd_edit_dir_value_received(message: Message, state: FSMContext, user: User):
 	"""Получено новое значение для редактирования директории."""
 	user_data = await state.get_data()
 	directory_id = user_data['directory_id']
@@ -262,9 +288,9 @@ async def cmd_edit_dir_value_received(message: Message, state: FSMContext):
 
 	success = False
 	if edit_field == 'name':
-		success = await directory_service.update_directory(telegram_id, directory_id, name=new_value)
+		success = await directory_service.update_directory(telegram_id, directory_id, name=new_value, user_id=user.id)
 	elif edit_field == 'description':
-		success = await directory_service.update_directory(telegram_id, directory_id, description=new_value)
+		success = await directory_service.update_directory(telegram_id, directory_id, description=new_value, user_id=user.id)
 
 	if success:
 		await message.answer(f"✅ {edit_field.capitalize()} директории успешно обновлено!")
@@ -274,11 +300,11 @@ async def cmd_edit_dir_value_received(message: Message, state: FSMContext):
 	await state.clear()
 
 @router.message(Command("delete_dir"))
-async def cmd_delete_dir_start(message: Message, state: FSMContext):
+async def cmd_delete_dir_start(message: Message, state: FSMContext, user: User):
     """Начало удаления директории: выбор директории."""
     telegram_id = message.from_user.id
     
-    directories = await directory_service.get_user_directories(telegram_id)
+    directories = await directory_service.get_user_directories(telegram_id, user_id=user.id)
     
     if not directories:
         await message.answer("📭 У вас нет директорий для удаления.")
@@ -297,12 +323,12 @@ async def cmd_delete_dir_start(message: Message, state: FSMContext):
     )
 
 @router.callback_query(F.data.startswith("delete_dir_select_"))
-async def cmd_delete_dir_selected(callback: CallbackQuery, state: FSMContext):
+async def cmd_delete_dir_selected(callback: CallbackQuery, state: FSMContext, user: User):
     """Выбрана директория для удаления."""
     directory_id = int(callback.data.split('_')[-1])
     telegram_id = callback.from_user.id
     
-    success = await directory_service.delete_directory(telegram_id, directory_id)
+    success = await directory_service.delete_directory(telegram_id, directory_id, user_id=user.id)
     
     if success:
         await callback.message.answer(f"✅ Директория с ID {directory_id} успешно удалена.")
@@ -328,21 +354,21 @@ async def cb_remove_dir_tag(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data.startswith("show_dir_tags_"))
-async def cb_show_dir_tags(callback: CallbackQuery):
+async def cb_show_dir_tags(callback: CallbackQuery, user: User):
     directory_id = int(callback.data.split('_')[-1])
     telegram_id = callback.from_user.id
-    tags = await directory_service.get_directory_tags(telegram_id, directory_id)
+    tags = await directory_service.get_directory_tags(telegram_id, directory_id, user_id=user.id)
     txt = ', '.join(tags) if tags else '—'
     await callback.message.answer(f"Теги директории {directory_id}: {txt}")
     await callback.answer()
 
 @router.message(DirectoryStates.waiting_for_tag_action, F.text)
-async def on_dir_tag_action_text(message: Message, state: FSMContext):
+async def on_dir_tag_action_text(message: Message, state: FSMContext, user: User):
     data = await state.get_data()
     directory_id = data.get('obj_id')
     tag = message.text.strip()
     telegram_id = message.from_user.id
-    ok = await directory_service.remove_tag_from_directory(telegram_id, directory_id, tag)
+    ok = await directory_service.remove_tag_from_directory(telegram_id, directory_id, tag, user_id=user.id)
     await message.answer("✅ Готово" if ok else "❌ Не удалось")
     await state.clear()
 
@@ -380,14 +406,14 @@ async def cmd_create_task_time_yes(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "create_task_time_no")
-async def cmd_create_task_time_no(callback: CallbackQuery, state: FSMContext):
+async def cmd_create_task_time_no(callback: CallbackQuery, state: FSMContext, user: User):
     """Создаем задачу без временных рамок, затем предложим добавить теги."""
     data = await state.get_data()
     telegram_id = callback.from_user.id
     title = data.get('title')
     description = data.get('description')
     directory_id = data.get('directory_id')
-    task = await task_service.create_task(telegram_id, title, description, directory_id=directory_id)
+    task = await task_service.create_task(telegram_id, title, description, directory_id=directory_id, user_id=user.id)
     if task:
         await state.update_data(created_task_id=task.id)
         builder = InlineKeyboardBuilder()
@@ -400,16 +426,46 @@ async def cmd_create_task_time_no(callback: CallbackQuery, state: FSMContext):
         await state.clear()
     await callback.answer()
 
-def _parse_dt(text: str) -> _dt | None:
+# Сколько пересечений перечислять в предупреждении
+CONFLICTS_LIMIT = 5
+
+async def _conflicts_warning(user: User, task_obj) -> str:
+    """Предупреждение о задачах, пересекающихся по времени с задачей (пустая строка, если накладок нет)."""
+    if task_obj is None or task_obj.time_start is None:
+        return ""
+    conflicts = await conflict_service.find_conflicts(
+        user.telegram_id, task_obj.time_start, task_obj.time_end, exclude_task_id=task_obj.id, user_id=user.id
+    )
+    if not conflicts:
+        return ""
+    text = "\n\n⚠️ Пересекается по времени с:"
+    zone = _user_zone(user)
+    for conflict in conflicts[:CONFLICTS_LIMIT]:
+        time_start = timezones.to_local(conflict.time_start, zone)
+        when = time_start.strftime('%d.%m.%Y %H:%M')
+        if conflict.time_end is not None:
+            time_end = timezones.to_local(conflict.time_end, zone)
+            when += " – " + time_end.strftime('%H:%M' if time_end.date() == time_start.date() else '%d.%m.%Y %H:%M')
+        text += f"\n   • {conflict.title} ({when}){' 🔁' if conflict.recurring else ''}"
+    if len(conflicts) > CONFLICTS_LIMIT:
+        text += f"\n   … и ещё {len(conflicts) - CONFLICTS_LIMIT}"
+    return text
+
+def _user_zone(user: User) -> tzinfo:
+    """Часовой пояс пользователя (ZoneInfo из кэша dtimebot.scheduling.timezones)."""
+    return timezones.get_zone(user.timezone)
+
+def _parse_dt(text: str, zone: tzinfo) -> _dt | None:
+    """Дата и время ДД.ММ.ГГГГ ЧЧ:ММ в часовом поясе пользователя -> UTC."""
     try:
         from datetime import datetime as _dt
-        return _dt.strptime(text.strip(), "%d.%m.%Y %H:%M")
+        return timezones.to_utc(_dt.strptime(text.strip(), "%d.%m.%Y %H:%M"), zone)
     except Exception:
         return None
 
 @router.message(TaskStates.waiting_for_time_start_text, F.text)
-async def cmd_create_task_time_start_text(message: Message, state: FSMContext):
-    value = _parse_dt(message.text)
+async def cmd_create_task_time_start_text(message: Message, state: FSMContext, user: User):
+    value = _parse_dt(message.text, _user_zone(user))
     if not value:
         await message.answer("❌ Неверный формат. Пример: 25.12.2025 09:00")
         return
@@ -418,28 +474,29 @@ async def cmd_create_task_time_start_text(message: Message, state: FSMContext):
     await state.set_state(TaskStates.waiting_for_time_end_text)
 
 @router.message(TaskStates.waiting_for_time_end_text, Command("skip"))
-async def cmd_create_task_time_end_skip(message: Message, state: FSMContext):
+async def cmd_create_task_time_end_skip(message: Message, state: FSMContext, user: User):
     data = await state.get_data()
     telegram_id = message.from_user.id
     title = data.get('title')
     description = data.get('description')
     directory_id = data.get('directory_id')
     time_start = data.get('time_start')
-    task = await task_service.create_task(telegram_id, title, description, directory_id=directory_id, time_start=time_start)
+    task = await task_service.create_task(telegram_id, title, description, directory_id=directory_id, time_start=time_start, user_id=user.id)
     if task:
         await state.update_data(created_task_id=task.id)
         builder = InlineKeyboardBuilder()
         builder.button(text="🏷️ Добавить теги", callback_data="create_task_add_tags")
         builder.button(text="✅ Готово", callback_data="create_task_finish")
         builder.adjust(2)
-        await message.answer(f"✅ Задача создана (ID: {task.id}). Добавить теги?", reply_markup=builder.as_markup())
+        warning = await _conflicts_warning(user, task)
+        await message.answer(f"✅ Задача создана (ID: {task.id}). Добавить теги?{warning}", reply_markup=builder.as_markup())
     else:
         await message.answer("❌ Ошибка при создании задачи.")
         await state.clear()
 
 @router.message(TaskStates.waiting_for_time_end_text, F.text)
-async def cmd_create_task_time_end_text(message: Message, state: FSMContext):
-    value = _parse_dt(message.text)
+async def cmd_create_task_time_end_text(message: Message, state: FSMContext, user: User):
+    value = _parse_dt(message.text, _user_zone(user))
     if not value:
         await message.answer("❌ Неверный формат. Пример: 25.12.2025 09:00")
         return
@@ -449,14 +506,15 @@ async def cmd_create_task_time_end_text(message: Message, state: FSMContext):
     description = data.get('description')
     directory_id = data.get('directory_id')
     time_start = data.get('time_start')
-    task = await task_service.create_task(telegram_id, title, description, directory_id=directory_id, time_start=time_start, time_end=value)
+    task = await task_service.create_task(telegram_id, title, description, directory_id=directory_id, time_start=time_start, time_end=value, user_id=user.id)
     if task:
         await state.update_data(created_task_id=task.id)
         builder = InlineKeyboardBuilder()
         builder.button(text="🏷️ Добавить теги", callback_data="create_task_add_tags")
         builder.button(text="✅ Готово", callback_data="create_task_finish")
         builder.adjust(2)
-        await message.answer(f"✅ Задача создана (ID: {task.id}). Добавить теги?", reply_markup=builder.as_markup())
+        warning = await _conflicts_warning(user, task)
+        await message.answer(f"✅ Задача создана (ID: {task.id}). Добавить теги?{warning}", reply_markup=builder.as_markup())
     else:
         await message.answer("❌ Ошибка при создании задачи.")
         await state.clear()
@@ -468,14 +526,14 @@ async def cmd_create_task_add_tags(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.message(TaskStates.waiting_for_tags_text, F.text)
-async def cmd_create_task_tags_text(message: Message, state: FSMContext):
+async def cmd_create_task_tags_text(message: Message, state: FSMContext, user: User):
     data = await state.get_data()
     task_id = data.get('created_task_id')
     telegram_id = message.from_user.id
     raw = [t.strip() for t in message.text.split(',') if t.strip()]
     added = 0
     for tag in raw:
-        ok = await task_service.add_tag_to_task(telegram_id, task_id, tag)
+        ok = await task_service.add_tag_to_task(telegram_id, task_id, tag, user_id=user.id)
         if ok:
             added += 1
     await message.answer(f"Добавлено тегов: {added}")
@@ -495,11 +553,11 @@ async def cmd_create_task_title_received(message: Message, state: FSMContext):
 	await state.set_state(TaskStates.waiting_for_description)
 
 @router.message(TaskStates.waiting_for_description, Command("skip"))
-async def cmd_create_task_skip_description(message: Message, state: FSMContext):
+async def cmd_create_task_skip_description(message: Message, state: FSMContext, user: User):
     """Пропуск описания и переход к выбору директории."""
     await state.update_data(description="")
     telegram_id = message.from_user.id
-    directories = await directory_service.get_user_directories(telegram_id)
+    directories = await directory_service.get_user_directories(telegram_id, user_id=user.id)
     if not directories:
         await message.answer("📭 У вас нет доступных директорий. Сначала создайте /create_dir")
         await state.clear()
@@ -513,11 +571,11 @@ async def cmd_create_task_skip_description(message: Message, state: FSMContext):
     await state.set_state(TaskStates.waiting_for_create_dir)
 
 @router.message(TaskStates.waiting_for_description, F.text)
-async def cmd_create_task_description_received(message: Message, state: FSMContext):
+async def cmd_create_task_description_received(message: Message, state: FSMContext, user: User):
     """Получено описание — переходим к выбору директории."""
     await state.update_data(description=message.text)
     telegram_id = message.from_user.id
-    directories = await directory_service.get_user_directories(telegram_id)
+    directories = await directory_service.get_user_directories(telegram_id, user_id=user.id)
     if not directories:
         await message.answer("📭 У вас нет доступных директорий. Сначала создайте /create_dir")
         await state.clear()
@@ -530,48 +588,218 @@ async def cmd_create_task_description_received(message: Message, state: FSMConte
     await message.answer("Выберите директорию для задачи:", reply_markup=builder.as_markup())
     await state.set_state(TaskStates.waiting_for_create_dir)
 
-@router.message(Command("list_tasks"))
-async def cmd_list_tasks(message: Message):
-	"""Список задач пользователя."""
-	telegram_id = message.from_user.id
-	
-	tasks = await task_service.get_user_tasks(telegram_id)
-	
+TASKS_PAGE_SIZE = 5
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _encode_task_cursor(cursor: task_service.TaskCursor) -> str:
+	"""Компактная запись курсора для callback_data (лимит Telegram — 64 байта)."""
+	time_start, task_id = cursor
+	if time_start is None:
+		return f"n_{task_id}"
+	return f"{(time_start - _EPOCH) // timedelta(microseconds=1)}_{task_id}"
+
+def _decode_task_cursor(raw_time: str, raw_id: str) -> task_service.TaskCursor:
+	time_start = None if raw_time == 'n' else _EPOCH + timedelta(microseconds=int(raw_time))
+	return time_start, int(raw_id)
+
+async def _render_tasks_page(telegram_id: int, user: User, loaders: Loaders, after: task_service.TaskCursor | None = None, before: task_service.TaskCursor | None = None) -> tuple[str, InlineKeyboardMarkup | None] | None:
+	"""Текст и клавиатура навигации для одной страницы задач (None — страница пуста)."""
+	tasks, has_prev, has_next = await task_service.get_user_tasks_page(
+		telegram_id, after=after, before=before, limit=TASKS_PAGE_SIZE, user_id=user.id
+	)
 	if not tasks:
-		await message.answer("📭 У вас пока нет задач. Создайте первую с помощью /create_task")
-		return
+		return None
+
+	# Теги и директории всех задач страницы — по одному запросу
+	tags_by_task, directories = await asyncio.gather(
+		loaders.task_tags.load_many(task_obj.id for task_obj in tasks),
+		loaders.directories.load_many({task_obj.directory_id for task_obj in tasks if task_obj.directory_id}),
+	)
 
+	zone = _user_zone(user)
 	response_text = "📝 Ваши задачи:\n\n"
-	for i, task_obj in enumerate(tasks, 1):
-		# Получим теги для отображения
-		tags = await task_service.get_task_tags(telegram_id, task_obj.id)
+	for task_obj in tasks:
+		tags = tags_by_task.get(task_obj.id)
 		tags_str = ', '.join(tags) if tags else '-'
 		
-		# Получим информацию о директории
 		directory_name = "Личная"
 		if task_obj.directory_id:
-			directory = await directory_service.get_directory_by_id(telegram_id, task_obj.directory_id)
+			directory = directories.get(task_obj.directory_id)
 			if directory:
 				directory_name = directory.name
 		
 		response_text += (
-			f"<b>{i}. {task_obj.title}</b>\n"
+			f"<b>{task_obj.title}</b>\n"
 			f"   ID: {task_obj.id}\n"
 			f"   📁 Директория: {directory_name}\n"
-			f"   Начало: {task_obj.time_start.strftime('%d.%m.%Y %H:%M') if task_obj.time_start else 'Не указано'}\n"
-			f"   Окончание: {task_obj.time_end.strftime('%d.%m.%Y %H:%M') if task_obj.time_end else 'Не указано'}\n"
+			f"   Начало: {timezones.to_local(task_obj.time_start, zone).strftime('%d.%m.%Y %H:%M') if task_obj.time_start else 'Не указано'}\n"
+			f"   Окончание: {timezones.to_local(task_obj.time_end, zone).strftime('%d.%m.%Y %H:%M') if task_obj.time_end else 'Не указано'}\n"
+		)
+		if task_obj.recurrence is not None:
+			response_text += f"   🔁 Повтор: {_describe_recurrence(task_obj, zone)}\n"
+		response_text += (
 			f"   Описание: {task_obj.description or '-'}\n"
 			f"   Теги: {tags_str}\n\n"
 		)
+
+	builder = InlineKeyboardBuilder()
+	if has_prev:
+		builder.button(text="⬅️ Назад", callback_data=f"tasks_page_prev_{_encode_task_cursor(task_service.task_cursor(tasks[0]))}")
+	if has_next:
+		builder.button(text="Вперёд ➡️", callback_data=f"tasks_page_next_{_encode_task_cursor(task_service.task_cursor(tasks[-1]))}")
+	builder.adjust(2)
+	return response_text, (builder.as_markup() if has_prev or has_next else None)
+
+_RECURRENCE_UNITS = {'мин': 'minutes', 'ч': 'hours', 'д': 'days', 'нед': 'weeks'}
+_RECURRENCE_UNIT_NAMES = (('weeks', 'нед'), ('days', 'дн'), ('hours', 'ч'), ('minutes', 'мин'), ('seconds', 'с'))
+
+def _parse_recurrence(text: str, timezone: str | None = None) -> JobTrigger | None:
+	"""
+	Правило повторения из текста: «ежедневно», «еженедельно», «каждые N мин|ч|дн|нед»,
+	cron-выражение из 5 полей (минута час день месяц день_недели) или «нет» — без повторения.
+	:param timezone: Часовой пояс пользователя: cron-выражение и шаги в сутках — по его местному времени.
+	:raises ValueError: Текст не распознан или правило некорректно.
+	"""
+	value = text.strip().lower()
+	if value in ('нет', '-'):
+		return None
+	if timezone == 'UTC':
+		timezone = None
+	if value == 'ежедневно':
+		return IntervalTrigger(days=1, timezone=timezone)
+	if value == 'еженедельно':
+		return IntervalTrigger(weeks=1, timezone=timezone)
+	match = re.fullmatch(r'кажд\w*\s+(\d+)\s*(мин|ч|д|нед)\w*', value)
+	if match:
+		unit = _RECURRENCE_UNITS[match[2]]
+		return IntervalTrigger(**{unit: int(match[1])}, timezone=timezone if unit in ('days', 'weeks') else None)
+	fields = value.split()
+	if len(fields) == 5:
+		minute, hour, day, month, day_of_week = fields
+		rule = CronTrigger(minute=minute, hour=hour, day=day, month=month, day_of_week=day_of_week, timezone=timezone)
+		recurrence.validate(rule)
+		return rule
+	raise ValueError(f'Unrecognized recurrence: {text!r}')
+
+def _describe_recurrence(task_obj, zone: tzinfo) -> str:
+	"""Правило повторения задачи и её ближайшее вхождение для списка задач."""
+	rule = task_obj.recurrence
+	if isinstance(rule, IntervalTrigger):
+		parts = {name: getattr(rule, name) for name, _ in _RECURRENCE_UNIT_NAMES if getattr(rule, name)}
+		if parts == {'days': 1}:
+			text = "ежедневно"
+		elif parts == {'weeks': 1}:
+			text = "еженедельно"
+		else:
+			text = "каждые " + " ".join(f"{parts[name]} {unit}" for name, unit in _RECURRENCE_UNIT_NAMES if name in parts)
+	else:
+		text = f"по расписанию {rule.minute} {rule.hour} {rule.day} {rule.month} {rule.day_of_week}"
+	occurrence = recurrence.next_occurrence(task_obj, datetime.utcnow())
+	if occurrence is not None:
+		text += f", следующее: {timezones.to_local(occurrence[0], zone).strftime('%d.%m.%Y %H:%M')}"
+	return text
+
+@router.message(Command("list_tasks"))
+async def cmd_list_tasks(message: Message, user: User, loaders: Loaders):
+	"""Список задач пользователя (постранично)."""
+	page = await _render_tasks_page(user.telegram_id, user, loaders)
 	
-	await message.answer(response_text, parse_mode='HTML')
+	if page is None:
+		await message.answer("📭 У вас пока нет задач. Создайте первую с помощью /create_task")
+		return
+
+	response_text, markup = page
+	await message.answer(response_text, parse_mode='HTML', reply_markup=markup)
+
+@router.callback_query(F.data.startswith("tasks_page_"))
+async def cb_list_tasks_page(callback: CallbackQuery, user: User, loaders: Loaders):
+	"""Переход на соседнюю страницу списка задач."""
+	parts = callback.data.split('_')
+	direction = parts[2]
+	cursor = _decode_task_cursor(parts[3], parts[4])
+	if direction == 'next':
+		page = await _render_tasks_page(user.telegram_id, user, loaders, after=cursor)
+	else:
+		page = await _render_tasks_page(user.telegram_id, user, loaders, before=cursor)
+
+	if page is None:
+		await callback.answer("Больше задач нет")
+		return
+
+	response_text, markup = page
+	await callback.message.edit_text(response_text, parse_mode='HTML', reply_markup=markup)
+	await callback.answer()
+
+# Сколько вхождений показывать в /today и /week (сообщение Telegram — не больше 4096 символов)
+AGENDA_LIMIT = 50
+_WEEKDAY_NAMES = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+async def _render_agenda(user: User, loaders: Loaders, title: str, start: datetime, end: datetime) -> str:
+	"""Задачи на интервал [start, end) (UTC), сгруппированные по местным дням пользователя."""
+	items = await task_service.get_tasks_in_range(user.telegram_id, start, end, user_id=user.id)
+	if not items:
+		return f"{title}\n\n📭 Задач нет."
+
+	shown = items[:AGENDA_LIMIT]
+	directories = await loaders.directories.load_many({task_obj.directory_id for task_obj, _, _ in shown if task_obj.directory_id})
+
+	zone = _user_zone(user)
+	start = timezones.to_local(start, zone)
+	response_text = f"{title}\n"
+	current_day = None
+	for task_obj, time_start, time_end in shown:
+		time_start = timezones.to_local(time_start, zone)
+		time_end = timezones.to_local(time_end, zone) if time_end is not None else None
+		# Задача, начавшаяся до интервала, — в его первый день
+		day = max(time_start, start).date()
+		if day != current_day:
+			current_day = day
+			response_text += f"\n<b>{_WEEKDAY_NAMES[day.weekday()]}, {day.strftime('%d.%m')}</b>\n"
+
+		time_format = '%H:%M' if time_start >= start else '%d.%m %H:%M'
+		when = time_start.strftime(time_format)
+		if time_end is not None:
+			when += "–" + time_end.strftime('%H:%M' if time_end.date() == time_start.date() else '%d.%m %H:%M')
+		directory = directories.get(task_obj.directory_id)
+		response_text += f"   {when} {task_obj.title}"
+		if task_obj.recurrence is not None:
+			response_text += " 🔁"
+		if directory is not None and not directory.is_self:
+			response_text += f" (📁 {directory.name})"
+		response_text += "\n"
+
+	if len(items) > len(shown):
+		response_text += f"\n… и ещё {len(items) - len(shown)}"
+	return response_text
+
+@router.message(Command("today"))
+async def cmd_today(message: Message, user: User, loaders: Loaders):
+	"""Задачи на сегодня (местные сутки пользователя)."""
+	zone = _user_zone(user)
+	today = timezones.now_local(zone).date()
+	start, end = timezones.local_day(today, zone)
+	text = await _render_agenda(user, loaders, f"📅 <b>Сегодня, {today.strftime('%d.%m.%Y')}</b>", start, end)
+	await message.answer(text, parse_mode='HTML')
+
+@router.message(Command("week"))
+async def cmd_week(message: Message, user: User, loaders: Loaders):
+	"""Задачи на текущую неделю (с понедельника по воскресенье, по местному времени пользователя)."""
+	zone = _user_zone(user)
+	today = timezones.now_local(zone).date()
+	monday = today - timedelta(days=today.weekday())
+	sunday = monday + timedelta(days=6)
+	start, end = timezones.local_day(monday, zone)[0], timezones.local_day(sunday, zone)[1]
+	title = f"📅 <b>Неделя {monday.strftime('%d.%m')} – {sunday.strftime('%d.%m.%Y')}</b>"
+	text = await _render_agenda(user, loaders, title, start, end)
+	await message.answer(text, parse_mode='HTML')
 
 @router.message(Command("edit_task"))
-async def cmd_edit_task_start(message: Message, state: FSMContext):
+async def cmd_edit_task_start(message: Message, state: FSMContext, user: User):
     """Начало редактирования задачи: выбор задачи."""
     telegram_id = message.from_user.id
     
-    tasks = await task_service.get_user_tasks(telegram_id)
+    tasks = await task_service.get_user_tasks(telegram_id, user_id=user.id)
     
     if not tasks:
         await message.answer("📭 У вас нет задач для редактирования.")
@@ -600,6 +828,7 @@ async def cmd_edit_task_selected(callback: CallbackQuery, state: FSMContext):
     builder.button(text="📝 Изменить название", callback_data=f"edit_task_title_{task_id}")
     builder.button(text="📄 Изменить описание", callback_data=f"edit_task_desc_{task_id}")
     builder.button(text="⏰ Временные рамки", callback_data=f"edit_task_time_{task_id}")
+    builder.button(text="🔁 Повторение", callback_data=f"edit_task_repeat_{task_id}")
     builder.button(text="🏷️ Управление тегами", callback_data=f"edit_task_tags_{task_id}")
     builder.adjust(1)
     
@@ -633,6 +862,21 @@ async def edit_task_description_callback(callback: CallbackQuery, state: FSMCont
 	await state.set_state(TaskStates.waiting_for_edit_value)
 	await callback.answer()
 
+@router.callback_query(F.data.startswith("edit_task_repeat_"))
+async def edit_task_recurrence_callback(callback: CallbackQuery, state: FSMContext, user: User):
+	"""Обработчик кнопки изменения правила повторения задачи."""
+	task_id = int(callback.data.split('_')[-1])
+	await state.update_data(task_id=task_id, edit_field='recurrence')
+	await callback.message.answer(
+		"Как повторять задачу? Первое повторение — время начала задачи.\n"
+		"Примеры: «ежедневно», «еженедельно», «каждые 2 ч», «каждые 3 дн» или cron-выражение "
+		"«0 9 * * mon-fri» (минута час день месяц день недели, "
+		f"ваше местное время — {timezones.effective_name(user.timezone)}).\n"
+		"«нет» — сделать задачу разовой."
+	)
+	await state.set_state(TaskStates.waiting_for_edit_value)
+	await callback.answer()
+
 @router.callback_query(F.data.startswith("edit_task_tags_"))
 async def edit_task_tags_callback(callback: CallbackQuery, state: FSMContext):
 	"""Обработчик кнопки управления тегами задачи."""
@@ -652,7 +896,7 @@ async def edit_task_tags_callback(callback: CallbackQuery, state: FSMContext):
 	await callback.answer()
 
 @router.message(TaskStates.waiting_for_edit_value, F.text)
-async def cmd_edit_task_value_received(message: Message, state: FSMContext):
+async def cmd_edit_task_value_received(message: Message, state: FSMContext, user: User):
 	"""Получено новое значение для редактирования задачи."""
 	user_data = await state.get_data()
 	task_id = user_data['task_id']
@@ -662,9 +906,23 @@ async def cmd_edit_task_value_received(message: Message, state: FSMContext):
 
 	success = False
 	if edit_field == 'title':
-		success = await task_service.update_task(telegram_id, task_id, title=new_value)
+		success = await task_service.update_task(telegram_id, task_id, title=new_value, user_id=user.id)
 	elif edit_field == 'description':
-		success = await task_service.update_task(telegram_id, task_id, description=new_value)
+		success = await task_service.update_task(telegram_id, task_id, description=new_value, user_id=user.id)
+	elif edit_field == 'recurrence':
+		try:
+			rule = _parse_recurrence(new_value, timezones.effective_name(user.timezone))
+		except ValueError:
+			await message.answer("❌ Не удалось разобрать правило. Пример: «ежедневно», «каждые 2 ч» или «0 9 * * mon-fri»")
+			return
+		success = await task_service.set_task_recurrence(telegram_id, task_id, rule, user_id=user.id)
+		if not success:
+			await message.answer("❌ Не удалось изменить повторение (у задачи должно быть время начала).")
+			await state.clear()
+			return
+		await message.answer("✅ Повторение задачи обновлено!" if rule else "✅ Задача теперь разовая.")
+		await state.clear()
+		return
 
 	if success:
 		await message.answer(f"✅ {edit_field.capitalize()} задачи успешно обновлено!")
@@ -674,11 +932,11 @@ async def cmd_edit_task_value_received(message: Message, state: FSMContext):
 	await state.clear()
 
 @router.message(Command("delete_task"))
-async def cmd_delete_task_start(message: Message, state: FSMContext):
+async def cmd_delete_task_start(message: Message, state: FSMContext, user: User):
     """Начало удаления задачи: выбор задачи."""
     telegram_id = message.from_user.id
 
-    tasks = await task_service.get_user_tasks(telegram_id)
+    tasks = await task_service.get_user_tasks(telegram_id, user_id=user.id)
 
     if not tasks:
         await message.answer("📭 У вас нет задач для удаления.")
@@ -696,12 +954,12 @@ async def cmd_delete_task_start(message: Message, state: FSMContext):
     )
 
 @router.callback_query(F.data.startswith("delete_task_select_"))
-async def cmd_delete_task_selected(callback: CallbackQuery, state: FSMContext):
+async def cmd_delete_task_selected(callback: CallbackQuery, state: FSMContext, user: User):
     """Выбрана задача для удаления."""
     task_id = int(callback.data.split('_')[-1])
     telegram_id = callback.from_user.id
     
-    success = await task_service.delete_task(telegram_id, task_id)
+    success = await task_service.delete_task(telegram_id, task_id, user_id=user.id)
     
     if success:
         await callback.message.answer(f"✅ Задача с ID {task_id} успешно удалена.")
@@ -727,16 +985,16 @@ async def cb_remove_task_tag(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data.startswith("show_task_tags_"))
-async def cb_show_task_tags(callback: CallbackQuery):
+async def cb_show_task_tags(callback: CallbackQuery, user: User):
     task_id = int(callback.data.split('_')[-1])
     telegram_id = callback.from_user.id
-    tags = await task_service.get_task_tags(telegram_id, task_id)
+    tags = await task_service.get_task_tags(telegram_id, task_id, user_id=user.id)
     txt = ', '.join(tags) if tags else '—'
     await callback.message.answer(f"Теги задачи {task_id}: {txt}")
     await callback.answer()
 
 @router.message(TaskStates.waiting_for_tag_action, F.text)
-async def on_tag_action_text(message: Message, state: FSMContext):
+async def on_tag_action_text(message: Message, state: FSMContext, user: User):
     data = await state.get_data()
     obj_type = data.get('obj_type')
     obj_id = data.get('obj_id')
@@ -744,9 +1002,9 @@ async def on_tag_action_text(message: Message, state: FSMContext):
     telegram_id = message.from_user.id
     ok = False
     if obj_type == 'task':
-        ok = await task_service.remove_tag_from_task(telegram_id, obj_id, tag)
+        ok = await task_service.remove_tag_from_task(telegram_id, obj_id, tag, user_id=user.id)
     elif obj_type == 'dir':
-        ok = await directory_service.remove_tag_from_directory(telegram_id, obj_id, tag)
+        ok = await directory_service.remove_tag_from_directory(telegram_id, obj_id, tag, user_id=user.id)
     await message.answer("✅ Готово" if ok else "❌ Не удалось")
     await state.clear()
 
@@ -760,11 +1018,11 @@ async def cmd_delete_task_cancel(callback: CallbackQuery, state: FSMContext):
 # --- Команды для работы с приглашениями ---
 
 @router.message(Command("invite"))
-async def cmd_invite_start(message: Message, state: FSMContext):
+async def cmd_invite_start(message: Message, state: FSMContext, user: User):
     """Начало создания приглашения: выбор директории."""
     telegram_id = message.from_user.id
     
-    directories = await directory_service.get_owned_directories(telegram_id)
+    directories = await directory_service.get_owned_directories(telegram_id, user_id=user.id)
     
     if not directories:
         await message.answer("📭 У вас нет директорий для создания приглашений.")
@@ -816,7 +1074,7 @@ async def cmd_invite_max_uses_received(message: Message, state: FSMContext):
 	await state.set_state(InvitationStates.waiting_for_expiry_days)
 
 @router.message(InvitationStates.waiting_for_expiry_days, F.text)
-async def cmd_invite_expiry_received(message: Message, state: FSMContext):
+async def cmd_invite_expiry_received(message: Message, state: FSMContext, user: User):
 	"""Получено количество дней действия приглашения."""
 	try:
 		days = int(message.text)
@@ -839,11 +1097,11 @@ async def cmd_invite_expiry_received(message: Message, state: FSMContext):
 
 	# Создаем приглашение
 	invitation = await invitation_service.create_invitation(
-		telegram_id, directory_id, max_uses, valid_until
+		telegram_id, directory_id, max_uses, valid_until, user_id=user.id
 	)
 
 	if invitation:
-		expiry_text = f"до {valid_until.strftime('%d.%m.%Y %H:%M')}" if valid_until else "бессрочно"
+		expiry_text = f"до {timezones.to_local(valid_until, _user_zone(user)).strftime('%d.%m.%Y %H:%M')}" if valid_until else "бессрочно"
 		uses_text = f"максимум {max_uses} использований" if max_uses else "неограниченно"
 		
 		await message.answer(
@@ -860,21 +1118,21 @@ async def cmd_invite_expiry_received(message: Message, state: FSMContext):
 	await state.clear()
 
 @router.message(Command("join"))
-async def cmd_join_directory(message: Message, command: CommandObject):
+async def cmd_join_directory(message: Message, command: CommandObject, user: User):
     """Присоединение к директории по коду приглашения."""
     if command.args:
         # Если код передан как аргумент команды
         code = command.args.strip().upper()
-        await process_join_code(message, code)
+        await process_join_code(message, code, user)
     else:
         # Если код не передан, запрашиваем его
         await message.answer("Введите код приглашения:")
         await message.bot.set_state(message.from_user.id, JoinStates.waiting_for_code)
 
-async def process_join_code(message: Message, code: str):
+async def process_join_code(message: Message, code: str, user: User):
     """Обработка кода приглашения."""
     telegram_id = message.from_user.id
-    success = await invitation_service.join_directory_by_code(telegram_id, code)
+    success = await invitation_service.join_directory_by_code(telegram_id, code, user_id=user.id)
     
     if success:
         await message.answer("✅ Вы успешно присоединились к директории!")
@@ -882,19 +1140,19 @@ async def process_join_code(message: Message, code: str):
         await message.answer("❌ Не удалось присоединиться к директории. Возможно, код неверный или истек срок действия.")
 
 @router.message(JoinStates.waiting_for_code, F.text)
-async def cmd_join_code_received(message: Message, state: FSMContext):
+async def cmd_join_code_received(message: Message, state: FSMContext, user: User):
     """Получен код приглашения."""
     code = message.text.strip().upper()
-    await process_join_code(message, code)
+    await process_join_code(message, code, user)
     await state.clear()
 
 @router.message(Command("members"))
-async def cmd_list_members(message: Message, command: CommandObject):
+async def cmd_list_members(message: Message, command: CommandObject, user: User):
     """Список участников директории."""
     telegram_id = message.from_user.id
     
     # Получаем все директории пользователя (где он владелец или участник)
-    user_directories = await directory_service.get_user_directories(telegram_id)
+    user_directories = await directory_service.get_user_directories(telegram_id, user_id=user.id)
     
     if not user_directories:
         await message.answer("📭 У вас нет директорий для просмотра участников.")
@@ -912,12 +1170,12 @@ async def cmd_list_members(message: Message, command: CommandObject):
     )
 
 @router.callback_query(F.data.startswith("members_dir_"))
-async def cmd_members_directory_selected(callback: CallbackQuery):
+async def cmd_members_directory_selected(callback: CallbackQuery, user: User, loaders: Loaders):
     """Выбрана директория для просмотра участников."""
     directory_id = int(callback.data.split('_')[-1])
     telegram_id = callback.from_user.id
     
-    members = await invitation_service.get_directory_members(telegram_id, directory_id)
+    members = await invitation_service.get_directory_members(telegram_id, directory_id, user_id=user.id)
     
     if members is None:
         await callback.message.answer("❌ Директория не найдена или у вас нет прав для просмотра участников.")
@@ -930,7 +1188,7 @@ async def cmd_members_directory_selected(callback: CallbackQuery):
         return
 
     # Получаем информацию о директории
-    directory = await directory_service.get_directory_by_id(telegram_id, directory_id)
+    directory = await loaders.directories.load(directory_id)
     dir_name = directory.name if directory else f"Директория {directory_id}"
     
     response_text = f"👥 Участники директории '{dir_name}' (ID: {directory_id}):\n\n"
@@ -949,13 +1207,65 @@ async def cmd_members_cancel(callback: CallbackQuery):
     await callback.message.answer("❌ Просмотр участников отменен.")
     await callback.answer()
 
+# /free: на сколько дней вперёд искать общее свободное время, минимальная длина промежутка, сколько показывать
+FREE_DAYS = 7
+FREE_MIN_DURATION = timedelta(minutes=30)
+FREE_SLOTS_LIMIT = 20
+
+@router.message(Command("free"))
+async def cmd_free(message: Message, user: User):
+    """Общее свободное время участников директории."""
+    user_directories = await directory_service.get_user_directories(message.from_user.id, user_id=user.id)
+    if not user_directories:
+        await message.answer("📭 У вас нет директорий.")
+        return
+
+    builder = InlineKeyboardBuilder()
+    for dir_obj in user_directories:
+        builder.button(text=f"{dir_obj.name} (ID: {dir_obj.id})", callback_data=f"free_dir_{dir_obj.id}")
+    builder.adjust(1)
+    await message.answer("Выберите директорию, чтобы найти время, когда свободны все её участники:", reply_markup=builder.as_markup())
+
+@router.callback_query(F.data.startswith("free_dir_"))
+async def cb_free_directory_selected(callback: CallbackQuery, user: User, loaders: Loaders):
+    """Свободные промежутки участников выбранной директории на FREE_DAYS дней вперёд."""
+    directory_id = int(callback.data.split('_')[-1])
+    # Начало — ближайшие полчаса
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    start = now + timedelta(minutes=-now.minute % 30)
+    end = start + timedelta(days=FREE_DAYS)
+
+    free_busy, directory = await asyncio.gather(
+        freebusy_service.get_free_busy(callback.from_user.id, directory_id, start, end, min_free=FREE_MIN_DURATION, user_id=user.id),
+        loaders.directories.load(directory_id),
+    )
+    if free_busy is None:
+        await callback.message.answer("❌ Директория не найдена или у вас нет к ней доступа.")
+        await callback.answer()
+        return
+
+    dir_name = directory.name if directory else f"Директория {directory_id}"
+    zone = _user_zone(user)
+    response_text = f"🕊️ Общее свободное время участников '{dir_name}' (участников: {free_busy.members}):\n\n"
+    if not free_busy.free:
+        response_text += f"Нет общих свободных промежутков от {FREE_MIN_DURATION.seconds // 60} мин в ближайшие {FREE_DAYS} дн."
+    for slot_start, slot_end in free_busy.free[:FREE_SLOTS_LIMIT]:
+        slot_start, slot_end = timezones.to_local(slot_start, zone), timezones.to_local(slot_end, zone)
+        end_format = '%H:%M' if slot_end.date() == slot_start.date() else '%d.%m %H:%M'
+        response_text += f"• {slot_start.strftime('%d.%m %H:%M')} – {slot_end.strftime(end_format)}\n"
+    if len(free_busy.free) > FREE_SLOTS_LIMIT:
+        response_text += f"… и ещё {len(free_busy.free) - FREE_SLOTS_LIMIT}"
+
+    await callback.message.answer(response_text)
+    await callback.answer()
+
 @router.message(Command("leave"))
-async def cmd_leave_directory(message: Message, command: CommandObject):
+async def cmd_leave_directory(message: Message, command: CommandObject, user: User):
     """Покинуть директорию."""
     telegram_id = message.from_user.id
     
     # Получаем все директории пользователя (где он участник, но не владелец)
-    user_directories = await directory_service.get_user_directories(telegram_id)
+    user_directories = await directory_service.get_user_directories(telegram_id, user_id=user.id)
     
     if not user_directories:
         await message.answer("📭 У вас нет директорий для выхода.")
@@ -974,12 +1284,12 @@ async def cmd_leave_directory(message: Message, command: CommandObject):
     )
 
 @router.callback_query(F.data.startswith("leave_dir_"))
-async def cmd_leave_directory_selected(callback: CallbackQuery):
+async def cmd_leave_directory_selected(callback: CallbackQuery, user: User):
     """Выбрана директория для выхода."""
     directory_id = int(callback.data.split('_')[-1])
     telegram_id = callback.from_user.id
     
-    success = await invitation_service.leave_directory(telegram_id, directory_id)
+    success = await invitation_service.leave_directory(telegram_id, directory_id, user_id=user.id)
     
     if success:
         await callback.message.answer(f"✅ Вы успешно покинули директорию {directory_id}.")
@@ -1013,11 +1323,11 @@ async def cmd_add_tag_start(message: Message, state: FSMContext):
     )
 
 @router.callback_query(F.data == "add_tag_dir")
-async def cmd_add_tag_dir_selected(callback: CallbackQuery, state: FSMContext):
+async def cmd_add_tag_dir_selected(callback: CallbackQuery, state: FSMContext, user: User):
     """Выбрано добавление тега к директории."""
     telegram_id = callback.from_user.id
     
-    directories = await directory_service.get_owned_directories(telegram_id)
+    directories = await directory_service.get_owned_directories(telegram_id, user_id=user.id)
     
     if not directories:
         await callback.message.answer("📭 У вас нет директорий для добавления тегов.")
@@ -1037,11 +1347,11 @@ async def cmd_add_tag_dir_selected(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "add_tag_task")
-async def cmd_add_tag_task_selected(callback: CallbackQuery, state: FSMContext):
+async def cmd_add_tag_task_selected(callback: CallbackQuery, state: FSMContext, user: User):
     """Выбрано добавление тега к задаче."""
     telegram_id = callback.from_user.id
     
-    tasks = await task_service.get_user_tasks(telegram_id)
+    tasks = await task_service.get_user_tasks(telegram_id, user_id=user.id)
     
     if not tasks:
         await callback.message.answer("📭 У вас нет задач для добавления тегов.")
@@ -1085,14 +1395,14 @@ async def cmd_add_tag_cancel(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.message(DirectoryStates.waiting_for_tag, F.text)
-async def cmd_add_tag_value_received(message: Message, state: FSMContext):
+async def cmd_add_tag_value_received(message: Message, state: FSMContext, user: User):
     """Получен тег для добавления к директории."""
     user_data = await state.get_data()
     directory_id = user_data['obj_id']
     tag = message.text.strip()
     telegram_id = message.from_user.id
 
-    success = await directory_service.add_tag_to_directory(telegram_id, directory_id, tag)
+    success = await directory_service.add_tag_to_directory(telegram_id, directory_id, tag, user_id=user.id)
     
     if success:
         await message.answer(f"✅ Тег '{tag}' добавлен к директории {directory_id}.")
@@ -1102,14 +1412,14 @@ async def cmd_add_tag_value_received(message: Message, state: FSMContext):
     await state.clear()
 
 @router.message(TaskStates.waiting_for_tag, F.text)
-async def cmd_add_tag_task_value_received(message: Message, state: FSMContext):
+async def cmd_add_tag_task_value_received(message: Message, state: FSMContext, user: User):
     """Получен тег для добавления к задаче."""
     user_data = await state.get_data()
     task_id = user_data['obj_id']
     tag = message.text.strip()
     telegram_id = message.from_user.id
 
-    success = await task_service.add_tag_to_task(telegram_id, task_id, tag)
+    success = await task_service.add_tag_to_task(telegram_id, task_id, tag, user_id=user.id)
     
     if success:
         await message.answer(f"✅ Тег '{tag}' добавлен к задаче {task_id}.")
@@ -1119,7 +1429,7 @@ async def cmd_add_tag_task_value_received(message: Message, state: FSMContext):
     await state.clear()
 
 @router.message(Command("remove_tag"))
-async def cmd_remove_tag_start(message: Message, command: CommandObject):
+async def cmd_remove_tag_start(message: Message, command: CommandObject, user: User):
     """Удаление тега из директории или задачи."""
     if not command.args:
         await message.answer("❌ Пожалуйста, укажите тип объекта, ID и тег.\nПример: /remove_tag dir 123 важное")
@@ -1142,9 +1452,9 @@ async def cmd_remove_tag_start(message: Message, command: CommandObject):
 
     success = False
     if obj_type == 'dir':
-        success = await directory_service.remove_tag_from_directory(telegram_id, obj_id, tag)
+        success = await directory_service.remove_tag_from_directory(telegram_id, obj_id, tag, user_id=user.id)
     elif obj_type == 'task':
-        success = await task_service.remove_tag_from_task(telegram_id, obj_id, tag)
+        success = await task_service.remove_tag_from_task(telegram_id, obj_id, tag, user_id=user.id)
     else:
         await message.answer("❌ Неверный тип объекта. Используйте 'dir' или 'task'.")
         return
@@ -1155,30 +1465,23 @@ async def cmd_remove_tag_start(message: Message, command: CommandObject):
         await message.answer(f"❌ Не удалось удалить тег из {obj_type} {obj_id}.")
 
 @router.message(Command("my_invitations"))
-async def cmd_my_invitations(message: Message):
+async def cmd_my_invitations(message: Message, user: User):
     """Показать директории пользователя и его приглашения; дать управление инвайтами."""
     telegram_id = message.from_user.id
-    directories = await directory_service.get_user_directories(telegram_id)
-    from dtimebot.database import get_session
-    async with get_session() as session:
-        from sqlalchemy import select
-        from dtimebot.models.users import User as _User
-        res_user = await session.execute(select(_User).where(_User.telegram_id == telegram_id))
-        user = res_user.scalar_one_or_none()
-        user_id = user.id if user else None
-    owned_dirs = [d for d in directories if not d.is_self and d.owner_id == user_id]
-    member_dirs = [d for d in directories if not d.is_self and d.owner_id != user_id]
+    directories = await directory_service.get_user_directories(telegram_id, user_id=user.id)
+    owned_dirs = [d for d in directories if not d.is_self and d.owner_id == user.id]
+    member_dirs = [d for d in directories if not d.is_self and d.owner_id != user.id]
 
     response_text = "📁 <b>Ваши директории</b>\n\n"
     if owned_dirs:
         response_text += "👑 <b>Вы владелец:</b>\n" + "\n".join([f"• {d.name} (ID: {d.id})" for d in owned_dirs]) + "\n\n"
     if member_dirs:
         response_text += "👥 <b>Вы участник:</b>\n" + "\n".join([f"• {d.name} (ID: {d.id})" for d in member_dirs]) + "\n\n"
-    invs = await invitation_service.get_user_invitations(telegram_id)
+    invs = await invitation_service.get_user_invitations(telegram_id, user_id=user.id)
     response_text += "🔑 <b>Ваши приглашения:</b>\n"
     if invs:
         for inv in invs:
-            exp = inv.valid_until.strftime('%d.%m.%Y %H:%M') if inv.valid_until else 'бессрочно'
+            exp = timezones.to_local(inv.valid_until, _user_zone(user)).strftime('%d.%m.%Y %H:%M') if inv.valid_until else 'бессрочно'
             lim = str(inv.max_uses) if inv.max_uses else '∞'
             used = inv.used_count
             response_text += f"• Код <code>{inv.code}</code> → dir {inv.directory_id}, истекает: {exp}, использ.: {used}/{lim}\n"
@@ -1194,9 +1497,9 @@ async def cmd_my_invitations(message: Message):
     await message.answer(response_text, parse_mode='HTML', reply_markup=builder.as_markup())
 
 @router.callback_query(F.data == "myinv_create")
-async def cb_myinv_create(callback: CallbackQuery, state: FSMContext):
+async def cb_myinv_create(callback: CallbackQuery, state: FSMContext, user: User):
     telegram_id = callback.from_user.id
-    directories = await directory_service.get_owned_directories(telegram_id)
+    directories = await directory_service.get_owned_directories(telegram_id, user_id=user.id)
     if not directories:
         await callback.message.answer("У вас нет директорий для создания приглашений.")
         await callback.answer()
@@ -1221,7 +1524,8 @@ async def cb_edit_task_time_menu(callback: CallbackQuery):
     await callback.message.answer("Выберите действие:", reply_markup=builder.as_markup())
     await callback.answer()
 
-def build_calendar(year: int, month: int, prefix: str, task_id: int) -> InlineKeyboardMarkup:
+def build_calendar(year: int, month: int, prefix: str, task_id: int, today=None) -> InlineKeyboardMarkup:
+    """Календарь месяца; today — сегодняшняя дата пользователя (по его часовому поясу), отмечается точками."""
     import calendar
     cal = calendar.Calendar(firstweekday=0)
     builder = InlineKeyboardBuilder()
@@ -1238,7 +1542,8 @@ def build_calendar(year: int, month: int, prefix: str, task_id: int) -> InlineKe
             if day == 0:
                 builder.button(text=" ", callback_data="noop")
             else:
-                builder.button(text=str(day), callback_data=f"{prefix}_cal_pick_{task_id}_{year}_{month}_{day}")
+                is_today = today is not None and (today.year, today.month, today.day) == (year, month, day)
+                builder.button(text=f"·{day}·" if is_today else str(day), callback_data=f"{prefix}_cal_pick_{task_id}_{year}_{month}_{day}")
         builder.adjust(7)
     return builder.as_markup()
 
@@ -1249,21 +1554,21 @@ def _shift_month(year: int, month: int, delta: int) -> tuple[int,int]:
     return y, m
 
 @router.callback_query(F.data.startswith("edit_task_time_start_"))
-async def cb_edit_task_time_start(callback: CallbackQuery):
+async def cb_edit_task_time_start(callback: CallbackQuery, user: User):
     task_id = int(callback.data.split('_')[-1])
-    now = _dt.utcnow()
-    await callback.message.answer("Выберите дату начала:", reply_markup=build_calendar(now.year, now.month, "ets", task_id))
+    today = timezones.now_local(_user_zone(user)).date()
+    await callback.message.answer("Выберите дату начала:", reply_markup=build_calendar(today.year, today.month, "ets", task_id, today))
     await callback.answer()
 
 @router.callback_query(F.data.startswith("edit_task_time_end_"))
-async def cb_edit_task_time_end(callback: CallbackQuery):
+async def cb_edit_task_time_end(callback: CallbackQuery, user: User):
     task_id = int(callback.data.split('_')[-1])
-    now = _dt.utcnow()
-    await callback.message.answer("Выберите дату окончания:", reply_markup=build_calendar(now.year, now.month, "ete", task_id))
+    today = timezones.now_local(_user_zone(user)).date()
+    await callback.message.answer("Выберите дату окончания:", reply_markup=build_calendar(today.year, today.month, "ete", task_id, today))
     await callback.answer()
 
 @router.callback_query(F.data.startswith("ets_cal_prev_") | F.data.startswith("ets_cal_next_") | F.data.startswith("ete_cal_prev_") | F.data.startswith("ete_cal_next_"))
-async def cb_calendar_nav(callback: CallbackQuery):
+async def cb_calendar_nav(callback: CallbackQuery, user: User):
     parts = callback.data.split('_')
     prefix = parts[0]  # ets or ete
     direction = parts[2]
@@ -1272,7 +1577,8 @@ async def cb_calendar_nav(callback: CallbackQuery):
     month = int(parts[5])
     delta = -1 if direction == 'prev' else 1
     y, m = _shift_month(year, month, delta)
-    await callback.message.edit_reply_markup(reply_markup=build_calendar(y, m, prefix, task_id))
+    today = timezones.now_local(_user_zone(user)).date()
+    await callback.message.edit_reply_markup(reply_markup=build_calendar(y, m, prefix, task_id, today))
     await callback.answer()
 
 @router.callback_query(F.data.startswith("ets_cal_pick_") | F.data.startswith("ete_cal_pick_"))
@@ -1290,27 +1596,34 @@ async def cb_calendar_pick_date(callback: CallbackQuery):
     await callback.answer()
 
 @router.callback_query(F.data.startswith("ets_time_") | F.data.startswith("ete_time_"))
-async def cb_calendar_pick_time(callback: CallbackQuery):
+async def cb_calendar_pick_time(callback: CallbackQuery, user: User):
     parts = callback.data.split('_')
     prefix = parts[0]
     task_id = int(parts[2])
     y = int(parts[3]); m = int(parts[4]); d = int(parts[5]); hh = int(parts[6]); mm = int(parts[7])
-    dt = _dt(year=y, month=m, day=d, hour=hh, minute=mm)
+    local_dt = _dt(year=y, month=m, day=d, hour=hh, minute=mm)
+    dt = timezones.to_utc(local_dt, _user_zone(user))
     telegram_id = callback.from_user.id
     if prefix == 'ets':
-        ok = await task_service.update_task(telegram_id, task_id, time_start=dt)
+        ok = await task_service.update_task(telegram_id, task_id, time_start=dt, user_id=user.id)
         txt = "Начало"
     else:
-        ok = await task_service.update_task(telegram_id, task_id, time_end=dt)
+        ok = await task_service.update_task(telegram_id, task_id, time_end=dt, user_id=user.id)
         txt = "Конец"
-    await callback.message.answer(("✅ " + txt + " обновлено: " + dt.strftime('%d.%m.%Y %H:%M')) if ok else "❌ Не удалось обновить дату")
+    if not ok:
+        await callback.message.answer("❌ Не удалось обновить дату")
+        await callback.answer()
+        return
+    task_obj = await task_service.get_task_by_id(telegram_id, task_id, user_id=user.id)
+    warning = await _conflicts_warning(user, task_obj)
+    await callback.message.answer("✅ " + txt + " обновлено: " + local_dt.strftime('%d.%m.%Y %H:%M') + warning)
     await callback.answer()
 
 @router.callback_query(F.data.startswith("edit_task_time_clear_"))
-async def cb_edit_task_time_clear(callback: CallbackQuery):
+async def cb_edit_task_time_clear(callback: CallbackQuery, user: User):
     task_id = int(callback.data.split('_')[-1])
     telegram_id = callback.from_user.id
-    ok = await task_service.update_task(telegram_id, task_id, time_start=None, time_end=None)
+    ok = await task_service.update_task(telegram_id, task_id, time_start=None, time_end=None, user_id=user.id)
     await callback.message.answer("✅ Даты очищены" if ok else "❌ Не удалось обновить")
     await callback.answer()
 
@@ -1320,10 +1633,10 @@ async def cb_noop(callback: CallbackQuery):
     await callback.answer()
 
 @router.callback_query(F.data.startswith("myinv_delete_"))
-async def cb_myinv_delete(callback: CallbackQuery):
+async def cb_myinv_delete(callback: CallbackQuery, user: User):
     inv_id = int(callback.data.split('_')[-1])
     telegram_id = callback.from_user.id
-    ok = await invitation_service.delete_invitation(telegram_id, inv_id)
+    ok = await invitation_service.delete_invitation(telegram_id, inv_id, user_id=user.id)
     await callback.message.answer("✅ Приглашение удалено" if ok else "❌ Не удалось удалить приглашение")
     await callback.answer()
 
@@ -1447,12 +1760,15 @@ async def cb_menu_help(callback: CallbackQuery):
         "📝 <b>Задачи:</b>\n"
         "/create_task - Создать задачу\n"
         "/list_tasks - Список задач\n"
+        "/today - Задачи на сегодня\n"
+        "/week - Задачи на неделю\n"
         "/edit_task - Редактировать задачу\n"
         "/delete_task - Удалить задачу\n\n"
         "👥 <b>Приглашения:</b>\n"
         "/invite - Создать приглашение\n"
         "/join [код] - Присоединиться по коду\n"
         "/members - Список участников\n"
+        "/free - Общее свободное время участников\n"
         "/leave - Покинуть директорию\n"
         "/my_invitations - Мои приглашения\n\n"
         "🏷️ <b>Теги:</b>\n"
@@ -1461,6 +1777,7 @@ async def cb_menu_help(callback: CallbackQuery):
         "ℹ️ <b>Общие:</b>\n"
         "/start - Зарегистрироваться\n"
         "/me - Информация о вас\n"
+        "/timezone [пояс] - Часовой пояс\n"
         "/menu - Это меню\n"
         "/help - Подробная справка"
     )
@@ -1503,18 +1820,18 @@ async def cb_menu_create_dir(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "menu_list_dirs")
-async def cb_menu_list_dirs(callback: CallbackQuery):
-    await cmd_list_dirs(callback.message)
+async def cb_menu_list_dirs(callback: CallbackQuery, user: User, loaders: Loaders):
+    await cmd_list_dirs(callback.message, user, loaders)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_edit_dir")
-async def cb_menu_edit_dir(callback: CallbackQuery, state: FSMContext):
-    await cmd_edit_dir_start(callback.message, state)
+async def cb_menu_edit_dir(callback: CallbackQuery, state: FSMContext, user: User):
+    await cmd_edit_dir_start(callback.message, state, user)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_delete_dir")
-async def cb_menu_delete_dir(callback: CallbackQuery, state: FSMContext):
-    await cmd_delete_dir_start(callback.message, state)
+async def cb_menu_delete_dir(callback: CallbackQuery, state: FSMContext, user: User):
+    await cmd_delete_dir_start(callback.message, state, user)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_create_task")
@@ -1524,23 +1841,23 @@ async def cb_menu_create_task(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "menu_list_tasks")
-async def cb_menu_list_tasks(callback: CallbackQuery):
-    await cmd_list_tasks(callback.message)
+async def cb_menu_list_tasks(callback: CallbackQuery, user: User, loaders: Loaders):
+    await cmd_list_tasks(callback.message, user, loaders)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_edit_task")
-async def cb_menu_edit_task(callback: CallbackQuery, state: FSMContext):
-    await cmd_edit_task_start(callback.message, state)
+async def cb_menu_edit_task(callback: CallbackQuery, state: FSMContext, user: User):
+    await cmd_edit_task_start(callback.message, state, user)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_delete_task")
-async def cb_menu_delete_task(callback: CallbackQuery, state: FSMContext):
-    await cmd_delete_task_start(callback.message, state)
+async def cb_menu_delete_task(callback: CallbackQuery, state: FSMContext, user: User):
+    await cmd_delete_task_start(callback.message, state, user)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_invite")
-async def cb_menu_invite(callback: CallbackQuery, state: FSMContext):
-    await cmd_invite_start(callback.message, state)
+async def cb_menu_invite(callback: CallbackQuery, state: FSMContext, user: User):
+    await cmd_invite_start(callback.message, state, user)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_join")
@@ -1550,18 +1867,18 @@ async def cb_menu_join(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "menu_members")
-async def cb_menu_members(callback: CallbackQuery):
-    await cmd_list_members(callback.message, CommandObject(args=None))
+async def cb_menu_members(callback: CallbackQuery, user: User):
+    await cmd_list_members(callback.message, CommandObject(args=None), user)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_leave")
-async def cb_menu_leave(callback: CallbackQuery):
-    await cmd_leave_directory(callback.message, CommandObject(args=None))
+async def cb_menu_leave(callback: CallbackQuery, user: User):
+    await cmd_leave_directory(callback.message, CommandObject(args=None), user)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_my_invitations")
-async def cb_menu_my_invitations(callback: CallbackQuery):
-    await cmd_my_invitations(callback.message)
+async def cb_menu_my_invitations(callback: CallbackQuery, user: User):
+    await cmd_my_invitations(callback.message, user)
     await callback.answer()
 
 @router.callback_query(F.data == "menu_add_tag")
@@ -1570,8 +1887,8 @@ async def cb_menu_add_tag(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "menu_me")
-async def cb_menu_me(callback: CallbackQuery):
-    await on_me(callback.message)
+async def cb_menu_me(callback: CallbackQuery, user: User):
+    await on_me(callback.message, user)
     await callback.answer()
 
 @router.message(Command("help"))
@@ -1587,6 +1904,8 @@ async def on_help(message: Message):
         "📝 <b>Команды для задач:</b>\n"
         "/create_task - Создать задачу\n"
         "/list_tasks - Список задач\n"
+        "/today - Задачи на сегодня\n"
+        "/week - Задачи на неделю\n"
         "/edit_task - Редактировать задачу\n"
         "/delete_task - Удалить задачу\n\n"
         "🏷️ <b>Команды для тегов:</b>\n"
@@ -1596,33 +1915,31 @@ async def on_help(message: Message):
         "/invite - Создать приглашение\n"
         "/join [код] - Присоединиться по коду\n"
         "/members - Список участников (интерактивно)\n"
+        "/free - Общее свободное время участников (интерактивно)\n"
         "/leave - Покинуть директорию (интерактивно)\n"
         "/my_invitations - Мои директории и приглашения\n\n"
         "ℹ️ <b>Общие команды:</b>\n"
         "/start - Зарегистрироваться\n"
         "/me - Информация о вас\n"
+        "/timezone [пояс] - Часовой пояс (например, Europe/Moscow или +3)\n"
         "/menu - Интерактивное меню\n"
         "/help - Это сообщение"
     )
     await message.answer(help_text, parse_mode='HTML')
 
 @router.message(Command('me'))
-async def on_me(message: Message):
+async def on_me(message: Message, user: User):
     try:
-        user = await user_service.get_or_create_user(message.from_user)
-        if user is None:
-            await message.answer("Не удалось получить информацию о пользователе.")
-            return
-
-        dirs = await directory_service.get_user_directories(message.from_user.id)
-        tasks = await task_service.get_user_tasks(message.from_user.id)
+        dirs = await directory_service.get_user_directories(user.telegram_id, user_id=user.id)
+        tasks = await task_service.get_user_tasks(user.telegram_id, user_id=user.id)
         
         text = (
             f"👤 <b>Информация о пользователе:</b>\n\n"
-            f"Имя: {message.from_user.full_name}\n"
-            f"Username: @{message.from_user.username or 'Не указан'}\n"
+            f"Имя: {user.first_name or 'Не указано'}\n"
+            f"Username: @{user.username or 'Не указан'}\n"
             f"ID в системе: {user.id}\n"
-            f"Telegram ID: {message.from_user.id}\n"
+            f"Telegram ID: {user.telegram_id}\n"
+            f"Часовой пояс: {timezones.effective_name(user.timezone)}\n"
             f"Дата регистрации: {user.created_at.strftime('%d.%m.%Y %H:%M:%S') if user.created_at else 'Неизвестно'}\n\n"
             f"📊 <b>Статистика:</b>\n"
             f"Директорий: {len(dirs)}\n"
@@ -1632,3 +1949,27 @@ async def on_me(message: Message):
     except Exception as e:
         logger.exception("Error while retrieving user information for Telegram ID %s: %s", message.from_user.id, e)
         await message.answer("Произошла ошибка при выполнении /me.")
+
+@router.message(Command('timezone'))
+async def cmd_timezone(message: Message, command: CommandObject, user: User):
+    """Показать или изменить часовой пояс: в нём вводится и показывается время задач."""
+    if not command.args:
+        now = timezones.now_local(_user_zone(user))
+        await message.answer(
+            f"🕐 Ваш часовой пояс: {timezones.effective_name(user.timezone)} (сейчас {now.strftime('%d.%m.%Y %H:%M')})\n"
+            "Изменить: /timezone Europe/Moscow или /timezone +3"
+        )
+        return
+
+    name = timezones.parse_zone_name(command.args)
+    if name is None:
+        await message.answer("❌ Неизвестный часовой пояс. Примеры: Europe/Moscow, Asia/Yekaterinburg, +3, UTC")
+        return
+    if not await user_service.set_user_timezone(user.telegram_id, name, user_id=user.id):
+        await message.answer("❌ Не удалось сохранить часовой пояс.")
+        return
+    now = timezones.now_local(timezones.get_zone(name))
+    await message.answer(
+        f"✅ Часовой пояс: {name} (сейчас {now.strftime('%d.%m.%Y %H:%M')}).\n"
+        "Время новых повторений задач и утренний дайджест — по этому поясу."
+    )
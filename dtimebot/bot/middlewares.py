@@ -0,0 +1,95 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+
+from dtimebot.database import commit_unit_of_work, unit_of_work
+from dtimebot.logs import main_logger
+from dtimebot.services import user_service
+from dtimebot.services.loaders import Loaders
+
+
+logger = main_logger.getChild('bot.middlewares')
+
+
+class SessionMiddleware(BaseMiddleware):
+	"""
+	Открывает одну сессию БД на апдейт (database.unit_of_work) и передаёт её в обработчики как `session`.
+	Сервисы, вызванные из обработчика, используют эту сессию, а изменения фиксируются после обработчика
+	или раньше — перед каждым запросом к Bot API (см. CommitBeforeSendMiddleware).
+	Должен регистрироваться первым.
+	"""
+
+	async def __call__(
+		self,
+		handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+		event: TelegramObject,
+		data: Dict[str, Any],
+	) -> Any:
+		async with unit_of_work() as session:
+			data['session'] = session
+			return await handler(event, data)
+
+
+class CommitBeforeSendMiddleware(BaseRequestMiddleware):
+	"""
+	Middleware сессии бота (bot.session.middleware): перед запросом к Bot API фиксирует транзакцию
+	единицы работы апдейта (database.commit_unit_of_work), чтобы она не держалась открытой — а на SQLite
+	не держала блокировку записи — во время сетевого запроса, ожидания лимитов Outbox и повторов после 429.
+	Должен регистрироваться раньше Outbox.
+	"""
+
+	async def __call__(
+		self,
+		make_request: NextRequestMiddlewareType[TelegramType],
+		bot: Bot,
+		method: TelegramMethod[TelegramType],
+	) -> Response[TelegramType]:
+		await commit_unit_of_work()
+		return await make_request(bot, method)
+
+
+class UserMiddleware(BaseMiddleware):
+	"""
+	Один раз за апдейт находит (или регистрирует) пользователя и передаёт его в обработчики как `user`.
+	Обработчики прокидывают `user.id` в сервисы, чтобы те не искали пользователя по telegram_id повторно.
+	"""
+
+	async def __call__(
+		self,
+		handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+		event: TelegramObject,
+		data: Dict[str, Any],
+	) -> Any:
+		tg_user = data.get('event_from_user')
+		if tg_user is None:
+			return await handler(event, data)
+
+		user = await user_service.get_or_create_user(tg_user)
+		if user is None:
+			logger.error("Failed to resolve user for telegram_id=%s, update skipped", tg_user.id)
+			return None
+
+		data['user'] = user
+		return await handler(event, data)
+
+
+class LoadersMiddleware(BaseMiddleware):
+	"""
+	Создаёт набор DataLoader-ов на время одного апдейта и передаёт его в обработчики как `loaders`.
+	Должен регистрироваться после UserMiddleware.
+	"""
+
+	async def __call__(
+		self,
+		handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+		event: TelegramObject,
+		data: Dict[str, Any],
+	) -> Any:
+		user = data.get('user')
+		if user is not None:
+			data['loaders'] = Loaders(user.telegram_id, user.id)
+		return await handler(event, data)
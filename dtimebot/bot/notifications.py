@@ -0,0 +1,86 @@
+import asyncio
+import html
+from datetime import tzinfo
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from dtimebot.bot.outbox import bulk
+from dtimebot.logs import main_logger
+from dtimebot.scheduling.timezones import get_zone, to_local
+from dtimebot.services.digest_service import Digest
+from dtimebot.services.reminder_service import DueReminder
+
+
+logger = main_logger.getChild('bot.notifications')
+
+# Сколько задач показывать в дайджесте
+DIGEST_LIMIT = 20
+
+
+def format_reminder(reminder: DueReminder, zone: tzinfo) -> str:
+	"""Текст напоминания; время — в часовом поясе получателя."""
+	if reminder.kind == 'start':
+		text = f"⏰ Начинается задача «{reminder.title}»"
+		if reminder.time_end:
+			text += f"\nОкончание: {to_local(reminder.time_end, zone).strftime('%d.%m.%Y %H:%M')}"
+		return text
+	return f"🏁 Закончилось время задачи «{reminder.title}»"
+
+def format_digest(digest: Digest) -> str:
+	"""Дайджест на местные сутки: время задач — в часовом поясе пользователя."""
+	day_start = to_local(digest.start, digest.zone)
+	text = f"☀️ <b>Доброе утро! Задачи на {day_start.strftime('%d.%m.%Y')}</b>\n\n"
+	for item in digest.items[:DIGEST_LIMIT]:
+		time_start = to_local(item.time_start, digest.zone)
+		# Задача, начавшаяся раньше суток, — с датой
+		when = time_start.strftime('%H:%M' if time_start >= day_start else '%d.%m %H:%M')
+		if item.time_end is not None:
+			time_end = to_local(item.time_end, digest.zone)
+			when += "–" + time_end.strftime('%H:%M' if time_end.date() == time_start.date() else '%d.%m %H:%M')
+		text += f"{when} {html.escape(item.title)}"
+		if item.recurring:
+			text += " 🔁"
+		if item.directory is not None:
+			text += f" (📁 {html.escape(item.directory)})"
+		text += "\n"
+	if len(digest.items) > DIGEST_LIMIT:
+		text += f"\n… и ещё {len(digest.items) - DIGEST_LIMIT}"
+	return text
+
+
+async def send_reminders(bot: Bot, reminders: list[DueReminder]) -> None:
+	"""
+	Рассылает пачку напоминаний. Отправки идут в низкоприоритетной очереди outbox
+	и не задерживают ответы пользователям; ошибка одного получателя не мешает остальным.
+	"""
+	with bulk():
+		results = await asyncio.gather(*(
+			bot.send_message(chat_id, format_reminder(reminder, get_zone(reminder.recipient_timezones.get(chat_id))))
+			for reminder in reminders
+			for chat_id in reminder.recipients
+		), return_exceptions=True)
+
+	failed = [result for result in results if isinstance(result, Exception)]
+	for error in failed:
+		if not isinstance(error, TelegramAPIError):
+			logger.error("Unexpected error while sending reminder: %s", error, exc_info=error)
+	if failed:
+		logger.warning("Failed to deliver %d of %d reminder message(s)", len(failed), len(results))
+
+async def send_digests(bot: Bot, digests: list[Digest]) -> None:
+	"""
+	Рассылает пачку дайджестов в низкоприоритетной очереди outbox, как и напоминания.
+	"""
+	with bulk():
+		results = await asyncio.gather(*(
+			bot.send_message(digest.telegram_id, format_digest(digest), parse_mode='HTML')
+			for digest in digests
+		), return_exceptions=True)
+
+	failed = [result for result in results if isinstance(result, Exception)]
+	for error in failed:
+		if not isinstance(error, TelegramAPIError):
+			logger.error("Unexpected error while sending digest: %s", error, exc_info=error)
+	if failed:
+		logger.warning("Failed to deliver %d of %d digest(s)", len(failed), len(results))
@@ -0,0 +1,209 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Iterator, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from pydantic import BaseModel
+
+from dtimebot.logs import main_logger
+
+
+logger = main_logger.getChild('bot.outbox')
+
+
+class Priority(IntEnum):
+	# Ответы пользователю на его действие
+	INTERACTIVE = 0
+	# Рассылки: напоминания, дайджесты, уведомления участников директории
+	BULK = 1
+
+
+_priority: ContextVar[Priority] = ContextVar('outbox_priority', default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def bulk() -> Iterator[None]:
+	"""
+	Отправки внутри блока идут в низкоприоритетную очередь и не задерживают ответы пользователям:
+	`with bulk(): await bot.send_message(...)`
+	"""
+	token = _priority.set(Priority.BULK)
+	try:
+		yield
+	finally:
+		_priority.reset(token)
+
+
+class RateLimitConfig(BaseModel):
+	enabled: bool = True
+	# Глобальный лимит Telegram — около 30 сообщений в секунду, оставляем запас
+	global_rate: float = 25.0
+	global_burst: int = 25
+	# В один чат — не чаще сообщения в секунду, короткие всплески допустимы
+	chat_rate: float = 1.0
+	chat_burst: int = 3
+	# Сколько раз повторять запрос после ответа 429 (retry_after)
+	max_retries: int = 3
+	# Сколько бакетов чатов держать, прежде чем удалять простаивающие
+	max_chats: int = 10_000
+
+
+class _Limiter:
+	"""
+	Токен-бакет с очередью ожидающих: токен получает ожидающий с меньшим Priority, при равенстве — пришедший раньше.
+	"""
+
+	def __init__(self, rate: float, burst: int):
+		self.rate = rate
+		self.burst = burst
+		self._tokens = float(burst)
+		self._updated = time.monotonic()
+		self._blocked_until = 0.0
+		self._waiters: list[tuple[int, int, asyncio.Future]] = []
+		self._seq = itertools.count()
+		self._timer: Optional[asyncio.TimerHandle] = None
+
+	async def acquire(self, priority: Priority) -> None:
+		future = asyncio.get_running_loop().create_future()
+		heapq.heappush(self._waiters, (priority, next(self._seq), future))
+		self._grant()
+		await future
+
+	def block(self, seconds: float) -> None:
+		"""Не выдавать токены seconds секунд (после ответа 429)."""
+		self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+		self._tokens = 0.0
+
+	def waiting(self, priority: Priority) -> int:
+		return sum(1 for p, _, future in self._waiters if p == priority and not future.done())
+
+	def is_idle(self) -> bool:
+		self._refill(time.monotonic())
+		return not self._waiters and self._tokens >= self.burst and self._blocked_until <= self._updated
+
+	def _refill(self, now: float) -> None:
+		self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+		self._updated = now
+
+	def _grant(self) -> None:
+		self._timer = None
+		now = time.monotonic()
+		self._refill(now)
+		while self._waiters:
+			if self._waiters[0][2].done():
+				# Отменённый ожидающий
+				heapq.heappop(self._waiters)
+				continue
+			if now < self._blocked_until:
+				self._schedule(self._blocked_until - now)
+				return
+			if self._tokens < 1:
+				self._schedule((1 - self._tokens) / self.rate)
+				return
+			_, _, future = heapq.heappop(self._waiters)
+			self._tokens -= 1
+			future.set_result(None)
+
+	def _schedule(self, delay: float) -> None:
+		if self._timer is None:
+			self._timer = asyncio.get_running_loop().call_later(delay, self._grant)
+
+
+class OutboxStats(BaseModel):
+	# Сколько запросов сейчас ждут отправки, по приоритетам
+	queued_interactive: int = 0
+	queued_bulk: int = 0
+	sent_interactive: int = 0
+	sent_bulk: int = 0
+	# Сколько раз Telegram ответил 429
+	retry_after: int = 0
+	# Суммарное время ожидания в лимитерах, секунды
+	wait_time_interactive: float = 0.0
+	wait_time_bulk: float = 0.0
+	chats: int = 0
+
+
+class Outbox(BaseRequestMiddleware):
+	"""
+	Планировщик исходящих запросов к Bot API. Подключается к сессии бота (bot.session.middleware),
+	поэтому через него проходят и message.answer в обработчиках, и рассылки.
+	Отправка сообщения в чат ждёт токен бакета этого чата, затем глобального;
+	ответы пользователям (Priority.INTERACTIVE) обгоняют рассылки (Priority.BULK, см. bulk()).
+	При ответе 429 чат блокируется на retry_after и запрос повторяется.
+	"""
+
+	# Методы, на которые распространяются лимиты Telegram на отправку сообщений
+	LIMITED_METHOD_PREFIXES = ('Send', 'Forward', 'Copy', 'Edit')
+
+	def __init__(self, config: RateLimitConfig):
+		self.config = config
+		self._global = _Limiter(config.global_rate, config.global_burst)
+		self._chats: dict[int | str, _Limiter] = {}
+		self._sent = {priority: 0 for priority in Priority}
+		self._wait_time = {priority: 0.0 for priority in Priority}
+		self._retry_after = 0
+
+	async def __call__(
+		self,
+		make_request: NextRequestMiddlewareType[TelegramType],
+		bot: Bot,
+		method: TelegramMethod[TelegramType],
+	) -> Response[TelegramType]:
+		chat_id = getattr(method, 'chat_id', None)
+		if chat_id is None or not type(method).__name__.startswith(self.LIMITED_METHOD_PREFIXES):
+			return await make_request(bot, method)
+
+		priority = _priority.get()
+		chat = self._chat_limiter(chat_id)
+		attempt = 0
+		while True:
+			started = time.monotonic()
+			await chat.acquire(priority)
+			await self._global.acquire(priority)
+			self._wait_time[priority] += time.monotonic() - started
+
+			try:
+				response = await make_request(bot, method)
+			except TelegramRetryAfter as e:
+				self._retry_after += 1
+				chat.block(e.retry_after)
+				if attempt >= self.config.max_retries:
+					raise
+				attempt += 1
+				logger.warning("Flood control for chat %s, retry %d in %ss", chat_id, attempt, e.retry_after)
+				continue
+
+			self._sent[priority] += 1
+			return response
+
+	def stats(self) -> OutboxStats:
+		return OutboxStats(
+			queued_interactive=self._waiting(Priority.INTERACTIVE),
+			queued_bulk=self._waiting(Priority.BULK),
+			sent_interactive=self._sent[Priority.INTERACTIVE],
+			sent_bulk=self._sent[Priority.BULK],
+			retry_after=self._retry_after,
+			wait_time_interactive=self._wait_time[Priority.INTERACTIVE],
+			wait_time_bulk=self._wait_time[Priority.BULK],
+			chats=len(self._chats),
+		)
+
+	def _waiting(self, priority: Priority) -> int:
+		return self._global.waiting(priority) + sum(limiter.waiting(priority) for limiter in self._chats.values())
+
+	def _chat_limiter(self, chat_id: int | str) -> _Limiter:
+		limiter = self._chats.get(chat_id)
+		if limiter is None:
+			if len(self._chats) >= self.config.max_chats:
+				self._chats = {key: value for key, value in self._chats.items() if not value.is_idle()}
+			limiter = self._chats[chat_id] = _Limiter(self.config.chat_rate, self.config.chat_burst)
+		return limiter
@@ -0,0 +1,163 @@
+import copy
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from dtimebot.database import after_rollback, commit, get_session, merge_row, supports_upsert, upsert
+from dtimebot.logs import main_logger
+from dtimebot.models.fsm import FSMRecord
+
+
+logger = main_logger.getChild('bot.storage')
+
+
+@dataclass
+class _Entry:
+	state: Optional[str] = None
+	data: Dict[str, Any] = field(default_factory=dict)
+	updated_at: Optional[datetime] = None
+
+
+def _encode_value(value: Any) -> Any:
+	if isinstance(value, datetime):
+		return {'__datetime__': value.isoformat()}
+	raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+	if obj.keys() == {'__datetime__'}:
+		return datetime.fromisoformat(obj['__datetime__'])
+	return obj
+
+
+class DatabaseStorage(BaseStorage):
+	"""
+	FSM-хранилище в нашей БД: незавершённые сценарии (/create_task, /invite, ...) переживают перезапуск бота.
+	Запись сразу уходит в БД (внутри unit_of_work — в транзакции апдейта; при её откате запись убирается
+	и из кэша), чтение идёт через LRU-кэш горячих ключей. Состояния, не менявшиеся дольше ttl, считаются
+	брошенными: они не возвращаются и удаляются evict_expired().
+	Кэш рассчитан на один процесс бота; при нескольких процессах задайте cache_size=0.
+	"""
+
+	def __init__(self, ttl: timedelta, cache_size: int = 1024, key_builder: Optional[KeyBuilder] = None):
+		self.ttl = ttl
+		self.cache_size = cache_size
+		self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+		self._cache: OrderedDict[str, _Entry] = OrderedDict()
+
+	async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+		entry = await self._load(key)
+		await self._save(key, _Entry(state.state if isinstance(state, State) else state, entry.data), entry)
+
+	async def get_state(self, key: StorageKey) -> Optional[str]:
+		entry = await self._load(key)
+		return entry.state
+
+	async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+		if not isinstance(data, dict):
+			raise DataNotDictLikeError(f'Data must be a dict or dict-like object, got {type(data).__name__}')
+		entry = await self._load(key)
+		await self._save(key, _Entry(entry.state, copy.deepcopy(dict(data))), entry)
+
+	async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+		entry = await self._load(key)
+		return copy.deepcopy(entry.data)
+
+	async def close(self) -> None:
+		self._cache.clear()
+
+	async def evict_expired(self) -> int:
+		"""
+		Удаляет брошенные состояния из БД и кэша.
+		Кэш и БД чистятся по updated_at независимо: состояния, которого нет в БД, в кэше не бывает —
+		запись откаченной транзакции убирается из кэша при откате (after_rollback в _save(), в том числе
+		при откате после ошибки посреди единицы работы), а запись незавершённой транзакции моложе ttl.
+		:return: Количество удалённых записей в БД.
+		"""
+		threshold = datetime.utcnow() - self.ttl
+		for cache_key in [k for k, entry in self._cache.items() if entry.updated_at and entry.updated_at < threshold]:
+			del self._cache[cache_key]
+
+		try:
+			async with get_session() as session:
+				res = await session.execute(delete(FSMRecord).where(FSMRecord.updated_at < threshold))
+				await commit(session)
+		except SQLAlchemyError as e:
+			logger.exception("Error while evicting expired FSM states: %s", e)
+			return 0
+
+		if res.rowcount:
+			logger.info("Evicted %d expired FSM state(s)", res.rowcount)
+		return res.rowcount
+
+	async def _load(self, key: StorageKey) -> _Entry:
+		cache_key = self.key_builder.build(key)
+		entry = self._cache.get(cache_key)
+		if entry is None:
+			async with get_session() as session:
+				res = await session.execute(
+					select(FSMRecord.state, FSMRecord.data, FSMRecord.updated_at).where(FSMRecord.key == cache_key)
+				)
+				row = res.one_or_none()
+			if row is None:
+				entry = _Entry()
+			else:
+				entry = _Entry(row.state, json.loads(row.data, object_hook=_decode_object) if row.data else {}, row.updated_at)
+
+		if self._is_expired(entry):
+			entry = _Entry()
+		self._remember(cache_key, entry)
+		return entry
+
+	async def _save(self, key: StorageKey, entry: _Entry, previous: _Entry) -> None:
+		if entry.state == previous.state and entry.data == previous.data:
+			# Например, state.clear() без активного сценария — писать в БД нечего
+			return
+
+		cache_key = self.key_builder.build(key)
+		entry.updated_at = datetime.utcnow()
+
+		async with get_session() as session:
+			if entry.state is None and not entry.data:
+				# Пустое состояние не храним — как после state.clear() в MemoryStorage
+				await session.execute(delete(FSMRecord).where(FSMRecord.key == cache_key))
+			else:
+				values = {
+					'state': entry.state,
+					'data': json.dumps(entry.data, default=_encode_value, ensure_ascii=False),
+					'updated_at': entry.updated_at,
+				}
+				if supports_upsert(session):
+					stmt = upsert(session, FSMRecord).values(key=cache_key, **values)
+					await session.execute(stmt.on_conflict_do_update(index_elements=[FSMRecord.key], set_=values))
+				else:
+					await merge_row(session, FSMRecord, {'key': cache_key}, values)
+			await commit(session)
+
+		self._remember(cache_key, entry)
+		# Если транзакция апдейта откатится, в БД останется прежнее состояние — кэш не должен его подменять
+		after_rollback(lambda: self._forget(cache_key, entry))
+
+	def _is_expired(self, entry: _Entry) -> bool:
+		return entry.updated_at is not None and datetime.utcnow() - entry.updated_at > self.ttl
+
+	def _forget(self, cache_key: str, entry: _Entry) -> None:
+		"""Убирает из кэша запись entry, если её ещё не заменила более новая."""
+		if self._cache.get(cache_key) is entry:
+			del self._cache[cache_key]
+
+	def _remember(self, cache_key: str, entry: _Entry) -> None:
+		if self.cache_size <= 0:
+			return
+		self._cache[cache_key] = entry
+		self._cache.move_to_end(cache_key)
+		while len(self._cache) > self.cache_size:
+			self._cache.popitem(last=False)
@@ -0,0 +1,91 @@
+import asyncio
+import hmac
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import BaseModel, Field, ValidationError
+
+from dtimebot.logs import main_logger
+
+
+logger = main_logger.getChild('bot.webhook')
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookConfig(BaseModel):
+	# Публичный HTTPS-адрес, который получит Telegram в setWebhook (например, за reverse proxy)
+	url: str
+	# Telegram присылает его в заголовке X-Telegram-Bot-Api-Secret-Token каждого запроса
+	secret_token: str = Field(pattern=r'^[A-Za-z0-9_-]{1,256}$')
+	host: str = '127.0.0.1'
+	port: int = 8080
+	path: str = '/webhook'
+	# Сколько апдейтов обрабатывается одновременно (и max_connections в setWebhook)
+	workers: int = Field(16, ge=1, le=100)
+	drop_pending_updates: bool = False
+
+
+class WebhookServer:
+	"""
+	Встроенный aiohttp-сервер для режима webhook.
+	Апдейт обрабатывается (dp.feed_update) до ответа на запрос: если процесс упадёт во время обработки,
+	Telegram не получит 200 и доставит апдейт повторно, так что принятый апдейт не теряется (at-least-once).
+	Одновременно обрабатывается не больше `workers` апдейтов, остальные запросы ждут.
+	Ошибка обработчика всё равно отвечает 200, как при polling: иначе Telegram повторял бы апдейт,
+	который не удаётся обработать.
+	"""
+
+	def __init__(self, dispatcher: Dispatcher, bot: Bot, config: WebhookConfig):
+		self.dispatcher = dispatcher
+		self.bot = bot
+		self.config = config
+		self._slots = asyncio.Semaphore(config.workers)
+		self._runner: Optional[web.AppRunner] = None
+
+	def make_app(self) -> web.Application:
+		app = web.Application()
+		app.router.add_post(self.config.path, self._handle)
+		return app
+
+	async def start(self) -> None:
+		self._runner = web.AppRunner(self.make_app(), access_log=None)
+		await self._runner.setup()
+		site = web.TCPSite(self._runner, self.config.host, self.config.port)
+		await site.start()
+		logger.info(
+			"Webhook server listening on %s:%s%s (%d workers)",
+			self.config.host, self.config.port, self.config.path, self.config.workers
+		)
+
+	async def stop(self) -> None:
+		"""
+		Перестаёт принимать запросы и ждёт обрабатываемые апдейты (до shutdown_timeout aiohttp);
+		прерванные Telegram доставит повторно.
+		"""
+		if self._runner is not None:
+			await self._runner.cleanup()
+			self._runner = None
+		logger.info("Webhook server stopped")
+
+	async def _handle(self, request: web.Request) -> web.Response:
+		secret = request.headers.get(SECRET_TOKEN_HEADER, '')
+		# Байты: compare_digest не принимает строки с не-ASCII символами
+		if not hmac.compare_digest(secret.encode(), self.config.secret_token.encode()):
+			logger.warning("Rejected webhook request from %s: bad secret token", request.remote)
+			return web.Response(status=401)
+
+		try:
+			update = Update.model_validate(await request.json(), context={'bot': self.bot})
+		except (ValueError, ValidationError) as e:
+			logger.warning("Rejected malformed webhook update: %s", e)
+			return web.Response(status=400)
+
+		async with self._slots:
+			try:
+				await self.dispatcher.feed_update(self.bot, update, dispatcher=self.dispatcher)
+			except Exception as e:
+				logger.exception("Error while processing update id=%s: %s", update.update_id, e)
+		return web.Response()
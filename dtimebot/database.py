@@ -1,15 +1,76 @@
-from typing import Optional, AsyncGenerator
+import asyncio
+import functools
+import importlib
+import pkgutil
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, AsyncGenerator
 from pydantic import BaseModel
-from sqlalchemy import Text, TypeDecorator, JSON
+from sqlalchemy import Column, Connection, DateTime, Engine, Index, Integer, MetaData, String, Table, Text, TypeDecorator, JSON, event, func, insert, inspect, select, text, update
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.schema import CreateIndex
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
 
 from dtimebot import configs
 from dtimebot.logs import main_logger
 
+class SQLitePragmasConfig(BaseModel):
+    """
+    PRAGMA, выполняемые на каждом новом подключении к SQLite. Значение None — оставить значение SQLite по умолчанию.
+    """
+    # Ожидание снятия блокировки (мс) вместо немедленной ошибки "database is locked"
+    busy_timeout: Optional[int] = 5000
+    # WAL: читатели не блокируют писателя и наоборот
+    journal_mode: Optional[str] = 'WAL'
+    # NORMAL в режиме WAL безопасен при падении процесса и не делает fsync на каждый коммит
+    synchronous: Optional[str] = 'NORMAL'
+    # Отрицательное значение — размер в КиБ (64 МиБ)
+    cache_size: Optional[int] = -64000
+    mmap_size: Optional[int] = 256 * 1024 * 1024
+    temp_store: Optional[str] = 'MEMORY'
+
+    def statements(self) -> list[str]:
+        return [f'PRAGMA {name} = {value}' for name, value in self.model_dump().items() if value is not None]
+
+
+class EngineConfig(BaseModel):
+    """
+    Параметры движка и пула подключений. Значение None — значение по умолчанию для диалекта (см. ENGINE_DEFAULTS).
+    """
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    # Сколько секунд ждать свободное подключение, прежде чем выбросить TimeoutError
+    pool_timeout: Optional[float] = None
+    # Переоткрывать подключения старше N секунд (-1 — никогда)
+    pool_recycle: Optional[int] = None
+    # Проверять подключение перед выдачей из пула
+    pool_pre_ping: Optional[bool] = None
+    # Размер кэша скомпилированных SQL-выражений SQLAlchemy
+    query_cache_size: Optional[int] = None
+    # Размер кэша подготовленных выражений на подключение (только asyncpg; 0 — для pgbouncer в режиме transaction)
+    prepared_statement_cache_size: Optional[int] = None
+
+
+# Значения по умолчанию по имени бэкенда; для остальных бэкендов используется 'default'.
+# SQLite — локальный файл: проверять и переоткрывать подключения незачем, а больше пары писателей всё равно не пройдёт.
+# Сетевые СУБД — подключения рвутся по таймаутам сервера и прокси, поэтому pre-ping и recycle.
+ENGINE_DEFAULTS: dict[str, dict[str, Any]] = {
+    'sqlite': dict(pool_size=5, max_overflow=5, pool_timeout=30, pool_recycle=-1, pool_pre_ping=False, query_cache_size=500),
+    'postgresql': dict(pool_size=10, max_overflow=20, pool_timeout=30, pool_recycle=1800, pool_pre_ping=True, query_cache_size=1000, prepared_statement_cache_size=256),
+    'default': dict(pool_size=10, max_overflow=20, pool_timeout=30, pool_recycle=1800, pool_pre_ping=True, query_cache_size=1000),
+}
+
+
 class DatabaseConfig(BaseModel):
     url: str
+    engine: EngineConfig = EngineConfig()
+    sqlite_pragmas: SQLitePragmasConfig = SQLitePragmasConfig()
 
 config: Optional[DatabaseConfig] = None
 
@@ -31,10 +92,14 @@ async def start() -> None:
     config = DatabaseConfig.model_validate(configs.get('database'))
 
     logger.info('Initializing engine...')
+    url = make_url(config.url)
     engine = create_async_engine(
-        url=config.url,
-        future=True
+        url=url,
+        future=True,
+        **engine_options(url, config.engine)
     )
+    if engine.dialect.name == 'sqlite':
+        apply_sqlite_pragmas(engine.sync_engine, config.sqlite_pragmas)
     logger.info('Engine initialized')
 
     logger.info('Initializing async session maker...')
@@ -44,20 +109,375 @@ async def start() -> None:
     logger.info('Database started')
 
 
+def engine_options(url: URL, engine_config: EngineConfig) -> dict[str, Any]:
+    """
+    Аргументы create_async_engine: значения из конфига поверх значений по умолчанию для диалекта.
+    """
+    defaults = ENGINE_DEFAULTS.get(url.get_backend_name(), ENGINE_DEFAULTS['default'])
+    values = {**defaults, **engine_config.model_dump(exclude_none=True)}
+
+    options: dict[str, Any] = {
+        'query_cache_size': values['query_cache_size'],
+        'pool_recycle': values['pool_recycle'],
+        'pool_pre_ping': values['pool_pre_ping'],
+    }
+
+    # In-memory SQLite использует StaticPool с единственным подключением — размеры пула к нему неприменимы
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=values['pool_size'],
+            max_overflow=values['max_overflow'],
+            pool_timeout=values['pool_timeout'],
+        )
+
+    if url.get_driver_name() == 'asyncpg' and 'prepared_statement_cache_size' in values:
+        options['connect_args'] = {'prepared_statement_cache_size': values['prepared_statement_cache_size']}
+
+    return options
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул подключений, который считает выдачи подключений и время их ожидания (включая открытие нового подключения).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+
+
+class PoolStats(BaseModel):
+    pool: str
+    # None — у пула нет такого показателя (например, StaticPool для in-memory SQLite)
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+
+    @property
+    def wait_time_avg(self) -> float:
+        return self.wait_time_total / self.checkouts if self.checkouts else 0.0
+
+
+def get_pool_stats() -> Optional[PoolStats]:
+    """
+    Текущее состояние пула подключений. Счётчики ожидания накапливаются с момента создания пула.
+    :return: None, если БД ещё не запущена.
+    """
+    if engine is None:
+        return None
+
+    pool = engine.pool
+    stats = PoolStats(pool=type(pool).__name__)
+    if isinstance(pool, QueuePool):
+        stats.size = pool.size()
+        stats.checked_in = pool.checkedin()
+        stats.checked_out = pool.checkedout()
+        stats.overflow = pool.overflow()
+    if isinstance(pool, TimedQueuePool):
+        stats.checkouts = pool.checkouts
+        stats.timeouts = pool.timeouts
+        stats.wait_time_total = pool.wait_time_total
+        stats.wait_time_max = pool.wait_time_max
+    return stats
+
+
+def apply_sqlite_pragmas(sync_engine: Engine, pragmas: SQLitePragmasConfig) -> None:
+    """
+    Регистрирует выполнение PRAGMA на каждом подключении пула (PRAGMA действуют в пределах подключения).
+    """
+    statements = pragmas.statements()
+    if not statements:
+        return
+
+    @event.listens_for(sync_engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    logger.info('SQLite pragmas: %s', '; '.join(statements))
+
+
 @asynccontextmanager
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Асинхронный контекст-менеджер для получения сессии.
     Используйте: `async with get_session() as session:`
+    Внутри unit_of_work() возвращает сессию единицы работы вместо новой.
     """
     global LocalSession
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        async with uow.use() as session:
+            try:
+                yield session
+            except SQLAlchemyError:
+                # После ошибки транзакция непригодна для следующих вызовов: откатываем её
+                # (с after_rollback — кэши не должны хранить откаченное до ошибки).
+                # Объекты отсоединяем заранее, иначе rollback пометит их устаревшими
+                # и обращение к атрибутам (например, user.id в обработчике) потребует запроса к БД.
+                session.expunge_all()
+                await uow.end_transaction(commit=False)
+                raise
+        return
+
     if LocalSession is None:
         raise RuntimeError('Database session maker is not initialized. Call dtimebot.database.start() first.')
     async with LocalSession() as session:
         yield session
 
 
+def supports_upsert(session: AsyncSession) -> bool:
+    """Поддерживает ли диалект сессии INSERT ... ON CONFLICT (см. upsert())."""
+    return session.bind.dialect.name in ('postgresql', 'sqlite')
+
+
+def upsert(session: AsyncSession, model):
+    """
+    INSERT с поддержкой ON CONFLICT (on_conflict_do_nothing / on_conflict_do_update) для диалекта сессии.
+    Только для диалектов, где supports_upsert(); для остальных — insert_ignore() и merge_row().
+    """
+    dialect = session.bind.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f'INSERT ... ON CONFLICT is not supported for dialect {dialect}')
+    return dialect_insert(model)
+
+
+async def insert_ignore(session: AsyncSession, model, values: dict) -> bool:
+    """
+    Переносимая замена INSERT ... ON CONFLICT DO NOTHING: вставка в точке сохранения, которая
+    откатывается, если строку с тем же уникальным ключом уже вставила параллельная транзакция.
+    :return: True, если строка вставлена.
+    """
+    try:
+        async with session.begin_nested():
+            await session.execute(insert(model).values(**values))
+    except IntegrityError:
+        return False
+    return True
+
+
+async def merge_row(session: AsyncSession, model, key: dict, values: dict) -> None:
+    """
+    Переносимая замена INSERT ... ON CONFLICT DO UPDATE: UPDATE по ключу, если строки нет — вставка,
+    а если её опередила параллельная вставка — снова UPDATE.
+    """
+    stmt = (
+        update(model)
+        .where(*(getattr(model, name) == value for name, value in key.items()))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    res = await session.execute(stmt)
+    if res.rowcount:
+        return
+    if not await insert_ignore(session, model, {**key, **values}):
+        await session.execute(stmt)
+
+
+async def commit(session: AsyncSession) -> None:
+    """
+    Зафиксировать изменения, сделанные сервисом.
+    Для сессии unit_of_work() выполняется только flush (id и server_default становятся доступны),
+    а фиксация происходит один раз — при выходе из единицы работы.
+    """
+    uow = _current_unit_of_work.get()
+    if uow is not None and uow.session is session:
+        await session.flush()
+    else:
+        await session.commit()
+
+
+class UnitOfWork:
+    """
+    Общая сессия единицы работы (например, одного апдейта).
+    Задачи, запущенные внутри (например, через asyncio.gather), получают доступ к сессии по очереди:
+    AsyncSession не допускает конкурентных операций. Повторный вход из той же задачи не блокируется.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._lock = asyncio.Lock()
+        self._owner: Optional[asyncio.Task] = None
+        self._depth = 0
+        # Вызываются после фиксации транзакции единицы работы / после её отката / после завершения в любом случае
+        self._after_commit: list[Callable[[], None]] = []
+        self._after_rollback: list[Callable[[], None]] = []
+        self._after_transaction: list[Callable[[], None]] = []
+
+    @asynccontextmanager
+    async def use(self) -> AsyncGenerator[AsyncSession, None]:
+        task = asyncio.current_task()
+        if self._owner is not task:
+            await self._lock.acquire()
+            self._owner = task
+        self._depth += 1
+        try:
+            yield self.session
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._lock.release()
+
+    async def end_transaction(self, commit: bool) -> bool:
+        """
+        Фиксирует (commit=True) или откатывает текущую транзакцию сессии и выполняет отложенные
+        after_commit / after_rollback / cache_invalidation. Вызывать под use().
+        :return: True, если транзакция зафиксирована.
+        """
+        committed = False
+        try:
+            if commit:
+                try:
+                    await self.session.commit()
+                    committed = True
+                except SQLAlchemyError as e:
+                    # Ошибку уже мог обработать сервис (вернув None), но транзакция после неё не фиксируется
+                    logger.exception('Failed to commit unit of work: %s', e)
+                    await self.session.rollback()
+            else:
+                await self.session.rollback()
+        finally:
+            callbacks = (self._after_commit if committed else self._after_rollback) + self._after_transaction
+            self._after_commit, self._after_rollback, self._after_transaction = [], [], []
+            _run_callbacks(callbacks)
+        return committed
+
+
+_current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar('unit_of_work', default=None)
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """
+    Выполняет callback после фиксации текущей единицы работы (при откате — не выполняет).
+    Вне unit_of_work() commit() сервиса уже зафиксировал транзакцию, и callback выполняется сразу.
+    """
+    uow = _current_unit_of_work.get()
+    if uow is None:
+        callback()
+    else:
+        uow._after_commit.append(callback)
+
+
+def after_rollback(callback: Callable[[], None]) -> None:
+    """
+    Выполняет callback, если текущая единица работы завершится без фиксации (откат или ошибка COMMIT).
+    Вне unit_of_work() ничего не делает: commit() сервиса уже зафиксировал транзакцию.
+    """
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        uow._after_rollback.append(callback)
+
+
+def cache_invalidation(function: Callable[..., None]) -> Callable[..., None]:
+    """
+    Декоратор сброса кэша по записанным данным: сброс выполняется сразу (следующие чтения той же
+    единицы работы видят её изменения) и ещё раз по завершении транзакции единицы работы — фиксации или отката.
+    Иначе чтение другой сессии до фиксации или чтение незафиксированных данных, которые затем откатились,
+    осталось бы в кэше до истечения его TTL.
+    Кэши со сбросом через этот декоратор рассчитаны на один процесс: изменения других экземпляров бота
+    они не видят до истечения своего CACHE_TTL.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs) -> None:
+        function(*args, **kwargs)
+        uow = _current_unit_of_work.get()
+        if uow is not None:
+            uow._after_transaction.append(functools.partial(function, *args, **kwargs))
+    return wrapper
+
+
+def _run_callbacks(callbacks: list[Callable[[], None]]) -> None:
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.exception('Unit of work callback %r failed: %s', callback, e)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Одна сессия и одна транзакция на блок: все get_session() внутри используют её,
+    commit() сервисов превращается во flush, а фиксация выполняется при выходе.
+    При исключении изменения откатываются; ошибка БД в сервисе откатывает сделанное до неё,
+    после чего работа продолжается в новой транзакции. Вложенный вызов использует внешнюю единицу работы.
+    """
+    global LocalSession
+    outer = _current_unit_of_work.get()
+    if outer is not None:
+        yield outer.session
+        return
+
+    if LocalSession is None:
+        raise RuntimeError('Database session maker is not initialized. Call dtimebot.database.start() first.')
+    async with LocalSession() as session:
+        uow = UnitOfWork(session)
+        token = _current_unit_of_work.set(uow)
+        try:
+            try:
+                yield session
+            except BaseException:
+                async with uow.use():
+                    await uow.end_transaction(commit=False)
+                raise
+
+            async with uow.use():
+                await uow.end_transaction(commit=True)
+        finally:
+            _current_unit_of_work.reset(token)
+
+
+async def commit_unit_of_work() -> None:
+    """
+    Фиксирует изменения, уже сделанные в текущей единице работы, не завершая её: дальше она работает
+    в новой транзакции, и откат при ошибке затронет только последующие изменения.
+    Вызывается перед сетевым вводом-выводом (запросами к Bot API), чтобы транзакция — а на SQLite
+    блокировка записи — не держалась во время ожидания ответа и лимитов отправки.
+    Вне unit_of_work() и без открытой транзакции ничего не делает.
+    """
+    uow = _current_unit_of_work.get()
+    if uow is None:
+        return
+    async with uow.use():
+        if uow.session.in_transaction():
+            await uow.end_transaction(commit=True)
+
+
 async def update_models() -> None:
+    """
+    Приводит схему БД к актуальной версии, применяя недостающие миграции из `dtimebot.migrations`.
+    """
     logger.info('Updating models...')
     global Base, engine
 
@@ -66,27 +486,188 @@ async def update_models() -> None:
 
     from dtimebot import models  # noqa: F401
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await migrate()
     logger.info('Models updated')
 
 
+# --- Миграции ---
+
+migration_metadata = MetaData()
+
+schema_migration = Table(
+    'schema_migration', migration_metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(128), nullable=False),
+    Column('applied_at', DateTime, nullable=False, server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+    # False — миграция выполняется вне транзакции (нужно, например, для CREATE INDEX CONCURRENTLY)
+    transactional: bool = True
+
+
+def load_migrations() -> list[Migration]:
+    """
+    Находит миграции в пакете `dtimebot.migrations`.
+    Модуль `vNNNN_<name>.py` — миграция версии NNNN; он должен объявлять `upgrade(conn)`
+    и может объявить `transactional = False`.
+    """
+    from dtimebot import migrations
+
+    result: list[Migration] = []
+    for module_info in pkgutil.iter_modules(migrations.__path__):
+        match = re.fullmatch(r'v(\d+)_(\w+)', module_info.name)
+        if match is None:
+            continue
+        module = importlib.import_module(f'{migrations.__name__}.{module_info.name}')
+        result.append(Migration(
+            version=int(match.group(1)),
+            name=match.group(2),
+            upgrade=module.upgrade,
+            transactional=getattr(module, 'transactional', True),
+        ))
+
+    result.sort(key=lambda m: m.version)
+    versions = [m.version for m in result]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f'Duplicate migration versions: {versions}')
+    return result
+
+
+# Ключ pg_advisory_lock, под которым выполняются миграции (произвольная константа приложения)
+MIGRATION_LOCK_KEY = 0x64746d62
+
+
+async def migrate() -> list[int]:
+    """
+    Применяет ещё не применённые миграции по порядку. Повторный запуск ничего не делает.
+    Одновременно запущенные экземпляры не применяют миграции дважды: применённые версии перечитываются
+    под блокировкой (pg_advisory_lock на PostgreSQL, BEGIN IMMEDIATE на SQLite).
+    :return: Версии применённых миграций.
+    """
+    global engine
+
+    if engine is None:
+        raise RuntimeError('Engine is not initialized. Call dtimebot.database.start() first.')
+
+    migrations = load_migrations()
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level='AUTOCOMMIT')
+        if engine.dialect.name == 'sqlite':
+            # Пока подключение держит блокировку записи, другие подключения писать не могут,
+            # поэтому на SQLite все миграции выполняются в нём же, одной транзакцией
+            await lock_conn.exec_driver_sql('BEGIN IMMEDIATE')
+            try:
+                pending = await _pending_migrations(lock_conn, migrations)
+                for migration in pending:
+                    await _apply_migration(lock_conn, migration)
+            except BaseException:
+                await lock_conn.exec_driver_sql('ROLLBACK')
+                raise
+            await lock_conn.exec_driver_sql('COMMIT')
+        else:
+            locked = engine.dialect.name == 'postgresql'
+            if locked:
+                await lock_conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            try:
+                pending = await _pending_migrations(lock_conn, migrations)
+                for migration in pending:
+                    if migration.transactional:
+                        async with engine.begin() as conn:
+                            await _apply_migration(conn, migration)
+                    else:
+                        # Шаги такой миграции должны быть идемпотентными: при сбое она будет выполнена заново
+                        async with engine.connect() as conn:
+                            conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+                            await _apply_migration(conn, migration)
+            finally:
+                if locked:
+                    await lock_conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+
+    if not pending:
+        logger.info('Database schema is up to date')
+        return []
+    logger.info('Applied %d migration(s)', len(pending))
+    return [m.version for m in pending]
+
+
+async def _pending_migrations(conn, migrations: list[Migration]) -> list[Migration]:
+    """Миграции, ещё не отмеченные в schema_migration (читать под блокировкой миграций)."""
+    await conn.run_sync(migration_metadata.create_all)
+    res = await conn.execute(select(schema_migration.c.version))
+    applied = set(res.scalars().all())
+    return [m for m in migrations if m.version not in applied]
+
+
+async def _apply_migration(conn, migration: Migration) -> None:
+    logger.info('Applying migration %04d_%s...', migration.version, migration.name)
+    await conn.run_sync(migration.upgrade)
+    await conn.execute(insert(schema_migration).values(version=migration.version, name=migration.name))
+
+
+def create_index(conn: Connection, index: Index) -> None:
+    """
+    Идемпотентно создаёт индекс (IF NOT EXISTS).
+    На PostgreSQL вне транзакции использует CREATE INDEX CONCURRENTLY, чтобы не блокировать запись в таблицу.
+    """
+    concurrently = conn.dialect.name == 'postgresql' and not conn.in_transaction()
+    if not concurrently:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+        return
+
+    options = index.dialect_options['postgresql']
+    previous = options['concurrently']
+    options['concurrently'] = True
+    try:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+    finally:
+        options['concurrently'] = previous
+
+
+def add_column(conn: Connection, table: Table, column_name: str) -> None:
+    """
+    Идемпотентно добавляет в существующую таблицу колонку, объявленную в table (замороженном определении миграции).
+    """
+    existing = {c['name'] for c in inspect(conn).get_columns(table.name)}
+    if column_name in existing:
+        return
+
+    column = table.c[column_name]
+    column_type = column.type.compile(dialect=conn.dialect)
+    ddl = f'ALTER TABLE {conn.dialect.identifier_preparer.format_table(table)} ADD COLUMN {conn.dialect.identifier_preparer.format_column(column)} {column_type}'
+    conn.execute(text(ddl))
+
+
 async def stop() -> None:
     logger.info('Stopping database...')
     if engine is not None:
+        stats = get_pool_stats()
+        logger.info(
+            'Pool stats: %d checkouts, %d timeouts, wait avg %.1f ms, max %.1f ms',
+            stats.checkouts, stats.timeouts, stats.wait_time_avg * 1000, stats.wait_time_max * 1000
+        )
         await engine.dispose()
     logger.info('Database stopped')
 
 
 class JSONModel(TypeDecorator):
     impl = JSON
+    # Состояние типа — только класс модели, его можно использовать в ключе кэша запросов
+    cache_ok = True
 
     def __init__(self, pydantic_model: type[BaseModel], *args, **kwargs):
+        # None — SQL NULL, а не JSON 'null': иначе условия IS NULL / IS NOT NULL не работают
+        kwargs.setdefault('none_as_null', True)
         super().__init__(*args, **kwargs)
         self.pydantic_model = pydantic_model
 
     def process_bind_param(self, value: BaseModel | None, dialect):
-        return value.model_dump() if value is not None else None
+        return value.model_dump(mode='json') if value is not None else None
 
     def process_result_value(self, value: dict | None, dialect):
         return self.pydantic_model.model_validate(value) if value is not None else None
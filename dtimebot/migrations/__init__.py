@@ -0,0 +1,10 @@
+"""
+Версионные миграции схемы БД.
+
+Каждая миграция — модуль `vNNNN_<name>.py` с функцией `upgrade(conn)`, где conn — синхронное
+подключение SQLAlchemy. Миграции применяются по возрастанию NNNN функцией `dtimebot.database.migrate()`,
+применённые версии хранятся в таблице `schema_migration`.
+Шаги миграций должны быть идемпотентными (см. `database.create_index`, `database.add_column`).
+Миграции не импортируют модели: таблицы, колонки и индексы описываются в самой миграции такими,
+какими они были на момент миграции, чтобы её результат не менялся вместе с моделями.
+"""
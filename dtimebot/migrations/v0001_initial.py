@@ -0,0 +1,108 @@
+from sqlalchemy import JSON, BigInteger, Boolean, Column, Connection, DateTime, ForeignKey, Integer, MetaData, String, Table, func
+
+
+# Схема до версионных миграций (таблицы, которые создавал Base.metadata.create_all).
+# Определения заморожены: изменения моделей добавляются следующими миграциями
+metadata = MetaData()
+
+Table(
+	'user', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('telegram_id', BigInteger, nullable=False, unique=True),
+	Column('created_at', DateTime, nullable=False, server_default=func.now()),
+	Column('deleted_at', DateTime),
+	Column('first_name', String, nullable=True),
+	Column('username', String, nullable=True),
+)
+
+Table(
+	'directory', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('owner_id', ForeignKey('user.id'), nullable=False),
+	Column('name', String(128), nullable=False),
+	Column('description', String(256), nullable=False),
+	Column('is_self', Boolean, nullable=False),
+	Column('created_at', DateTime, nullable=False, server_default=func.now()),
+)
+
+Table(
+	'directory_tag', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('directory_id', ForeignKey('directory.id'), nullable=False),
+	Column('tag', String(64), nullable=False),
+)
+
+Table(
+	'activity', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('owner_id', ForeignKey('user.id'), nullable=False),
+	Column('title', String(128), nullable=False),
+	Column('description', String(256)),
+	Column('time_start', DateTime, nullable=False),
+	Column('time_end', DateTime),
+	Column('embed', JSON, nullable=False),
+	Column('created_at', DateTime, nullable=False, server_default=func.now()),
+)
+
+Table(
+	'activity_tag', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('activity_id', ForeignKey('activity.id'), nullable=False),
+	Column('tag', String(64), nullable=False),
+)
+
+Table(
+	'task', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('owner_id', ForeignKey('user.id'), nullable=False),
+	Column('directory_id', ForeignKey('directory.id'), nullable=True),
+	Column('title', String(128), nullable=False),
+	Column('description', String(256)),
+	Column('time_start', DateTime),
+	Column('time_end', DateTime),
+	Column('embed', JSON, nullable=True),
+	Column('created_at', DateTime, nullable=False, server_default=func.now()),
+)
+
+Table(
+	'task_tag', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('task_id', ForeignKey('task.id'), nullable=False),
+	Column('tag', String(64), nullable=False),
+)
+
+Table(
+	'invitation', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('owner_id', ForeignKey('user.id'), nullable=False),
+	Column('directory_id', ForeignKey('directory.id'), nullable=False),
+	Column('filter', String(128)),
+	Column('valid_until', DateTime),
+	Column('max_uses', Integer),
+	Column('used_count', Integer, nullable=False),
+	Column('code', String(64), nullable=False),
+	Column('created_at', DateTime, nullable=False, server_default=func.now()),
+)
+
+Table(
+	'member', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('directory_id', ForeignKey('directory.id'), nullable=False),
+	Column('user_id', ForeignKey('user.id'), nullable=False),
+	Column('invitation_id', ForeignKey('invitation.id'), nullable=True),
+	Column('is_active', Boolean, nullable=False),
+	Column('deleted_at', DateTime),
+	Column('created_at', DateTime, nullable=False, server_default=func.now()),
+)
+
+Table(
+	'member_tag', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('member_id', ForeignKey('member.id'), nullable=False),
+	Column('tag', String(64), nullable=False),
+)
+
+
+def upgrade(conn: Connection) -> None:
+	# Создаёт недостающие таблицы; существующие таблицы не изменяются
+	metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,64 @@
+import secrets
+import string
+
+from sqlalchemy import Column, Connection, Index, MetaData, Table, text
+
+from dtimebot.database import create_index
+
+
+transactional = False
+
+# Только колонки, нужные для индексов этой миграции
+metadata = MetaData()
+task = Table('task', metadata, Column('owner_id'), Column('directory_id'), Column('time_start'))
+task_tag = Table('task_tag', metadata, Column('task_id'), Column('tag'))
+directory = Table('directory', metadata, Column('owner_id'), Column('is_self'))
+directory_tag = Table('directory_tag', metadata, Column('directory_id'), Column('tag'))
+member = Table('member', metadata, Column('directory_id'), Column('user_id'), Column('is_active'))
+invitation = Table('invitation', metadata, Column('owner_id'), Column('code'))
+
+INDEXES = [
+	Index('ix_task_owner_id_time_start', task.c.owner_id, task.c.time_start),
+	Index('ix_task_directory_id_time_start', task.c.directory_id, task.c.time_start),
+	Index('uq_task_tag_task_id_tag', task_tag.c.task_id, task_tag.c.tag, unique=True),
+	Index('ix_task_tag_tag', task_tag.c.tag),
+	Index('ix_directory_owner_id_is_self', directory.c.owner_id, directory.c.is_self),
+	Index('uq_directory_tag_directory_id_tag', directory_tag.c.directory_id, directory_tag.c.tag, unique=True),
+	Index('ix_directory_tag_tag', directory_tag.c.tag),
+	Index('ix_member_directory_id_user_id_is_active', member.c.directory_id, member.c.user_id, member.c.is_active),
+	Index('ix_member_user_id_is_active', member.c.user_id, member.c.is_active),
+	Index('uq_invitation_code', invitation.c.code, unique=True),
+	Index('ix_invitation_owner_id', invitation.c.owner_id),
+]
+
+
+def upgrade(conn: Connection) -> None:
+	# Уникальные индексы на теги не создадутся поверх дублей — оставляем по одной записи
+	conn.execute(text(
+		'DELETE FROM task_tag WHERE id NOT IN (SELECT MIN(id) FROM task_tag GROUP BY task_id, tag)'
+	))
+	conn.execute(text(
+		'DELETE FROM directory_tag WHERE id NOT IN (SELECT MIN(id) FROM directory_tag GROUP BY directory_id, tag)'
+	))
+	# Уникальный индекс на код не создастся поверх дублей (приглашения создавались проверкой без ограничения):
+	# самое раннее приглашение сохраняет код, остальным выдаются новые коды
+	duplicates = conn.execute(text(
+		'SELECT id FROM invitation WHERE id NOT IN (SELECT MIN(id) FROM invitation GROUP BY code)'
+	)).scalars().all()
+	if duplicates:
+		codes = set(conn.execute(text('SELECT code FROM invitation')).scalars())
+		for invitation_id in duplicates:
+			code = _new_code(codes)
+			codes.add(code)
+			conn.execute(text('UPDATE invitation SET code = :code WHERE id = :id'), {'code': code, 'id': invitation_id})
+
+	for index in INDEXES:
+		create_index(conn, index)
+
+def _new_code(taken: set[str], length: int = 8) -> str:
+	"""Код в формате invitation_service.generate_invitation_code(), не совпадающий с taken."""
+	alphabet = string.ascii_uppercase + string.digits
+	while True:
+		code = ''.join(secrets.choice(alphabet) for _ in range(length))
+		if code not in taken:
+			return code
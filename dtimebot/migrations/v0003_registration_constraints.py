@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Connection, Index, MetaData, Table, text
+
+from dtimebot.database import create_index
+
+
+transactional = False
+
+metadata = MetaData()
+directory = Table('directory', metadata, Column('owner_id'))
+member = Table('member', metadata, Column('directory_id'), Column('user_id'))
+
+INDEXES = [
+	Index(
+		'uq_directory_owner_id_self', directory.c.owner_id, unique=True,
+		sqlite_where=text('is_self'), postgresql_where=text('is_self')
+	),
+	Index(
+		'uq_member_directory_id_user_id_active', member.c.directory_id, member.c.user_id, unique=True,
+		sqlite_where=text('is_active'), postgresql_where=text('is_active')
+	),
+]
+
+
+def upgrade(conn: Connection) -> None:
+	# Частичные уникальные индексы не создадутся поверх дублей. Ничего не удаляем:
+	# лишние личные директории становятся обычными, лишние активные участия — неактивными
+	conn.execute(text(
+		'UPDATE directory SET is_self = false WHERE is_self AND id NOT IN '
+		'(SELECT MIN(id) FROM directory WHERE is_self GROUP BY owner_id)'
+	))
+	conn.execute(text(
+		'UPDATE member SET is_active = false WHERE is_active AND id NOT IN '
+		'(SELECT MIN(id) FROM member WHERE is_active GROUP BY directory_id, user_id)'
+	))
+
+	for index in INDEXES:
+		create_index(conn, index)
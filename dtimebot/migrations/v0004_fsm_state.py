@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Connection, DateTime, Index, MetaData, String, Table, Text
+
+
+metadata = MetaData()
+
+fsm_state = Table(
+	'fsm_state', metadata,
+	Column('key', String(255), primary_key=True),
+	Column('state', String(255), nullable=True),
+	Column('data', Text, nullable=True),
+	Column('updated_at', DateTime, nullable=False),
+	Index('ix_fsm_state_updated_at', 'updated_at'),
+)
+
+
+def upgrade(conn: Connection) -> None:
+	fsm_state.create(conn, checkfirst=True)
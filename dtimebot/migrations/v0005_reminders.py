@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Connection, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, text
+
+
+metadata = MetaData()
+# Только первичный ключ, на который ссылается reminder.task_id
+Table('task', metadata, Column('id', Integer, primary_key=True))
+
+reminder = Table(
+	'reminder', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('task_id', ForeignKey('task.id'), nullable=False),
+	Column('kind', String(16), nullable=False),
+	Column('fire_at', DateTime, nullable=False),
+	Index('ix_reminder_fire_at', 'fire_at'),
+	Index('ix_reminder_task_id', 'task_id'),
+)
+
+
+def upgrade(conn: Connection) -> None:
+	reminder.create(conn, checkfirst=True)
+
+	# Напоминания для уже созданных задач, которые ещё не начались или не закончились
+	now = datetime.utcnow()
+	for kind, column in (('start', 'time_start'), ('end', 'time_end')):
+		conn.execute(
+			text(
+				f'INSERT INTO reminder (task_id, kind, fire_at) '
+				f'SELECT id, :kind, {column} FROM task WHERE {column} > :now'
+			),
+			{'kind': kind, 'now': now}
+		)
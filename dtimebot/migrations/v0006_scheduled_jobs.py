@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Connection, Float, Index, LargeBinary, MetaData, String, Table
+
+
+metadata = MetaData()
+
+scheduled_job = Table(
+	'scheduled_job', metadata,
+	Column('id', String(191), primary_key=True),
+	Column('next_run_time', Float(25), nullable=True),
+	Column('job_state', LargeBinary, nullable=False),
+	Index('ix_scheduled_job_next_run_time', 'next_run_time'),
+)
+
+
+def upgrade(conn: Connection) -> None:
+	scheduled_job.create(conn, checkfirst=True)
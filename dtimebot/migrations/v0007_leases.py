@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Connection, DateTime, Float, MetaData, String, Table
+
+from dtimebot.database import add_column
+
+
+metadata = MetaData()
+reminder = Table(
+	'reminder', metadata,
+	Column('claimed_by', String(64), nullable=True),
+	Column('claimed_until', DateTime, nullable=True),
+)
+scheduled_job = Table(
+	'scheduled_job', metadata,
+	Column('claimed_by', String(64), nullable=True),
+	Column('claimed_until', Float(25), nullable=True),
+)
+
+
+def upgrade(conn: Connection) -> None:
+	# Аренда напоминаний и заданий экземплярами бота
+	for table in (reminder, scheduled_job):
+		add_column(conn, table, 'claimed_by')
+		add_column(conn, table, 'claimed_until')
@@ -0,0 +1,11 @@
+from sqlalchemy import JSON, Column, Connection, MetaData, Table
+
+from dtimebot.database import add_column
+
+
+metadata = MetaData()
+task = Table('task', metadata, Column('recurrence', JSON, nullable=True))
+
+
+def upgrade(conn: Connection) -> None:
+	add_column(conn, task, 'recurrence')
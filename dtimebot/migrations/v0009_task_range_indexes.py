@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Connection, Index, MetaData, Table, text
+
+from dtimebot.database import create_index
+
+
+transactional = False
+
+metadata = MetaData()
+task = Table('task', metadata, Column('directory_id'), Column('time_start'), Column('time_end'))
+
+INDEXES = [
+	Index('ix_task_directory_id_time_end', task.c.directory_id, task.c.time_end),
+	Index(
+		'ix_task_recurring_directory_id_time_start', task.c.directory_id, task.c.time_start,
+		sqlite_where=text('recurrence IS NOT NULL'), postgresql_where=text('recurrence IS NOT NULL')
+	),
+]
+
+
+def upgrade(conn: Connection) -> None:
+	# До none_as_null разовые задачи хранили в recurrence JSON 'null' вместо NULL
+	conn.execute(text("UPDATE task SET recurrence = NULL WHERE CAST(recurrence AS TEXT) = 'null'"))
+
+	for index in INDEXES:
+		create_index(conn, index)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Connection, DateTime, Index, MetaData, String, Table
+
+from dtimebot.database import add_column, create_index
+
+
+transactional = False
+
+metadata = MetaData()
+user = Table(
+	'user', metadata,
+	Column('id'),
+	Column('timezone', String(64), nullable=True),
+	Column('digest_sent_at', DateTime, nullable=True),
+)
+
+
+def upgrade(conn: Connection) -> None:
+	add_column(conn, user, 'timezone')
+	add_column(conn, user, 'digest_sent_at')
+	create_index(conn, Index('ix_user_timezone_id', user.c.timezone, user.c.id))
@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Connection, ForeignKey, Index, Integer, MetaData, String, Table, text
+
+from dtimebot.database import create_index
+
+
+transactional = False
+
+# Таблицы правил доступа были в моделях и раньше, но модели не импортировались при создании схемы,
+# поэтому в БД их может не быть
+metadata = MetaData()
+# Только первичные ключи, на которые ссылаются новые таблицы
+Table('directory', metadata, Column('id', Integer, primary_key=True))
+member_tag = Table('member_tag', metadata, Column('member_id'), Column('tag'))
+
+access_rule = Table(
+	'access_rule', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('directory_id', ForeignKey('directory.id'), nullable=False),
+	Index('ix_access_rule_directory_id', 'directory_id'),
+)
+access_rule_permission = Table(
+	'access_rule_permission', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('rule_id', ForeignKey('access_rule.id'), nullable=False),
+	Column('permission', String(64), nullable=False),
+	Index('ix_access_rule_permission_rule_id_permission', 'rule_id', 'permission'),
+)
+access_rule_filter = Table(
+	'access_rule_filter', metadata,
+	Column('id', Integer, primary_key=True, autoincrement=True),
+	Column('rule_id', ForeignKey('access_rule.id'), nullable=False),
+	Column('filter_type', String(16), nullable=False),
+	Column('tag', String(64), nullable=False),
+	Index('ix_access_rule_filter_rule_id_filter_type', 'rule_id', 'filter_type'),
+)
+
+
+def upgrade(conn: Connection) -> None:
+	for table in (access_rule, access_rule_permission, access_rule_filter):
+		table.create(conn, checkfirst=True)
+		# Индексы таблиц, созданных раньше без них
+		for index in table.indexes:
+			create_index(conn, index)
+
+	# Уникальный индекс на теги участников не создастся поверх дублей — оставляем по одной записи
+	conn.execute(text(
+		'DELETE FROM member_tag WHERE id NOT IN (SELECT MIN(id) FROM member_tag GROUP BY member_id, tag)'
+	))
+	create_index(conn, Index('uq_member_tag_member_id_tag', member_tag.c.member_id, member_tag.c.tag, unique=True))
@@ -1,7 +1,11 @@
-# Импортируем все модели для автоматического создания таблиц
+# Импортируем все модели, чтобы зарегистрировать их в Base.metadata (таблицы создают миграции)
 from .users import User
 from .directories import Directory, DirectoryTag
 from .tasks import Task, TaskTag
 from .invitations import Invitation
 from .members import Member, MemberTag
 from .activities import Activity, ActivityTag, ActivityEmbed
+from .fsm import FSMRecord
+from .reminders import Reminder
+from .jobs import ScheduledJob
+from .access_rules import AccessRule, AccessRulePermission, AccessRuleFilter
@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import ForeignKey, Index, Integer, String
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 
 from dtimebot.database import Base
@@ -6,13 +6,24 @@ from dtimebot.models.directories import Directory
 
 
 class AccessRule(Base):
+    """
+    Правило доступа участников директории к её задачам (см. dtimebot.services.access_service):
+    участник, у которого есть все теги subject-фильтров, получает права правила на задачи,
+    у которых есть все теги object-фильтров.
+    """
     __tablename__ = 'access_rule'
+    __table_args__ = (
+        Index('ix_access_rule_directory_id', 'directory_id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     directory_id: Mapped[int] = mapped_column(ForeignKey(Directory.id), nullable=False)
 
 class AccessRulePermission(Base):
     __tablename__ = 'access_rule_permission'
+    __table_args__ = (
+        Index('ix_access_rule_permission_rule_id_permission', 'rule_id', 'permission'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     rule_id: Mapped[int] = mapped_column(ForeignKey(AccessRule.id), nullable=False)
@@ -20,6 +31,9 @@ class AccessRulePermission(Base):
 
 class AccessRuleFilter(Base):
     __tablename__ = 'access_rule_filter'
+    __table_args__ = (
+        Index('ix_access_rule_filter_rule_id_filter_type', 'rule_id', 'filter_type'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     rule_id: Mapped[int] = mapped_column(ForeignKey(AccessRule.id), nullable=False)
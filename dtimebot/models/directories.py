@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, Integer, String, DateTime, Boolean
+from sqlalchemy import ForeignKey, Integer, String, DateTime, Boolean, Index, text
 from sqlalchemy.orm import mapped_column, Mapped
 from sqlalchemy.sql import func
 from dtimebot.database import Base
@@ -6,6 +6,11 @@ from dtimebot.models.users import User
 
 class Directory(Base):
 	__tablename__ = 'directory'
+	__table_args__ = (
+		Index('ix_directory_owner_id_is_self', 'owner_id', 'is_self'),
+		# Не больше одной личной директории на пользователя; цель ON CONFLICT при регистрации
+		Index('uq_directory_owner_id_self', 'owner_id', unique=True, sqlite_where=text('is_self'), postgresql_where=text('is_self')),
+	)
 
 	id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 	owner_id: Mapped[int] = mapped_column(ForeignKey(User.id))
@@ -17,6 +22,10 @@ class Directory(Base):
 
 class DirectoryTag(Base):
 	__tablename__ = 'directory_tag'
+	__table_args__ = (
+		Index('uq_directory_tag_directory_id_tag', 'directory_id', 'tag', unique=True),
+		Index('ix_directory_tag_tag', 'tag'),
+	)
 
 	id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 	directory_id: Mapped[int]  = mapped_column(ForeignKey(Directory.id))
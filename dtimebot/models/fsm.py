@@ -0,0 +1,18 @@
+from typing import Optional
+from sqlalchemy import String, Text, DateTime, Index
+from sqlalchemy.orm import mapped_column, Mapped
+from dtimebot.database import Base
+
+
+class FSMRecord(Base):
+	"""Состояние и данные FSM aiogram для одного ключа (см. dtimebot.bot.storage.DatabaseStorage)."""
+	__tablename__ = 'fsm_state'
+	__table_args__ = (
+		Index('ix_fsm_state_updated_at', 'updated_at'),
+	)
+
+	key: Mapped[str] = mapped_column(String(255), primary_key=True)
+	state: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+	# JSON; datetime кодируются как {"__datetime__": "<iso>"}
+	data: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+	updated_at: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
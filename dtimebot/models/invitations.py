@@ -1,5 +1,5 @@
 from typing import Optional
-from sqlalchemy import ForeignKey, Integer, String, DateTime
+from sqlalchemy import ForeignKey, Integer, String, DateTime, Index
 from sqlalchemy.orm import mapped_column, Mapped
 from sqlalchemy.sql import func
 from dtimebot.database import Base
@@ -7,6 +7,10 @@ from dtimebot.models.users import User
 
 class Invitation(Base):
 	__tablename__ = 'invitation'
+	__table_args__ = (
+		Index('uq_invitation_code', 'code', unique=True),
+		Index('ix_invitation_owner_id', 'owner_id'),
+	)
 
 	id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 	owner_id: Mapped[int] = mapped_column(ForeignKey(User.id))
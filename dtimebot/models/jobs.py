@@ -0,0 +1,21 @@
+from typing import Optional
+from sqlalchemy import String, Float, LargeBinary, Index
+from sqlalchemy.orm import mapped_column, Mapped
+from dtimebot.database import Base
+
+
+class ScheduledJob(Base):
+	"""Задание APScheduler в БД (см. dtimebot.scheduling.jobstore.DatabaseJobStore)."""
+	__tablename__ = 'scheduled_job'
+	__table_args__ = (
+		Index('ix_scheduled_job_next_run_time', 'next_run_time'),
+	)
+
+	id: Mapped[str] = mapped_column(String(191), primary_key=True)
+	# UTC timestamp следующего запуска; NULL — задание на паузе
+	next_run_time: Mapped[Optional[float]] = mapped_column(Float(25), nullable=True)
+	# Состояние Job.__getstate__() в pickle
+	job_state: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+	# Экземпляр бота, держащий задание в памяти (scheduling.instance_id), и UTC timestamp окончания аренды
+	claimed_by: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+	claimed_until: Mapped[Optional[float]] = mapped_column(Float(25), nullable=True)
@@ -1,5 +1,5 @@
 from typing import Optional
-from sqlalchemy import ForeignKey, Integer, DateTime, String, Boolean
+from sqlalchemy import ForeignKey, Integer, DateTime, String, Boolean, Index, text
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 from sqlalchemy.sql import func
 from dtimebot.database import Base
@@ -9,6 +9,12 @@ from dtimebot.models.invitations import Invitation
 
 class Member(Base):
     __tablename__ = 'member'
+    __table_args__ = (
+        Index('ix_member_directory_id_user_id_is_active', 'directory_id', 'user_id', 'is_active'),
+        Index('ix_member_user_id_is_active', 'user_id', 'is_active'),
+        # Активное участие в директории у пользователя одно (после выхода остаются неактивные записи)
+        Index('uq_member_directory_id_user_id_active', 'directory_id', 'user_id', unique=True, sqlite_where=text('is_active'), postgresql_where=text('is_active')),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     directory_id: Mapped[int] = mapped_column(ForeignKey(Directory.id), nullable=False)
@@ -20,6 +26,9 @@ class Member(Base):
 
 class MemberTag(Base):
     __tablename__ = 'member_tag'
+    __table_args__ = (
+        Index('uq_member_tag_member_id_tag', 'member_id', 'tag', unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     member_id: Mapped[int] = mapped_column(ForeignKey(Member.id), nullable=False)
@@ -0,0 +1,29 @@
+from typing import Optional
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import mapped_column, Mapped
+from dtimebot.database import Base
+from dtimebot.models.tasks import Task
+
+
+class Reminder(Base):
+	"""
+	Запланированное напоминание о задаче (см. dtimebot.scheduling.reminders).
+	Строка живёт до отправки: отправленные и устаревшие напоминания удаляются.
+	Перед отправкой экземпляр бота захватывает напоминание (claimed_by/claimed_until), чтобы его не отправил другой.
+	"""
+	__tablename__ = 'reminder'
+	__table_args__ = (
+		Index('ix_reminder_fire_at', 'fire_at'),
+		Index('ix_reminder_task_id', 'task_id'),
+	)
+
+	id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+	task_id: Mapped[int] = mapped_column(ForeignKey(Task.id), nullable=False)
+	# 'start' или 'end'
+	kind: Mapped[str] = mapped_column(String(16), nullable=False)
+	# Время отправки, UTC
+	fire_at: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
+	# Экземпляр бота, который отправляет напоминание (scheduling.instance_id), и срок его аренды (UTC).
+	# После срока аренды незавершённую отправку может забрать другой экземпляр
+	claimed_by: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+	claimed_until: Mapped[Optional[DateTime]] = mapped_column(DateTime, nullable=True)
@@ -1,15 +1,27 @@
 from typing import Optional
-from sqlalchemy import Integer, String, DateTime, ForeignKey
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import mapped_column, Mapped, relationship
 from dtimebot.database import Base, JSONModel
 from dtimebot.models.activities import ActivityEmbed
 from dtimebot.models.users import User
 from dtimebot.models.directories import Directory
+from dtimebot.scheduling.triggers import JobTrigger
 
 
 class Task(Base):
 	__tablename__ = 'task'
+	__table_args__ = (
+		Index('ix_task_owner_id_time_start', 'owner_id', 'time_start'),
+		Index('ix_task_directory_id_time_start', 'directory_id', 'time_start'),
+		# Выборка задач на интервал (task_service.get_tasks_in_range): задачи, начавшиеся раньше интервала
+		# и ещё идущие, и повторяющиеся задачи, вхождения которых могут попасть в интервал
+		Index('ix_task_directory_id_time_end', 'directory_id', 'time_end'),
+		Index(
+			'ix_task_recurring_directory_id_time_start', 'directory_id', 'time_start',
+			sqlite_where=text('recurrence IS NOT NULL'), postgresql_where=text('recurrence IS NOT NULL')
+		),
+	)
 
 	id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 	owner_id: Mapped[int] = mapped_column(ForeignKey(User.id), nullable=False)
@@ -19,6 +31,9 @@ class Task(Base):
 	time_start: Mapped[Optional[DateTime]] = mapped_column(DateTime)
 	time_end: Mapped[Optional[DateTime]] = mapped_column(DateTime)
 	embed: Mapped[Optional[ActivityEmbed]] = mapped_column(JSONModel(ActivityEmbed), nullable=True)
+	# Правило повторения (IntervalTrigger или CronTrigger): вхождения вычисляются по нему лениво,
+	# см. dtimebot.scheduling.recurrence. NULL — разовая задача
+	recurrence: Mapped[Optional[JobTrigger]] = mapped_column(JSONModel(JobTrigger), nullable=True)
 	created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
 
 	owner: Mapped[User] = relationship()
@@ -26,6 +41,10 @@ class Task(Base):
 
 class TaskTag(Base):
 	__tablename__ = 'task_tag'
+	__table_args__ = (
+		Index('uq_task_tag_task_id_tag', 'task_id', 'tag', unique=True),
+		Index('ix_task_tag_tag', 'tag'),
+	)
 
 	id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 	task_id: Mapped[int] = mapped_column(ForeignKey(Task.id), nullable=False)
@@ -1,5 +1,5 @@
 from typing import Optional
-from sqlalchemy import Integer, BigInteger, DateTime
+from sqlalchemy import Integer, BigInteger, DateTime, String, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import mapped_column, Mapped
 from dtimebot.database import Base
@@ -7,6 +7,10 @@ from dtimebot.database import Base
 
 class User(Base):
 	__tablename__ = 'user'
+	__table_args__ = (
+		# Рассылка дайджеста: пользователи часового пояса постранично по id
+		Index('ix_user_timezone_id', 'timezone', 'id'),
+	)
 
 	id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 	telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False, unique=True)
@@ -14,3 +18,7 @@ class User(Base):
 	deleted_at: Mapped[Optional[DateTime]] = mapped_column(DateTime)
 	first_name: Mapped[Optional[str]] = mapped_column(nullable=True)
 	username: Mapped[Optional[str]] = mapped_column(nullable=True)
+	# Часовой пояс IANA (например, Europe/Moscow); NULL — часовой пояс планировщика (scheduling.timezone)
+	timezone: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+	# Когда пользователю последний раз отправлен (захвачен для отправки) утренний дайджест, UTC
+	digest_sent_at: Mapped[Optional[DateTime]] = mapped_column(DateTime, nullable=True)
@@ -1,3 +1,7 @@
+import os
+import socket
+import uuid
+from datetime import timedelta
 from typing import Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.executors.asyncio import AsyncIOExecutor
@@ -6,6 +10,9 @@ from pydantic import BaseModel
 
 from dtimebot.logs import main_logger
 from dtimebot import configs
+from dtimebot.scheduling.jobstore import DatabaseJobStore, JobStoreConfig
+from dtimebot.scheduling.reminders import ReminderConfig
+from dtimebot.scheduling.digest import DigestConfig
 
 
 logger = main_logger.getChild('scheduling')
@@ -14,9 +21,20 @@ logger = main_logger.getChild('scheduling')
 class SchedulingConfig(BaseModel):
 	# Define scheduling config fields as needed, e.g.:
 	timezone: str = "UTC"
+	reminders: ReminderConfig = ReminderConfig()
+	# Утренний дайджест задач на день по местному времени пользователя
+	digest: DigestConfig = DigestConfig()
+	# Хранилище заданий в БД (add_job(..., jobstore=DATABASE_JOBSTORE)), переживающих перезапуск
+	job_store: JobStoreConfig = JobStoreConfig()
 
 config: Optional[SchedulingConfig] = None
 
+DATABASE_JOBSTORE = 'database'
+job_store: Optional[DatabaseJobStore] = None
+
+# Идентификатор процесса в арендах напоминаний и заданий, когда с одной БД работают несколько экземпляров бота
+instance_id = f'{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
 
 scheduler = AsyncIOScheduler(
 	logger=logger.getChild('apscheduler'),
@@ -37,3 +55,37 @@ def stop():
 	logger.info('Stopping scheduler...')
 	scheduler.shutdown()
 	logger.info('Scheduler stopped')
+
+async def start_job_store():
+	"""
+	Подключает хранилище заданий в БД. Вызывается после запуска планировщика и БД.
+	"""
+	global job_store
+	store_config = config.job_store if config else JobStoreConfig()
+	if not store_config.enabled:
+		return
+
+	job_store = DatabaseJobStore(
+		lookahead=timedelta(seconds=store_config.lookahead),
+		refill_interval=timedelta(seconds=store_config.refill_interval),
+		lease=timedelta(seconds=store_config.lease),
+		owner=instance_id
+	)
+	scheduler.add_jobstore(job_store, DATABASE_JOBSTORE)
+	loaded = await job_store.refill()
+	logger.info('Database job store started, %d job(s) due within %ss loaded', loaded, store_config.lookahead)
+
+def persistent_jobstore() -> str:
+	"""
+	Хранилище для заданий, которые должны пережить перезапуск: DATABASE_JOBSTORE, если оно подключено.
+	Задания в нём общие для всех экземпляров бота, поэтому их функции должны быть функциями модулей.
+	"""
+	return DATABASE_JOBSTORE if job_store is not None else 'default'
+
+async def stop_job_store():
+	global job_store
+	if job_store is None:
+		return
+	await job_store.close()
+	scheduler.remove_jobstore(DATABASE_JOBSTORE, shutdown=False)
+	job_store = None
@@ -0,0 +1,124 @@
+"""
+Утренний дайджест: раз в сутки в DigestConfig.hour:minute по местному времени пользователя —
+одно сообщение с его задачами на сегодня вместо отдельных напоминаний.
+
+Задание JOB_ID (CronTrigger) срабатывает каждые CHECK_MINUTES минут — смещения всех часовых поясов
+от UTC кратны 15 минутам — и выбирает часовые пояса пользователей, в которых время дайджеста наступило
+не больше grace секунд назад. Пользователи такого пояса обрабатываются пачками по chunk_size: пачка
+захватывается одним UPDATE (user.digest_sent_at), задачи всех её пользователей загружаются двумя запросами
+(см. digest_service.get_digests), готовые дайджесты передаются notifier (низкоприоритетная очередь outbox).
+Число запросов и время рассылки растут линейно с числом пользователей.
+
+Захват через digest_sent_at делает рассылку идемпотентной: повторные и пропущенные срабатывания,
+перезапуск бота и несколько экземпляров с одной БД не приводят к двум дайджестам за сутки.
+"""
+import time
+from datetime import datetime, time as dt_time, timedelta, tzinfo
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from dtimebot import scheduling
+from dtimebot.logs import main_logger
+from dtimebot.scheduling import timezones
+from dtimebot.scheduling.triggers import CronTrigger
+from dtimebot.services import digest_service
+from dtimebot.services.digest_service import Digest
+
+
+logger = main_logger.getChild('scheduling.digest')
+
+JOB_ID = 'daily_digest'
+# Как часто проверять, в каких часовых поясах наступило время дайджеста
+CHECK_MINUTES = 15
+
+Notifier = Callable[[list[Digest]], Awaitable[None]]
+
+
+class DigestConfig(BaseModel):
+	enabled: bool = True
+	# Местное время отправки
+	hour: int = 8
+	minute: int = 0
+	# Сколько пользователей обрабатывать за один захват (и два запроса задач)
+	chunk_size: int = 500
+	# Дайджест, опоздавший больше чем на столько секунд (бот был выключен), не отправляется до следующих суток
+	grace: int = 3 * 60 * 60
+
+
+notifier: Optional[Notifier] = None
+
+
+def _config() -> DigestConfig:
+	return scheduling.config.digest if scheduling.config else DigestConfig()
+
+def start(send: Notifier) -> None:
+	global notifier
+	config = _config()
+	if not config.enabled:
+		logger.info("Daily digest is disabled")
+		return
+
+	notifier = send
+	trigger = CronTrigger(minute=f'*/{CHECK_MINUTES}', timezone='UTC')
+	# coalesce: после простоя пропущенные проверки выполняются одной
+	scheduling.scheduler.add_job(
+		run, id=JOB_ID, jobstore=scheduling.persistent_jobstore(), replace_existing=True, coalesce=True, max_instances=1,
+		misfire_grace_time=CHECK_MINUTES * 60, **trigger.job_kwargs()
+	)
+	logger.info("Daily digest scheduled at %02d:%02d local time", config.hour, config.minute)
+
+def stop() -> None:
+	global notifier
+	notifier = None
+	# Задание в хранилище БД общее для всех экземпляров и заменяется при следующем запуске
+	if scheduling.job_store is None and scheduling.scheduler.get_job(JOB_ID):
+		scheduling.scheduler.remove_job(JOB_ID)
+
+def _digest_time(zone: tzinfo, now: datetime, config: DigestConfig) -> Optional[datetime]:
+	"""
+	Время последнего наступившего дайджеста (UTC), если оно наступило не больше grace назад, иначе None.
+	Окно считается по датам, а не по времени суток: при позднем hour окно grace переходит
+	на следующие местные сутки, и тогда последний дайджест — вчерашний.
+	"""
+	today = timezones.to_local(now, zone).date()
+	for day in (today, today - timedelta(days=1)):
+		digest_at = timezones.to_utc(datetime.combine(day, dt_time(config.hour, config.minute)), zone)
+		if digest_at <= now:
+			return digest_at if now < digest_at + timedelta(seconds=config.grace) else None
+	return None
+
+async def run() -> int:
+	"""
+	Отправляет дайджесты всем пользователям, у которых наступило время дайджеста.
+	:return: Число обработанных (захваченных) пользователей.
+	"""
+	config = _config()
+	if notifier is None:
+		return 0
+
+	now = datetime.utcnow()
+	processed = sent = 0
+	started = time.monotonic()
+	for name in await digest_service.get_digest_timezones():
+		zone = timezones.get_zone(name)
+		digest_at = _digest_time(zone, now, config)
+		if digest_at is None:
+			continue
+
+		start, end = timezones.local_day(timezones.to_local(digest_at, zone).date(), zone)
+		after_id = 0
+		while True:
+			users = await digest_service.claim_digest_users(name, after_id, config.chunk_size, digest_at, now)
+			if not users:
+				break
+			after_id = users[-1][0]
+			processed += len(users)
+			digests = await digest_service.get_digests(users, start, end, zone)
+			if digests:
+				await notifier(digests)
+				sent += len(digests)
+
+	if processed:
+		logger.info("Daily digest: %d user(s) processed, %d digest(s) sent in %.1fs", processed, sent, time.monotonic() - started)
+	return processed
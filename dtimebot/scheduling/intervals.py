@@ -0,0 +1,127 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Generic, Iterable, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+
+class _Node:
+	__slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+	def __init__(self, center: Any, items: list[tuple[Any, Any, Any]]):
+		self.center = center
+		# Интервалы, содержащие center: по возрастанию начала (уже упорядочены) и по убыванию окончания
+		self.by_start = items
+		self.by_end = sorted(items, key=lambda item: item[1], reverse=True)
+		self.left: Optional[_Node] = None
+		self.right: Optional[_Node] = None
+
+
+class IntervalTree(Generic[T]):
+	"""
+	Статическое дерево интервалов [start, end) для запросов пересечения: строится один раз за O(n log n),
+	overlap() находит k пересечений за O(log n + k).
+
+	Интервалы, начавшиеся до начала запроса и ещё идущие, ищутся спуском по центрированному дереву
+	(в каждом узле — интервалы, содержащие его центр), начинающиеся внутри запроса — бинарным поиском
+	по отсортированным началам. Интервал без окончания (end is None или end <= start) — точка.
+	Время — любые сравнимые значения (datetime, числа).
+	"""
+
+	def __init__(self, items: Iterable[tuple[Any, Any, T]]):
+		items = [(start, end if end is not None and end > start else start, value) for start, end, value in items]
+		items.sort(key=lambda item: item[0])
+		self._starts = [start for start, _, _ in items]
+		self._values: list[T] = [value for _, _, value in items]
+		self._root = self._build([item for item in items if item[1] > item[0]])
+
+	def __len__(self) -> int:
+		return len(self._values)
+
+	def overlap(self, start: Any, end: Any = None) -> list[T]:
+		"""
+		Элементы, пересекающиеся с [start, end); если end не задан (или end <= start) — содержащие точку start.
+		Точка пересекается с интервалом, если лежит в нём.
+		"""
+		result = self._stab(start)
+		lo = bisect_left(self._starts, start)
+		hi = bisect_left(self._starts, end) if end is not None and end > start else bisect_right(self._starts, start)
+		result.extend(self._values[lo:hi])
+		return result
+
+	def _stab(self, point: Any) -> list[T]:
+		"""Интервалы со start < point < end."""
+		result = []
+		node = self._root
+		while node is not None:
+			if point <= node.center:
+				# Все интервалы узла кончаются после center >= point
+				for start, _, value in node.by_start:
+					if start >= point:
+						break
+					result.append(value)
+				node = node.left if point < node.center else None
+			else:
+				# Все интервалы узла начинаются не позже center < point
+				for _, end, value in node.by_end:
+					if end <= point:
+						break
+					result.append(value)
+				node = node.right
+		return result
+
+	@staticmethod
+	def _build(items: list[tuple[Any, Any, Any]]) -> Optional[_Node]:
+		"""Дерево из интервалов, отсортированных по началу (разбиение порядок сохраняет)."""
+		if not items:
+			return None
+		# Центр — начало медианного интервала: он сам остаётся в узле, а в каждое поддерево уходит
+		# не больше половины интервалов (слева — кончившиеся до center, справа — начавшиеся после)
+		center = items[len(items) // 2][0]
+		left, middle, right = [], [], []
+		for item in items:
+			if item[1] <= center:
+				left.append(item)
+			elif item[0] > center:
+				right.append(item)
+			else:
+				middle.append(item)
+		node = _Node(center, middle)
+		node.left = IntervalTree._build(left)
+		node.right = IntervalTree._build(right)
+		return node
+
+
+def merge(intervals: Iterable[tuple[Any, Any]]) -> list[tuple[Any, Any]]:
+	"""
+	Объединение интервалов [start, end) проходом по отсортированным началам: пересекающиеся
+	и смыкающиеся интервалы сливаются, пустые отбрасываются. O(n log n).
+	"""
+	result: list[list] = []
+	for start, end in sorted(interval for interval in intervals if interval[1] > interval[0]):
+		if result and start <= result[-1][1]:
+			if end > result[-1][1]:
+				result[-1][1] = end
+		else:
+			result.append([start, end])
+	return [(start, end) for start, end in result]
+
+def gaps(merged: list[tuple[Any, Any]], start: Any, end: Any, min_length: Any = None) -> list[tuple[Any, Any]]:
+	"""
+	Промежутки [start, end), не покрытые объединёнными интервалами merge(), не короче min_length.
+	"""
+	result = []
+	current = start
+	for busy_start, busy_end in merged:
+		if busy_end <= current:
+			continue
+		if busy_start >= end:
+			break
+		if busy_start > current:
+			result.append((current, busy_start))
+		current = max(current, busy_end)
+	if current < end:
+		result.append((current, end))
+	if min_length is not None:
+		result = [(a, b) for a, b in result if b - a >= min_length]
+	return result
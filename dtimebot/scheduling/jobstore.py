@@ -0,0 +1,358 @@
+"""
+Хранилище заданий APScheduler в нашей БД.
+
+APScheduler обращается к хранилищу синхронно из event loop, а движок БД у нас асинхронный, поэтому
+DatabaseJobStore — это MemoryJobStore для заданий ближайшего окна (lookahead) поверх таблицы scheduled_job:
+- изменения заданий сразу применяются в памяти и пачками записываются в БД фоновой задачей;
+- при запуске и затем каждые refill_interval из БД подгружаются только задания, чей запуск наступит
+  в пределах окна (по индексу ix_scheduled_job_next_run_time), поэтому время запуска и память
+  почти не зависят от общего числа заданий: кроме окна, в памяти держатся только идентификаторы
+  всех заданий, по которым add_job() выдаёт ConflictingIdError, а update_job()/remove_job() — JobLookupError.
+
+Если с одной БД работают несколько экземпляров бота, задание окна держит в памяти и запускает только
+один из них: при подгрузке экземпляр захватывает строки (claimed_by/claimed_until на lease) атомарным
+UPDATE (на PostgreSQL — с FOR UPDATE SKIP LOCKED) и продлевает аренду при каждой следующей подгрузке.
+Задания, аренду которых продлить не удалось, из памяти убираются; пока аренда просрочена (БД недоступна),
+хранилище не отдаёт планировщику задания, чтобы их не запустили дважды. Задания остановленного или упавшего
+экземпляра другие подхватывают после окончания аренды (при остановке через close() — сразу).
+
+Ограничения: get_job()/get_jobs() видят только задания окна; задания на паузе (next_run_time=NULL)
+лежат только в БД, поэтому resume_job() для них недоступен. Идентификаторы заданий, добавленных другими
+экземплярами, становятся известны при подгрузке; если до неё добавить задание с тем же id, при записи
+в БД оно отбрасывается (строка в таблице проверяется перед вставкой) с ошибкой в логе. Изменение задания,
+которое держит в памяти другой экземпляр, тот увидит только при следующей подгрузке и до неё может
+запустить старую версию.
+"""
+import asyncio
+import pickle
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.util import datetime_to_utc_timestamp
+from pydantic import BaseModel
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from dtimebot.database import commit, get_session, insert_ignore, merge_row, supports_upsert, upsert
+from dtimebot.logs import main_logger
+from dtimebot.models.jobs import ScheduledJob
+
+
+logger = main_logger.getChild('scheduling.jobstore')
+
+
+class JobStoreConfig(BaseModel):
+	enabled: bool = True
+	# Задания, чей запуск наступит в пределах стольких секунд, держатся в памяти
+	lookahead: int = 60 * 60
+	# Как часто подгружать из БД задания, вошедшие в окно, секунды (должно быть меньше lookahead)
+	refill_interval: int = 10 * 60
+	# На сколько секунд экземпляр захватывает задания окна; продлевается при каждой подгрузке,
+	# поэтому должно быть больше refill_interval. Столько ждут задания упавшего экземпляра
+	lease: int = 30 * 60
+
+
+class DatabaseJobStore(MemoryJobStore):
+	"""
+	Хранилище заданий в таблице scheduled_job с окном заданий в памяти (см. описание модуля).
+	Задания сериализуются так же, как в apscheduler.jobstores.sqlalchemy: pickle от Job.__getstate__().
+	"""
+
+	def __init__(
+		self, lookahead: timedelta, refill_interval: timedelta, lease: timedelta, owner: str,
+		pickle_protocol: int = pickle.HIGHEST_PROTOCOL
+	):
+		super().__init__()
+		self.lookahead = lookahead
+		self.refill_interval = refill_interval
+		self.lease = lease
+		self.owner = owner
+		self.pickle_protocol = pickle_protocol
+		# Граница окна (UTC timestamp): задания до неё гарантированно есть в памяти
+		self._horizon = float('-inf')
+		# До какого момента (UTC timestamp) задания в памяти захвачены этим экземпляром
+		self._lease_until = float('-inf')
+		# Идентификаторы всех заданий в БД с учётом незаписанных изменений
+		self._ids: set[str] = set()
+		# Незаписанные изменения: id -> (next_run_time, job_state, только вставка) или None для удаления
+		self._writes: dict[str, Optional[tuple[Optional[float], bytes, bool]]] = {}
+		self._remove_all = False
+		self._dirty = asyncio.Event()
+		self._lock = asyncio.Lock()
+		self._tasks: list[asyncio.Task] = []
+
+	def start(self, scheduler, alias):
+		super().start(scheduler, alias)
+		self._tasks = [asyncio.create_task(self._write_loop()), asyncio.create_task(self._refill_loop())]
+
+	def shutdown(self):
+		for task in self._tasks:
+			task.cancel()
+		self._tasks = []
+		if self._writes or self._remove_all:
+			logger.warning("Job store shut down with %d unsaved change(s), call close() first", len(self._writes))
+		# Не super().shutdown(): он вызывает remove_all_jobs(), который удалил бы задания из БД
+		MemoryJobStore.remove_all_jobs(self)
+
+	async def close(self) -> None:
+		"""
+		Записывает накопленные изменения в БД, останавливает фоновые задачи и освобождает захваченные
+		задания, чтобы их сразу подхватили другие экземпляры.
+		"""
+		for task in self._tasks:
+			task.cancel()
+		await asyncio.gather(*self._tasks, return_exceptions=True)
+		self._tasks = []
+		async with self._lock:
+			await self._flush()
+			self._lease_until = float('-inf')
+			try:
+				async with get_session() as session:
+					await session.execute(
+						update(ScheduledJob)
+						.where(ScheduledJob.claimed_by == self.owner)
+						.values(claimed_by=None, claimed_until=None)
+					)
+					await commit(session)
+			except SQLAlchemyError as e:
+				logger.exception("Error while releasing scheduled jobs: %s", e)
+
+	# --- Интерфейс BaseJobStore ---
+
+	def get_due_jobs(self, now):
+		if not self._leased():
+			return []
+		return super().get_due_jobs(now)
+
+	def get_next_run_time(self):
+		# Планировщик проснётся по wakeup() из refill(), когда аренда будет продлена
+		if not self._leased():
+			return None
+		return super().get_next_run_time()
+
+	def add_job(self, job: Job):
+		if job.id in self._ids:
+			raise ConflictingIdError(job.id)
+		state = self._serialize(job)
+		timestamp = datetime_to_utc_timestamp(job.next_run_time)
+		if self._in_window(timestamp):
+			super().add_job(job)
+		self._ids.add(job.id)
+		self._write(job.id, (timestamp, state, True))
+
+	def update_job(self, job: Job):
+		if job.id not in self._ids:
+			raise JobLookupError(job.id)
+		state = self._serialize(job)
+		timestamp = datetime_to_utc_timestamp(job.next_run_time)
+		in_memory = job.id in self._jobs_index
+		if self._in_window(timestamp):
+			if in_memory:
+				super().update_job(job)
+			else:
+				super().add_job(job)
+		elif in_memory:
+			super().remove_job(job.id)
+		self._write(job.id, (timestamp, state, False))
+
+	def remove_job(self, job_id: str):
+		if job_id not in self._ids:
+			raise JobLookupError(job_id)
+		if job_id in self._jobs_index:
+			super().remove_job(job_id)
+		self._ids.discard(job_id)
+		self._write(job_id, None)
+
+	def remove_all_jobs(self):
+		super().remove_all_jobs()
+		self._ids = set()
+		self._writes = {}
+		self._remove_all = True
+		self._dirty.set()
+
+	# --- Работа с БД ---
+
+	async def refill(self) -> int:
+		"""
+		Захватывает в БД задания, чей запуск наступит в пределах окна, продлевает аренду заданий в памяти
+		и будит планировщик. Задания, которые захватил другой экземпляр, убираются из памяти.
+		:return: Количество добавленных в память заданий.
+		"""
+		now = datetime.now(timezone.utc)
+		horizon = datetime_to_utc_timestamp(now + self.lookahead)
+		lease_until = datetime_to_utc_timestamp(now + self.lease)
+		loaded = 0
+		async with self._lock:
+			# Сначала записываем свои изменения, чтобы не загрузить удалённое или устаревшее задание
+			await self._flush()
+			# Свои строки (продление), свободные и с истёкшей арендой. PostgreSQL: строки, которые
+			# в этот момент захватывает другой экземпляр, пропускаются (SKIP LOCKED); на SQLite UPDATE
+			# выполняется под блокировкой записи всей БД и атомарен и без этого
+			candidates = (
+				select(ScheduledJob.id)
+				.where(
+					ScheduledJob.next_run_time <= horizon,
+					or_(
+						ScheduledJob.claimed_by.is_(None),
+						ScheduledJob.claimed_by == self.owner,
+						ScheduledJob.claimed_until < datetime_to_utc_timestamp(now)
+					)
+				)
+				.with_for_update(skip_locked=True)
+			)
+			try:
+				async with get_session() as session:
+					res = await session.execute(select(ScheduledJob.id))
+					stored = set(res.scalars().all())
+					res = await session.execute(
+						update(ScheduledJob)
+						.where(ScheduledJob.id.in_(candidates.scalar_subquery()))
+						.values(claimed_by=self.owner, claimed_until=lease_until)
+						.returning(ScheduledJob.id, ScheduledJob.next_run_time, ScheduledJob.job_state)
+						.execution_options(synchronize_session=False)
+					)
+					rows = sorted(res.all(), key=lambda row: row.next_run_time)
+					await commit(session)
+			except SQLAlchemyError as e:
+				logger.exception("Error while loading scheduled jobs: %s", e)
+				return 0
+
+			# Изменения, сделанные, пока шёл запрос, ещё не записаны
+			self._ids = (stored | {job_id for job_id, value in self._writes.items() if value is not None}) - {
+				job_id for job_id, value in self._writes.items() if value is None
+			}
+			claimed = {row.id for row in rows}
+			lost = [job_id for job_id in self._jobs_index if job_id not in claimed and job_id not in self._writes]
+			for job_id in lost:
+				super().remove_job(job_id)
+			if lost:
+				logger.info("%d scheduled job(s) were taken over by another instance", len(lost))
+
+			for job_id, _, job_state in rows:
+				# Задание уже в памяти или изменено, пока шёл запрос
+				if job_id in self._jobs_index or job_id in self._writes:
+					continue
+				try:
+					job = self._reconstitute(job_state)
+				except Exception as e:
+					logger.exception("Unable to restore job %s, removing it: %s", job_id, e)
+					self._write(job_id, None)
+					continue
+				super().add_job(job)
+				loaded += 1
+			self._horizon = max(self._horizon, horizon)
+			self._lease_until = lease_until
+
+		if self._scheduler is not None:
+			self._scheduler.wakeup()
+		return loaded
+
+	async def _flush(self) -> None:
+		writes, remove_all = self._writes, self._remove_all
+		self._writes, self._remove_all = {}, False
+		if not writes and not remove_all:
+			return
+
+		removed = [job_id for job_id, value in writes.items() if value is None]
+		rows, inserts = [], []
+		for job_id, value in writes.items():
+			if value is None:
+				continue
+			# Задания в памяти запускает этот экземпляр, остальные свободны для подгрузки любым
+			claimed = job_id in self._jobs_index
+			(inserts if value[2] else rows).append({
+				'id': job_id, 'next_run_time': value[0], 'job_state': value[1],
+				'claimed_by': self.owner if claimed else None,
+				'claimed_until': self._lease_until if claimed else None,
+			})
+		conflicts = []
+		try:
+			async with get_session() as session:
+				if remove_all:
+					await session.execute(delete(ScheduledJob))
+				if removed:
+					await session.execute(delete(ScheduledJob).where(ScheduledJob.id.in_(removed)))
+				if inserts:
+					# Задание с тем же id мог добавить другой экземпляр после нашей последней подгрузки
+					res = await session.execute(
+						select(ScheduledJob.id).where(ScheduledJob.id.in_([row['id'] for row in inserts]))
+					)
+					conflicts = list(res.scalars().all())
+					inserts = [row for row in inserts if row['id'] not in conflicts]
+				if inserts and supports_upsert(session):
+					stmt = upsert(session, ScheduledJob).on_conflict_do_nothing(index_elements=[ScheduledJob.id])
+					await session.execute(stmt, inserts)
+				elif inserts:
+					for row in inserts:
+						await insert_ignore(session, ScheduledJob, row)
+				if rows and not supports_upsert(session):
+					for row in rows:
+						await merge_row(session, ScheduledJob, {'id': row['id']}, {k: v for k, v in row.items() if k != 'id'})
+				elif rows:
+					stmt = upsert(session, ScheduledJob)
+					stmt = stmt.on_conflict_do_update(
+						index_elements=[ScheduledJob.id],
+						set_={
+							'next_run_time': stmt.excluded.next_run_time, 'job_state': stmt.excluded.job_state,
+							'claimed_by': stmt.excluded.claimed_by, 'claimed_until': stmt.excluded.claimed_until,
+						}
+					)
+					await session.execute(stmt, rows)
+				await commit(session)
+		except SQLAlchemyError as e:
+			logger.exception("Error while saving %d scheduled job change(s): %s", len(writes), e)
+			# Возвращаем в очередь, более новые изменения тех же заданий важнее
+			for job_id, value in writes.items():
+				self._writes.setdefault(job_id, value)
+			self._remove_all = self._remove_all or remove_all
+			return
+
+		for job_id in conflicts:
+			logger.error("Scheduled job %s was already added by another instance, dropping this one", job_id)
+			# Задание другого экземпляра подгрузится при следующей подгрузке
+			if job_id in self._jobs_index and job_id not in self._writes:
+				super().remove_job(job_id)
+
+	async def _write_loop(self) -> None:
+		while True:
+			await self._dirty.wait()
+			self._dirty.clear()
+			async with self._lock:
+				await self._flush()
+
+	async def _refill_loop(self) -> None:
+		while True:
+			await asyncio.sleep(self.refill_interval.total_seconds())
+			loaded = await self.refill()
+			if loaded:
+				logger.info("Loaded %d scheduled job(s) entering the lookahead window", loaded)
+
+	# --- Вспомогательное ---
+
+	def _in_window(self, timestamp: Optional[float]) -> bool:
+		return timestamp is not None and timestamp <= self._horizon
+
+	def _leased(self) -> bool:
+		return datetime_to_utc_timestamp(datetime.now(timezone.utc)) < self._lease_until
+
+	def _write(self, job_id: str, value: Optional[tuple[Optional[float], bytes, bool]]) -> None:
+		self._writes[job_id] = value
+		self._dirty.set()
+
+	def _serialize(self, job: Job) -> bytes:
+		return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+	def _reconstitute(self, job_state: bytes) -> Job:
+		state = pickle.loads(job_state)
+		state['jobstore'] = self
+		job = Job.__new__(Job)
+		job.__setstate__(state)
+		job._scheduler = self._scheduler
+		job._jobstore_alias = self._alias
+		return job
+
+	def __repr__(self):
+		return f'<{self.__class__.__name__} (lookahead={self.lookahead})>'
@@ -0,0 +1,271 @@
+"""
+Повторяющиеся задачи: правило повторения (Task.recurrence) — IntervalTrigger или CronTrigger из
+dtimebot.scheduling.triggers.
+
+Вхождения не хранятся в БД: они вычисляются лениво на запрошенный интервал времени. Первое вхождение
+начинается в time_start задачи, длительность каждого вхождения равна time_end - time_start.
+- IntervalTrigger — арифметика от time_start, без перебора пропущенных шагов;
+- CronTrigger — правило компилируется один раз (кэш по JSON правила): все сочетания часов, минут
+  и секунд вычисляются заранее, дни интервала проверяются по заранее вычисленным множествам значений
+  полей даты (поля '*' не проверяются вовсе). Выражения полей — те же, что в APScheduler; выражения дня,
+  зависящие от месяца ('last', '1st mon'), вычисляются раз на месяц.
+Время вхождений — наивное UTC, как и time_start/time_end; поля CronTrigger — в его timezone (по умолчанию UTC).
+IntervalTrigger с timezone и шагом в целых сутках шагает по местному времени: «ежедневно в 9:00»
+остаётся в 9:00 и после перехода на летнее время. Обработчики задают правилам часовой пояс пользователя.
+"""
+import math
+from calendar import monthrange
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from apscheduler.triggers.cron import CronTrigger as APSCronTrigger
+from apscheduler.triggers.cron.expressions import AllExpression, RangeExpression
+from apscheduler.triggers.cron.fields import MAX_VALUES, MIN_VALUES
+
+from dtimebot.models.tasks import Task
+from dtimebot.scheduling import timezones
+from dtimebot.scheduling.triggers import CronTrigger, IntervalTrigger, JobTrigger
+
+
+Occurrence = tuple[datetime, Optional[datetime]]
+"""Вхождение задачи: (начало, окончание или None), наивное UTC."""
+
+# Правила, которые может хранить задача
+RULES = (IntervalTrigger, CronTrigger)
+
+# Насколько далеко next_occurrence() ищет следующее вхождение
+SEARCH_HORIZON = timedelta(days=5 * 366)
+
+# Поля даты и их значение для дня
+_DATE_FIELDS = {
+	'year': lambda day: day.year,
+	'month': lambda day: day.month,
+	'day': lambda day: day.day,
+	'week': lambda day: day.isocalendar()[1],
+	'day_of_week': lambda day: day.weekday(),
+}
+_ONE_DAY = timedelta(days=1)
+
+
+def is_supported(rule: JobTrigger) -> bool:
+	return isinstance(rule, RULES)
+
+def validate(rule: JobTrigger) -> None:
+	"""
+	Проверяет, что правило может быть правилом повторения задачи (в том числе выражения полей CronTrigger).
+	:raises ValueError: Правило не подходит.
+	"""
+	if not is_supported(rule):
+		raise ValueError(f'Unsupported recurrence rule: {rule.type}')
+	_zone(rule)
+	if isinstance(rule, CronTrigger):
+		_compile_cron(rule.model_dump_json())
+
+def iter_occurrences(task: Task, since: datetime, until: datetime) -> Iterator[Occurrence]:
+	"""
+	Вхождения задачи, пересекающиеся с [since, until), по возрастанию начала.
+	Задача без правила повторения — одно вхождение (сама задача), без времени начала — ни одного.
+	Вхождение без окончания пересекается с интервалом, если начинается в нём.
+	"""
+	if task.time_start is None:
+		return
+	duration = _duration(task)
+	if task.recurrence is None:
+		if _overlaps(task.time_start, task.time_end, since, until):
+			yield task.time_start, task.time_end
+		return
+
+	# Вхождения, начавшиеся раньше since, но ещё не закончившиеся к нему
+	lower = max(since - duration if duration else since, task.time_start)
+	for start in _expand(task.recurrence, task.time_start, lower, until):
+		end = start + duration if duration else None
+		if end is not None and end <= since:
+			continue
+		yield start, end
+
+def occurrences(task: Task, since: datetime, until: datetime, limit: Optional[int] = None) -> list[Occurrence]:
+	"""Список вхождений iter_occurrences(), не больше limit."""
+	result = []
+	for occurrence in iter_occurrences(task, since, until):
+		if limit is not None and len(result) >= limit:
+			break
+		result.append(occurrence)
+	return result
+
+def next_occurrence(task: Task, after: datetime) -> Optional[Occurrence]:
+	"""
+	Ближайшее вхождение, которое ещё не закончилось к моменту after (у вхождения без окончания —
+	не началось), в пределах SEARCH_HORIZON.
+	"""
+	for occurrence in iter_occurrences(task, after, after + SEARCH_HORIZON):
+		start, end = occurrence
+		if start > after or (end is not None and end > after):
+			return occurrence
+	return None
+
+# --- Разворачивание правил ---
+
+def _expand(rule: JobTrigger, anchor: datetime, since: datetime, until: datetime) -> Iterator[datetime]:
+	"""Начала вхождений правила в [since, until)."""
+	start_date, end_date = _utc(getattr(rule, 'start_date', None)), _utc(getattr(rule, 'end_date', None))
+	if start_date is not None:
+		since = max(since, start_date)
+	if end_date is not None:
+		# end_date включительно, как в APScheduler
+		until = min(until, end_date + timedelta(microseconds=1))
+	if since >= until:
+		return
+
+	if isinstance(rule, IntervalTrigger):
+		yield from _expand_interval(rule, anchor, since, until)
+	elif isinstance(rule, CronTrigger):
+		yield from _compile_cron(rule.model_dump_json()).expand(since, until)
+	else:
+		raise ValueError(f'Unsupported recurrence rule: {rule.type}')
+
+def _expand_interval(rule: IntervalTrigger, anchor: datetime, since: datetime, until: datetime) -> Iterator[datetime]:
+	step = timedelta(weeks=rule.weeks, days=rule.days, hours=rule.hours, minutes=rule.minutes, seconds=rule.seconds)
+	zone = _zone(rule)
+	if zone is not None and step % _ONE_DAY == timedelta(0):
+		yield from _expand_local_interval(step, zone, anchor, since, until)
+		return
+	# Первый шаг не раньше since — без перебора пропущенных
+	current = anchor + step * max(0, math.ceil((since - anchor) / step))
+	while current < until:
+		yield current
+		current += step
+
+def _expand_local_interval(step: timedelta, zone, anchor: datetime, since: datetime, until: datetime) -> Iterator[datetime]:
+	"""Шаги по местному времени: смещение от UTC у разных шагов может отличаться на час."""
+	local_anchor = timezones.to_local(anchor, zone)
+	# На шаг раньше оценки — разница смещений могла сдвинуть первый подходящий шаг
+	current = local_anchor + step * max(0, math.ceil((timezones.to_local(since, zone) - local_anchor) / step) - 1)
+	while True:
+		start = timezones.to_utc(current, zone)
+		if start >= until:
+			return
+		if start >= since:
+			yield start
+		current += step
+
+class _CompiledCron:
+	"""CronTrigger, подготовленный к перебору дней интервала."""
+
+	def __init__(self, rule: CronTrigger):
+		# Разбор и проверка выражений — средствами APScheduler
+		trigger = APSCronTrigger(
+			year=rule.year, month=rule.month, day=rule.day, week=rule.week, day_of_week=rule.day_of_week,
+			hour=rule.hour, minute=rule.minute, second=rule.second, timezone='UTC'
+		)
+		fields = {field.name: field for field in trigger.fields}
+		# Смещения вхождений от начала дня
+		self.offsets = [
+			timedelta(hours=hour, minutes=minute, seconds=second)
+			for hour in sorted(_field_values(fields['hour']))
+			for minute in sorted(_field_values(fields['minute']))
+			for second in sorted(_field_values(fields['second']))
+		]
+		# (значение поля для дня, допустимые значения или None — выражения зависят от месяца, поле APScheduler)
+		self.date_checks = [
+			(_DATE_FIELDS[name], _field_values(fields[name]), fields[name])
+			for name in _DATE_FIELDS if not _matches_all(fields[name])
+		]
+		# Значения полей, зависящих от месяца: (поле, год, месяц) -> значения
+		self._month_values: dict[tuple[str, int, int], set[int]] = {}
+		self.zone = _zone(rule)
+
+	def expand(self, since: datetime, until: datetime) -> Iterator[datetime]:
+		offsets, zone = self.offsets, self.zone
+		day, last_day = self._local(since).date(), self._local(until).date()
+		while day <= last_day:
+			if not self.date_checks or self._day_matches(day):
+				midnight = datetime(day.year, day.month, day.day)
+				for offset in offsets:
+					start = midnight + offset
+					if zone is not None:
+						# Местное время в UTC (несуществующее при переходе на летнее время — как до перехода)
+						start -= zone.utcoffset(start)
+					if start >= until:
+						return
+					if start >= since:
+						yield start
+			day += _ONE_DAY
+
+	def _day_matches(self, day: date) -> bool:
+		for get_value, values, field in self.date_checks:
+			if values is None:
+				values = self._values_in_month(field, day.year, day.month)
+			if get_value(day) not in values:
+				return False
+		return True
+
+	def _values_in_month(self, field, year: int, month: int) -> set[int]:
+		"""Значения поля с выражениями вроде 'last' или '1st mon' в данном месяце."""
+		key = (field.name, year, month)
+		values = self._month_values.get(key)
+		if values is None:
+			values = set()
+			value = 1
+			while value <= monthrange(year, month)[1]:
+				value = field.get_next_value(datetime(year, month, value))
+				if value is None:
+					break
+				values.add(value)
+				value += 1
+			self._month_values[key] = values
+		return values
+
+	def _local(self, value: datetime) -> datetime:
+		if self.zone is None:
+			return value
+		return value.replace(tzinfo=timezone.utc).astimezone(self.zone).replace(tzinfo=None)
+
+@lru_cache(maxsize=1024)
+def _compile_cron(rule_json: str) -> _CompiledCron:
+	return _CompiledCron(CronTrigger.model_validate_json(rule_json))
+
+def _field_values(field) -> Optional[set[int]]:
+	"""
+	Допустимые значения поля по его выражениям или None, если они зависят от даты
+	('last', '1st mon' и т. п. для дня месяца).
+	"""
+	values = set()
+	for expr in field.expressions:
+		if type(expr) is not AllExpression and not isinstance(expr, RangeExpression):
+			return None
+		# Та же арифметика, что в get_next_value() выражений APScheduler
+		first = max(MIN_VALUES[field.name], getattr(expr, 'first', MIN_VALUES[field.name]))
+		last = getattr(expr, 'last', None)
+		last = MAX_VALUES[field.name] if last is None else min(MAX_VALUES[field.name], last)
+		values.update(range(first, last + 1, expr.step or 1))
+	return values
+
+def _matches_all(field) -> bool:
+	return all(str(expr) == '*' for expr in field.expressions)
+
+# --- Вспомогательное ---
+
+def _zone(rule: JobTrigger):
+	"""Часовой пояс правила из кэша dtimebot.scheduling.timezones; None — UTC."""
+	if not rule.timezone or rule.timezone == 'UTC':
+		return None
+	zone = timezones.load_zone(rule.timezone)
+	if zone is None:
+		raise ValueError(f'Unknown timezone: {rule.timezone}')
+	return zone
+
+def _duration(task: Task) -> Optional[timedelta]:
+	if task.time_end is None or task.time_end <= task.time_start:
+		return None
+	return task.time_end - task.time_start
+
+def _overlaps(start: datetime, end: Optional[datetime], since: datetime, until: datetime) -> bool:
+	if end is None:
+		return since <= start < until
+	return start < until and end > since
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+	if value is None or value.tzinfo is None:
+		return value
+	return value.astimezone(timezone.utc).replace(tzinfo=None)
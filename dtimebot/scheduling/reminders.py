@@ -0,0 +1,325 @@
+"""
+Напоминания о начале и окончании задач.
+
+Напоминания хранятся в таблице reminder (по строке на напоминание, индекс по fire_at). Отправку ведёт
+один из движков (ReminderConfig.engine):
+- 'scheduler' — в планировщике всегда висит одно задание: пробуждение к ближайшему напоминанию
+  (DateTrigger). Проснувшись, движок забирает наступившие напоминания пачками, передаёт их notifier
+  и планирует следующее пробуждение;
+- 'wheel' — фоновая задача подгружает из БД расписание ближайших wheel_window секунд (только id и время)
+  в колесо времени (dtimebot.scheduling.wheel) и отправляет наступившие напоминания целыми корзинами.
+  Подходит для плотного потока напоминаний: запрос расписания — раз в полокна, а не на каждое пробуждение.
+В обоих случаях число ожидающих напоминаний не влияет на память процесса и на очередь APScheduler.
+
+Несколько экземпляров бота могут работать с одной БД: перед отправкой экземпляр захватывает пачку
+напоминаний (reminder.claimed_by/claimed_until на lease секунд), остальные её пропускают. Так пачки
+наступивших напоминаний распределяются между экземплярами, и каждое напоминание отправляется один раз;
+если экземпляр упал посреди отправки, пачку после окончания аренды заберёт другой.
+
+task_service вызывает sync_task()/forget_task() в транзакции изменения задачи. У повторяющейся задачи
+в таблице только напоминания ближайшего вхождения: после их отправки движок ставит напоминания следующего.
+"""
+import asyncio
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Literal, Optional
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dtimebot import scheduling
+from dtimebot.logs import main_logger
+from dtimebot.models.tasks import Task
+from dtimebot.scheduling import recurrence
+from dtimebot.scheduling.triggers import DateTrigger
+from dtimebot.scheduling.wheel import TimingWheel
+from dtimebot.services import reminder_service
+from dtimebot.services.reminder_service import DueReminder
+
+
+logger = main_logger.getChild('scheduling.reminders')
+
+JOB_ID = 'reminders_wakeup'
+# Сколько секунд ждать завершения текущей пачки при остановке
+STOP_TIMEOUT = 10
+
+Notifier = Callable[[list[DueReminder]], Awaitable[None]]
+
+
+class ReminderConfig(BaseModel):
+	enabled: bool = True
+	# 'scheduler' — одно задание APScheduler, 'wheel' — колесо времени для плотного потока напоминаний
+	engine: Literal['scheduler', 'wheel'] = 'scheduler'
+	# Сколько напоминаний забирать из БД за один запрос
+	batch_size: int = 500
+	# Просыпаться не реже, чем раз в столько секунд, даже если ближайшего напоминания нет:
+	# так подхватываются напоминания, добавленные другим процессом или в ещё не закоммиченной транзакции
+	max_sleep: int = 60
+	# Напоминания, опоздавшие больше чем на столько секунд (бот был выключен), не отправляются
+	grace: int = 60 * 60
+	# Сколько секунд захваченная пачка принадлежит экземпляру; должно с запасом покрывать отправку пачки
+	lease: int = 5 * 60
+	# wheel: на сколько секунд вперёд держать расписание в памяти
+	wheel_window: int = 5 * 60
+	# wheel: шаг колеса (точность срабатывания), секунды
+	wheel_tick: float = 1.0
+
+
+notifier: Optional[Notifier] = None
+# Время запланированного пробуждения (engine='scheduler')
+next_wakeup: Optional[datetime] = None
+_running: bool = False
+# Самое раннее время, о котором сообщили sync_task() во время обработки пачки
+_hint: Optional[datetime] = None
+
+# engine='wheel'
+_wheel_task: Optional[asyncio.Task] = None
+_wheel_event: Optional[asyncio.Event] = None
+# Расписание с fire_at <= _loaded_until уже в колесе
+_loaded_until: Optional[datetime] = None
+# Перечитать расписание начиная с этого момента (новые напоминания внутри загруженного окна)
+_rescan_from: Optional[datetime] = None
+
+
+def fire_times(task: Task) -> dict[str, datetime]:
+	"""
+	Время напоминаний задачи (UTC). Прошедшие моменты пропускаются;
+	у повторяющейся задачи — время ближайшего незакончившегося вхождения.
+	"""
+	now = datetime.utcnow()
+	if task.recurrence is not None:
+		occurrence = recurrence.next_occurrence(task, now)
+		if occurrence is None:
+			return {}
+		times = {'start': occurrence[0], 'end': occurrence[1]}
+	else:
+		times = {'start': task.time_start, 'end': task.time_end}
+	return {kind: value for kind, value in times.items() if value is not None and value > now}
+
+async def sync_task(session: AsyncSession, task: Task) -> None:
+	"""
+	Пересоздаёт напоминания задачи после создания или изменения её времени.
+	Вызывается в транзакции task_service, чтобы напоминания менялись вместе с задачей.
+	"""
+	times = fire_times(task)
+	await reminder_service.replace_task_reminders(session, task.id, times)
+	if times:
+		wake_at(min(times.values()))
+
+async def forget_task(session: AsyncSession, task_id: int) -> None:
+	"""
+	Удаляет напоминания задачи перед её удалением.
+	"""
+	await reminder_service.delete_task_reminders(session, task_id)
+
+async def forget_directory(session: AsyncSession, directory_id: int) -> None:
+	"""
+	Удаляет напоминания задач директории перед её удалением.
+	"""
+	await reminder_service.delete_directory_reminders(session, directory_id)
+
+def wake_at(fire_at: datetime) -> None:
+	"""
+	Сообщает движку о новом напоминании на fire_at: пробуждение переносится, если оно раньше запланированного.
+	"""
+	global _hint, _rescan_from
+	if notifier is None:
+		return
+	if _wheel_task is not None:
+		# Дальше загруженного окна — подгрузится вместе с остальным расписанием
+		if _loaded_until is not None and fire_at <= _loaded_until:
+			_rescan_from = fire_at if _rescan_from is None else min(_rescan_from, fire_at)
+			_wheel_event.set()
+		return
+	if _running:
+		# Текущая обработка сама запланирует следующее пробуждение с учётом подсказки
+		_hint = fire_at if _hint is None else min(_hint, fire_at)
+		return
+	if next_wakeup is None or fire_at < next_wakeup:
+		_schedule(fire_at)
+
+def start(send: Notifier) -> None:
+	global notifier, _wheel_task, _wheel_event
+	config = _config()
+	if not config.enabled:
+		logger.info("Reminders are disabled")
+		return
+
+	notifier = send
+	if config.engine == 'wheel':
+		_wheel_event = asyncio.Event()
+		_wheel_task = asyncio.create_task(_run_wheel(config))
+	else:
+		# Сразу обрабатываем накопившиеся напоминания и находим ближайшее
+		_schedule(datetime.utcnow())
+	logger.info("Reminders started (engine=%s)", config.engine)
+
+async def stop() -> None:
+	global notifier, next_wakeup, _wheel_task
+	if notifier is None:
+		return
+	notifier = None
+	next_wakeup = None
+	if _wheel_task is not None:
+		# Даём дописать текущую пачку, чтобы отправленные напоминания успели удалиться
+		_wheel_event.set()
+		try:
+			await asyncio.wait_for(_wheel_task, STOP_TIMEOUT)
+		except asyncio.TimeoutError:
+			logger.warning("Reminder wheel did not stop in %ss, cancelled", STOP_TIMEOUT)
+		_wheel_task = None
+	# Задание в хранилище БД общее для всех экземпляров и заменяется при следующем запуске
+	if scheduling.job_store is None and scheduling.scheduler.get_job(JOB_ID):
+		scheduling.scheduler.remove_job(JOB_ID)
+	logger.info("Reminders stopped")
+
+# --- engine='scheduler' ---
+
+def _schedule(fire_at: datetime) -> None:
+	global next_wakeup
+	config = _config()
+	run_date = min(fire_at, datetime.utcnow() + timedelta(seconds=config.max_sleep))
+	trigger = DateTrigger(run_date=run_date, timezone='UTC')
+	# misfire_grace_time=None: пробуждение выполняется, даже если event loop был занят и момент прошёл
+	scheduling.scheduler.add_job(
+		_wakeup, id=JOB_ID, jobstore=scheduling.persistent_jobstore(), replace_existing=True,
+		misfire_grace_time=None, coalesce=True,
+		**trigger.job_kwargs()
+	)
+	next_wakeup = run_date
+
+async def _wakeup() -> None:
+	global _running, _hint, next_wakeup
+	config = _config()
+	_running = True
+	_hint = None
+	next_wakeup = None
+	try:
+		await _process_due(config)
+	finally:
+		if notifier is not None:
+			next_fire_at = await reminder_service.get_next_fire_at()
+			candidates = [value for value in (next_fire_at, _hint) if value is not None]
+			_schedule(min(candidates) if candidates else datetime.utcnow() + timedelta(seconds=config.max_sleep))
+		_running = False
+
+async def _process_due(config: ReminderConfig) -> None:
+	"""Отправляет все незахваченные напоминания с fire_at <= сейчас, пачками по batch_size."""
+	while notifier is not None:
+		now = datetime.utcnow()
+		claimed = await reminder_service.claim_due_reminders(
+			now, config.batch_size, scheduling.instance_id, now + timedelta(seconds=config.lease)
+		)
+		if not claimed:
+			return
+		due = await reminder_service.get_reminders_by_ids(claimed)
+		if not await _send(due, config) or len(claimed) < config.batch_size:
+			return
+
+async def _send(due: list[DueReminder], config: ReminderConfig) -> bool:
+	"""
+	Передаёт notifier неопоздавшие напоминания и удаляет всю пачку.
+	:return: False, если удалить не удалось (пачку не повторяем сразу, попробуем при следующем пробуждении).
+	"""
+	expired_before = datetime.utcnow() - timedelta(seconds=config.grace)
+	fresh = [reminder for reminder in due if reminder.fire_at >= expired_before]
+	if len(fresh) < len(due):
+		logger.warning("Skipping %d reminder(s) overdue by more than %ss", len(due) - len(fresh), config.grace)
+	if fresh:
+		try:
+			await notifier(fresh)
+		except Exception as e:
+			logger.exception("Error while sending %d reminder(s): %s", len(fresh), e)
+	deleted = await reminder_service.delete_reminders([reminder.id for reminder in due])
+	recurring = {reminder.task_id for reminder in due if reminder.recurring}
+	if recurring:
+		# Напоминания следующего вхождения повторяющихся задач
+		next_fire_at = await reminder_service.reschedule_tasks(recurring, fire_times)
+		if next_fire_at is not None:
+			wake_at(next_fire_at)
+	return deleted
+
+# --- engine='wheel' ---
+
+async def _run_wheel(config: ReminderConfig) -> None:
+	global _loaded_until, _rescan_from
+	window = timedelta(seconds=config.wheel_window)
+	wheel: TimingWheel[int] = TimingWheel(
+		start=_timestamp(datetime.utcnow()), tick=config.wheel_tick,
+		slots=math.ceil(max(2 * config.wheel_window, 120) / config.wheel_tick), overflow_tick=60.0
+	)
+	# id напоминаний в колесе — чтобы при перечитывании расписания не добавить их повторно
+	scheduled: set[int] = set()
+
+	# Накопившиеся напоминания отправляем обычной выборкой, дальше работает колесо
+	await _process_due(config)
+	_loaded_until = datetime.utcnow()
+	swept_at = time.monotonic()
+	rescan_after = 0.0
+
+	while notifier is not None:
+		now = datetime.utcnow()
+		if _rescan_from is not None and time.monotonic() >= rescan_after:
+			# Новые напоминания в загруженном окне; ждём tick, чтобы транзакция задачи успела закоммититься
+			since, _rescan_from = _rescan_from, None
+			await _load_schedule(wheel, scheduled, since, _loaded_until, config)
+		if _loaded_until < now + window / 2:
+			until = now + window
+			await _load_schedule(wheel, scheduled, _loaded_until, until, config)
+			_loaded_until = until
+
+		due = wheel.advance(_timestamp(now))
+		if due:
+			scheduled.difference_update(due)
+			for i in range(0, len(due), config.batch_size):
+				await _send_claimed(due[i:i + config.batch_size], config)
+
+		if time.monotonic() - swept_at >= config.max_sleep:
+			# Напоминания, которые прошли мимо колеса (добавлены другим процессом внутри окна)
+			await _process_due(config)
+			swept_at = time.monotonic()
+
+		next_due = wheel.next_due()
+		timeout = min(
+			(_loaded_until - window / 2 - datetime.utcnow()).total_seconds(),
+			swept_at + config.max_sleep - time.monotonic(),
+		)
+		if next_due is not None:
+			timeout = min(timeout, next_due - _timestamp(datetime.utcnow()))
+		if _rescan_from is not None:
+			timeout = min(timeout, rescan_after - time.monotonic())
+		_wheel_event.clear()
+		try:
+			await asyncio.wait_for(_wheel_event.wait(), max(timeout, 0))
+			rescan_after = time.monotonic() + config.wheel_tick
+		except asyncio.TimeoutError:
+			pass
+
+async def _send_claimed(reminder_ids: list[int], config: ReminderConfig) -> None:
+	"""Захватывает напоминания из колеса и отправляет их. Захваченные другим экземпляром пропускаются."""
+	now = datetime.utcnow()
+	claimed = await reminder_service.claim_reminders(
+		reminder_ids, now, scheduling.instance_id, now + timedelta(seconds=config.lease)
+	)
+	if claimed:
+		await _send(await reminder_service.get_reminders_by_ids(claimed), config)
+
+async def _load_schedule(wheel: TimingWheel[int], scheduled: set[int], since: datetime, until: datetime, config: ReminderConfig) -> None:
+	"""Добавляет в колесо расписание с fire_at в [since, until], постранично."""
+	after = (since, 0)
+	while True:
+		page = await reminder_service.get_reminder_schedule(after, until, config.batch_size)
+		for fire_at, reminder_id in page:
+			if reminder_id not in scheduled:
+				scheduled.add(reminder_id)
+				wheel.add(_timestamp(fire_at), reminder_id)
+		if len(page) < config.batch_size:
+			return
+		after = page[-1]
+
+def _timestamp(value: datetime) -> float:
+	return value.replace(tzinfo=timezone.utc).timestamp()
+
+def _config() -> ReminderConfig:
+	return scheduling.config.reminders if scheduling.config else ReminderConfig()
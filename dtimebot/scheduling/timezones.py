@@ -0,0 +1,98 @@
+"""
+Часовые пояса пользователей. Время в БД и в планировщике — UTC без tzinfo; в местное время оно
+переводится при разборе ввода пользователя, при показе и для вычисления границ местных суток.
+
+Часовой пояс пользователя хранится именем IANA в User.timezone (NULL — часовой пояс планировщика).
+Объекты ZoneInfo загружаются из базы tz один раз на имя и дальше берутся из кэша процесса, поэтому
+обработчики, напоминания и разворачивание повторяющихся задач не обращаются к базе tz на каждый запрос.
+"""
+import re
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+from dtimebot.logs import main_logger
+
+
+logger = main_logger.getChild('scheduling.timezones')
+
+
+_OFFSET = re.compile(r'(?:utc|gmt)?\s*([+-])\s*(\d{1,2})(?::?00)?')
+
+
+@lru_cache(maxsize=None)
+def load_zone(name: str) -> Optional[ZoneInfo]:
+	"""ZoneInfo по имени IANA (загружается один раз на имя) или None, если имя неизвестно."""
+	try:
+		return ZoneInfo(name)
+	except (ZoneInfoNotFoundError, ValueError):
+		logger.warning("Unknown timezone %r", name)
+		return None
+
+@lru_cache(maxsize=1)
+def _zone_names() -> dict[str, str]:
+	return {name.lower(): name for name in available_timezones()}
+
+def parse_zone_name(text: str) -> Optional[str]:
+	"""
+	Имя IANA из ввода пользователя: имя без учёта регистра («europe/moscow») или целое смещение
+	от UTC («+3», «UTC-5» -> Etc/GMT-3, Etc/GMT+5). None — не распознано.
+	"""
+	value = text.strip()
+	match = _OFFSET.fullmatch(value.lower())
+	if match:
+		hours = int(match[2])
+		if hours > 14:
+			return None
+		if hours == 0:
+			return 'UTC'
+		# В именах Etc/GMT знак обратный: Etc/GMT-3 — это UTC+3
+		value = f"Etc/GMT{'-' if match[1] == '+' else '+'}{hours}"
+	name = _zone_names().get(value.lower())
+	if name is None or load_zone(name) is None:
+		return None
+	return name
+
+def default_name() -> str:
+	"""Имя часового пояса планировщика (scheduling.timezone), по умолчанию UTC."""
+	from dtimebot import scheduling
+	return scheduling.config.timezone if scheduling.config else 'UTC'
+
+def default_zone() -> tzinfo:
+	"""Часовой пояс планировщика (scheduling.timezone), по умолчанию UTC."""
+	return load_zone(default_name()) or timezone.utc
+
+def get_zone(name: Optional[str]) -> tzinfo:
+	"""
+	Часовой пояс по имени IANA. None и неизвестное имя — часовой пояс планировщика.
+	Объекты ZoneInfo загружаются один раз на имя.
+	"""
+	if name:
+		zone = load_zone(name)
+		if zone is not None:
+			return zone
+	return default_zone()
+
+def effective_name(name: Optional[str]) -> str:
+	"""Имя часового пояса, который действует для User.timezone = name (см. get_zone())."""
+	if name and load_zone(name) is not None:
+		return name
+	return default_name()
+
+def now_local(zone: tzinfo) -> datetime:
+	"""Текущее местное время без tzinfo."""
+	return to_local(datetime.utcnow(), zone)
+
+def to_local(value: datetime, zone: tzinfo) -> datetime:
+	"""UTC без tzinfo -> местное время без tzinfo."""
+	return value.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+
+def to_utc(value: datetime, zone: tzinfo) -> datetime:
+	"""Местное время без tzinfo -> UTC без tzinfo."""
+	return value.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+def local_day(day: date, zone: tzinfo) -> tuple[datetime, datetime]:
+	"""Границы местных суток day в UTC: [начало, начало следующих) — с учётом перехода на летнее время."""
+	midnight = datetime(day.year, day.month, day.day)
+	return to_utc(midnight, zone), to_utc(midnight + timedelta(days=1), zone)
@@ -0,0 +1,98 @@
+import heapq
+import math
+from typing import Generic, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+
+class TimingWheel(Generic[T]):
+	"""
+	Двухуровневое колесо времени для большого числа разовых срабатываний.
+
+	Нижний уровень — slots корзин по tick секунд (охват slots * tick), элементы дальше охвата лежат
+	в корзинах по overflow_tick секунд, упорядоченных кучей, и переносятся в колесо, когда корзина
+	целиком входит в охват. add() — O(1) для ближних элементов и O(log корзин) для дальних,
+	advance(now) разом возвращает все наступившие элементы, не трогая остальные.
+	Время — число секунд (например, UTC timestamp).
+	"""
+
+	def __init__(self, start: float, tick: float = 1.0, slots: int = 3600, overflow_tick: float = 60.0):
+		if slots * tick < 2 * overflow_tick:
+			raise ValueError('Wheel span (slots * tick) must cover at least two overflow buckets')
+		self.tick = tick
+		self.slots = slots
+		self.overflow_tick = overflow_tick
+		self._current = math.floor(start / tick)
+		self._wheel: list[list[tuple[float, T]]] = [[] for _ in range(slots)]
+		self._overflow: dict[int, list[tuple[float, T]]] = {}
+		self._overflow_heap: list[int] = []
+		# Элементы, время которых уже прошло в момент add()
+		self._ready: list[T] = []
+		self._size = 0
+
+	def __len__(self) -> int:
+		return self._size
+
+	def add(self, when: float, item: T) -> None:
+		self._size += 1
+		self._place(when, item)
+
+	def advance(self, now: float) -> list[T]:
+		"""
+		Сдвигает колесо к моменту now.
+		:return: Элементы со временем <= now.
+		"""
+		now_tick = math.floor(now / self.tick)
+		due, self._ready = self._ready, []
+
+		# Целиком прошедшие корзины колеса
+		for k in range(self._current, min(now_tick, self._current + self.slots)):
+			slot = self._wheel[k % self.slots]
+			if slot:
+				due.extend(item for _, item in slot)
+				slot.clear()
+		self._current = max(self._current, now_tick)
+
+		# Корзины переполнения, целиком вошедшие в охват колеса
+		horizon = (self._current + self.slots) * self.tick
+		while self._overflow_heap and (self._overflow_heap[0] + 1) * self.overflow_tick <= horizon:
+			for when, item in self._overflow.pop(heapq.heappop(self._overflow_heap)):
+				self._place(when, item)
+		due.extend(self._ready)
+		self._ready = []
+
+		# Текущая корзина: только наступившие
+		slot = self._wheel[self._current % self.slots]
+		if slot and now_tick == self._current:
+			due.extend(item for when, item in slot if when <= now)
+			slot[:] = [(when, item) for when, item in slot if when > now]
+
+		self._size -= len(due)
+		return due
+
+	def next_due(self) -> Optional[float]:
+		"""Время ближайшего элемента (None, если колесо пусто)."""
+		if self._ready:
+			return float('-inf')
+		for k in range(self._current, self._current + self.slots):
+			slot = self._wheel[k % self.slots]
+			if slot:
+				return min(when for when, _ in slot)
+		if self._overflow_heap:
+			return min(when for when, _ in self._overflow[self._overflow_heap[0]])
+		return None
+
+	def _place(self, when: float, item: T) -> None:
+		k = math.floor(when / self.tick)
+		if k < self._current:
+			self._ready.append(item)
+		elif k < self._current + self.slots:
+			self._wheel[k % self.slots].append((when, item))
+		else:
+			bucket = math.floor(when / self.overflow_tick)
+			items = self._overflow.get(bucket)
+			if items is None:
+				items = self._overflow[bucket] = []
+				heapq.heappush(self._overflow_heap, bucket)
+			items.append((when, item))
@@ -2,10 +2,24 @@ from . import user_service
 from . import directory_service
 from . import task_service
 from . import invitation_service
+from . import reminder_service
+from . import conflict_service
+from . import freebusy_service
+from . import digest_service
+from . import access_service
+from . import membership_service
+from . import loaders
 
 __all__ = [
     'user_service',
     'directory_service', 
     'task_service',
-    'invitation_service'
+    'invitation_service',
+    'reminder_service',
+    'conflict_service',
+    'freebusy_service',
+    'digest_service',
+    'access_service',
+    'membership_service',
+    'loaders'
 ]
@@ -0,0 +1,424 @@
+"""
+Права доступа к задачам директории по правилам AccessRule.
+
+Правило директории выдаёт права (AccessRulePermission: 'view', 'edit', 'delete') участникам, у которых
+есть все теги его subject-фильтров (MemberTag), на задачи, у которых есть все теги его object-фильтров
+(TaskTag). Правило без фильтров какого-то вида подходит всем участникам (всем задачам).
+- Автор задачи имеет все права.
+- Пока у директории нет правил, активные участники могут просматривать и изменять задачи (DEFAULT_MEMBER),
+  удалять — только автор; как только правила появились, права участников определяются только ими.
+- Владелец директории всегда может просматривать и изменять её задачи (DEFAULT_MEMBER), а чужие задачи
+  удалять — только если это разрешает правило, как и остальные участники.
+
+Правила директории компилируются в AccessPolicy: каждому правилу — бит, каждому тегу — маска правил,
+которые его требуют. Маска правил, подходящих участнику (задаче), вычисляется при компиляции
+по его тегам, поэтому проверка «может ли участник изменить задачу» — несколько битовых операций.
+Политики кэшируются по директориям и сбрасываются при изменении правил, тегов участников и задач,
+членства и по истечении CACHE_TTL (см. database.cache_invalidation).
+
+Для выборок списков та же логика выражена условием SQL (task_access_clause()): права проверяются в запросе.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import and_, delete, exists, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from dtimebot.database import cache_invalidation, commit, get_session
+from dtimebot.logs import main_logger
+from dtimebot.models.access_rules import AccessRule, AccessRuleFilter, AccessRulePermission
+from dtimebot.models.directories import Directory
+from dtimebot.models.members import Member, MemberTag
+from dtimebot.models.tasks import Task, TaskTag
+from dtimebot.services import conflict_service, membership_service
+from dtimebot.services.membership_service import UserDirectories
+from dtimebot.services.user_service import resolve_user_id
+
+logger = main_logger.getChild('access_service')
+
+VIEW = 'view'
+EDIT = 'edit'
+DELETE = 'delete'
+# Бит права в масках прав
+PERMISSIONS = {VIEW: 1, EDIT: 2, DELETE: 4}
+ALL = sum(PERMISSIONS.values())
+# Права активных участников директории без правил
+DEFAULT_MEMBER = frozenset({VIEW, EDIT})
+_DEFAULT_MEMBER_MASK = sum(PERMISSIONS[permission] for permission in DEFAULT_MEMBER)
+
+SUBJECT = 'subject'
+OBJECT = 'object'
+
+# Сколько политик директорий держать в памяти и как долго
+CACHE_SIZE = 1024
+CACHE_TTL = timedelta(minutes=1)
+
+
+@dataclass
+class RuleInfo:
+	"""Правило директории в читаемом виде."""
+	id: int
+	permissions: list[str] = field(default_factory=list)
+	subject_tags: list[str] = field(default_factory=list)
+	object_tags: list[str] = field(default_factory=list)
+
+
+class _TagMasks:
+	"""Маски правил по тегам фильтров одного вида (subject или object)."""
+
+	def __init__(self, rules: int):
+		self.rules = rules
+		# Тег -> маска правил, которым он нужен
+		self.requires: dict[str, int] = {}
+		self._cache: dict[frozenset[str], int] = {}
+
+	def require(self, tag: str, rule_bit: int) -> None:
+		self.requires[tag] = self.requires.get(tag, 0) | rule_bit
+
+	def match(self, tags: frozenset[str]) -> int:
+		"""Маска правил, все теги фильтров которых есть в tags (одинаковые наборы тегов считаются один раз)."""
+		mask = self._cache.get(tags)
+		if mask is None:
+			mask = self.rules
+			for tag, rules in self.requires.items():
+				if tag not in tags:
+					mask &= ~rules
+			self._cache[tags] = mask
+		return mask
+
+
+class AccessPolicy:
+	"""
+	Скомпилированные правила директории. Проверки прав — O(1): маски правил участников и задач
+	с тегами фильтров вычислены при компиляции, остальным соответствует маска пустого набора тегов.
+	"""
+
+	def __init__(self, directory_id: int, owner_id: int | None, rules: list[RuleInfo], member_tags: dict[int, set[str]], task_tags: dict[int, set[str]], built_at: datetime):
+		self.directory_id = directory_id
+		self.owner_id = owner_id
+		self.built_at = built_at
+		self.has_rules = bool(rules)
+
+		all_rules = (1 << len(rules)) - 1
+		subjects, objects = _TagMasks(all_rules), _TagMasks(all_rules)
+		# Бит права -> маска правил, которые его выдают
+		self.grants = {bit: 0 for bit in PERMISSIONS.values()}
+		for index, rule in enumerate(rules):
+			rule_bit = 1 << index
+			for tag in rule.subject_tags:
+				subjects.require(tag, rule_bit)
+			for tag in rule.object_tags:
+				objects.require(tag, rule_bit)
+			for permission in rule.permissions:
+				if permission in PERMISSIONS:
+					self.grants[PERMISSIONS[permission]] |= rule_bit
+
+		# Активные участники -> маска подходящих им правил
+		self.members = {user_id: subjects.match(frozenset(tags)) for user_id, tags in member_tags.items()}
+		# Задачи с тегами object-фильтров -> маска подходящих им правил; остальные задачи — default_object
+		self.tasks = {task_id: objects.match(frozenset(tags)) for task_id, tags in task_tags.items()}
+		self.default_object = objects.match(frozenset())
+
+	def permissions(self, user_id: int, task_id: int | None, task_owner_id: int | None) -> int:
+		"""Маска прав пользователя на задачу директории (биты PERMISSIONS)."""
+		if user_id == task_owner_id:
+			return ALL
+		is_owner = user_id == self.owner_id
+		subject = self.members.get(user_id)
+		if subject is None and not is_owner:
+			return 0
+		if not self.has_rules:
+			return _DEFAULT_MEMBER_MASK
+		result = _DEFAULT_MEMBER_MASK if is_owner else 0
+		if subject is None:
+			return result
+		rules = subject & self.tasks.get(task_id, self.default_object)
+		for bit, granting in self.grants.items():
+			if rules & granting:
+				result |= bit
+		return result
+
+	def allows(self, user_id: int, task_id: int | None, task_owner_id: int | None, permission: str) -> bool:
+		return bool(self.permissions(user_id, task_id, task_owner_id) & PERMISSIONS[permission])
+
+	def is_member(self, user_id: int) -> bool:
+		return user_id == self.owner_id or user_id in self.members
+
+
+_policies: OrderedDict[int, AccessPolicy] = OrderedDict()
+# Растёт при каждом сбросе: политика, скомпилированная по данным до сброса, не попадает в кэш
+_generation = 0
+
+
+async def get_policy(session: AsyncSession, directory_id: int) -> AccessPolicy:
+	"""Политика директории из кэша или скомпилированная в сессии вызывающего."""
+	now = datetime.utcnow()
+	policy = _policies.get(directory_id)
+	if policy is not None and now - policy.built_at < CACHE_TTL:
+		_policies.move_to_end(directory_id)
+		return policy
+
+	generation = _generation
+	policy = await _compile(session, directory_id, now)
+	if generation == _generation and CACHE_SIZE > 0:
+		_policies[directory_id] = policy
+		_policies.move_to_end(directory_id)
+		while len(_policies) > CACHE_SIZE:
+			_policies.popitem(last=False)
+	return policy
+
+async def get_rule_policies(session: AsyncSession, directory_ids: Iterable[int]) -> dict[int, AccessPolicy]:
+	"""
+	Политики тех директорий из directory_ids, у которых есть правила, — для массовых проверок (рассылок).
+	В директориях без правил права участников — DEFAULT_MEMBER (просмотр есть у всех участников).
+	Для директорий без политики в кэше — один запрос наличия правил, компилируются только директории с правилами.
+	"""
+	now = datetime.utcnow()
+	result: dict[int, AccessPolicy] = {}
+	unknown = []
+	for directory_id in set(directory_ids):
+		policy = _policies.get(directory_id)
+		if policy is not None and now - policy.built_at < CACHE_TTL:
+			if policy.has_rules:
+				result[directory_id] = policy
+		else:
+			unknown.append(directory_id)
+	if unknown:
+		res = await session.execute(select(AccessRule.directory_id).where(AccessRule.directory_id.in_(unknown)).distinct())
+		for directory_id in res.scalars().all():
+			result[directory_id] = await get_policy(session, directory_id)
+	return result
+
+async def can_access_task(session: AsyncSession, user_id: int, task: Task, permission: str) -> bool:
+	"""Есть ли у пользователя право permission на задачу (в памяти, по политике её директории)."""
+	if task.owner_id == user_id:
+		return True
+	# Не участник директории — без компиляции её политики
+	directories = await membership_service.get_user_directories(session, user_id)
+	if not directories.has_access(task.directory_id):
+		return False
+	policy = await get_policy(session, task.directory_id)
+	return policy.allows(user_id, task.id, task.owner_id, permission)
+
+def task_access_clause(user_id: int, permission: str, directories: UserDirectories | None = None):
+	"""
+	Условие SQL «у пользователя есть право permission на задачу» — то же, что AccessPolicy.allows(),
+	для выборок списков задач. Правила проверяются только в директориях, где они есть.
+	:param directories: Членство пользователя (membership_service.get_user_directories()) —
+	    проверяется списками ID директорий без подзапросов к member и directory.
+	Таблицы подзапросов — псевдонимы, чтобы они не связывались с таблицами запроса вызывающего;
+	внутренние подзапросы связаны с task явно (автоматически связываются только с ближайшим запросом).
+	"""
+	member, tagged_member, member_tag = aliased(Member), aliased(Member), aliased(MemberTag)
+	directory, task_tag = aliased(Directory), aliased(TaskTag)
+	rule, rule_permission, rule_filter = aliased(AccessRule), aliased(AccessRulePermission), aliased(AccessRuleFilter)
+
+	if directories is not None:
+		is_member = Task.directory_id.in_(directories.member)
+		is_directory_owner = Task.directory_id.in_(directories.owned)
+	else:
+		is_member = exists().where(
+			member.directory_id == Task.directory_id, member.user_id == user_id, member.is_active == True
+		)
+		is_directory_owner = exists().where(directory.id == Task.directory_id, directory.owner_id == user_id)
+	has_rules = exists().where(rule.directory_id == Task.directory_id)
+
+	missing_subject_tag = exists().where(
+		rule_filter.rule_id == rule.id,
+		rule_filter.filter_type == SUBJECT,
+		~exists().where(
+			member_tag.member_id == tagged_member.id,
+			member_tag.tag == rule_filter.tag,
+			tagged_member.directory_id == Task.directory_id,
+			tagged_member.user_id == user_id,
+			tagged_member.is_active == True
+		).correlate_except(member_tag, tagged_member)
+	)
+	missing_object_tag = exists().where(
+		rule_filter.rule_id == rule.id,
+		rule_filter.filter_type == OBJECT,
+		~exists().where(task_tag.task_id == Task.id, task_tag.tag == rule_filter.tag).correlate_except(task_tag)
+	)
+	granting_rule = exists().where(
+		rule.directory_id == Task.directory_id,
+		exists().where(rule_permission.rule_id == rule.id, rule_permission.permission == permission),
+		~missing_subject_tag,
+		~missing_object_tag
+	)
+	if permission in DEFAULT_MEMBER:
+		return or_(Task.owner_id == user_id, is_directory_owner, and_(is_member, or_(~has_rules, granting_rule)))
+	# Чужие задачи удаляют только по правилу, в том числе владелец директории (он её участник)
+	return or_(Task.owner_id == user_id, and_(is_member, granting_rule))
+
+@cache_invalidation
+def invalidate_directory(directory_id: int | None) -> None:
+	"""
+	Сбрасывает политику директории (после изменения её правил, тегов, задач с тегами или участников)
+	и индексы пересечений её участников: в них только задачи, которые участник может просматривать.
+	"""
+	global _generation
+	_generation += 1
+	_policies.pop(directory_id, None)
+	conflict_service.invalidate_directory(directory_id)
+
+async def _compile(session: AsyncSession, directory_id: int, now: datetime) -> AccessPolicy:
+	res = await session.execute(select(Directory.owner_id).where(Directory.id == directory_id))
+	owner_id = res.scalar_one_or_none()
+	rules = await _load_rules(session, [directory_id])
+
+	res = await session.execute(
+		select(Member.id, Member.user_id).where(Member.directory_id == directory_id, Member.is_active == True)
+	)
+	members = {member_id: user_id for member_id, user_id in res.all()}
+	member_tags: dict[int, set[str]] = {user_id: set() for user_id in members.values()}
+	task_tags: dict[int, set[str]] = {}
+
+	subject_tags = {tag for rule in rules for tag in rule.subject_tags}
+	if subject_tags and members:
+		res = await session.execute(
+			select(MemberTag.member_id, MemberTag.tag)
+			.join(Member, Member.id == MemberTag.member_id)
+			.where(Member.directory_id == directory_id, Member.is_active == True, MemberTag.tag.in_(subject_tags))
+		)
+		for member_id, tag in res.all():
+			member_tags[members[member_id]].add(tag)
+
+	# Только задачи с тегами, от которых зависят правила
+	object_tags = {tag for rule in rules for tag in rule.object_tags}
+	if object_tags:
+		res = await session.execute(
+			select(TaskTag.task_id, TaskTag.tag)
+			.join(Task, Task.id == TaskTag.task_id)
+			.where(Task.directory_id == directory_id, TaskTag.tag.in_(object_tags))
+		)
+		for task_id, tag in res.all():
+			task_tags.setdefault(task_id, set()).add(tag)
+
+	return AccessPolicy(directory_id, owner_id, rules, member_tags, task_tags, now)
+
+async def _load_rules(session: AsyncSession, directory_ids: Iterable[int]) -> list[RuleInfo]:
+	res = await session.execute(
+		select(AccessRule.id).where(AccessRule.directory_id.in_(directory_ids)).order_by(AccessRule.id)
+	)
+	rules = {rule_id: RuleInfo(rule_id) for rule_id in res.scalars()}
+	if not rules:
+		return []
+	res = await session.execute(
+		select(AccessRulePermission.rule_id, AccessRulePermission.permission).where(AccessRulePermission.rule_id.in_(rules))
+	)
+	for rule_id, permission in res.all():
+		rules[rule_id].permissions.append(permission)
+	res = await session.execute(
+		select(AccessRuleFilter.rule_id, AccessRuleFilter.filter_type, AccessRuleFilter.tag).where(AccessRuleFilter.rule_id.in_(rules))
+	)
+	for rule_id, filter_type, tag in res.all():
+		if filter_type == SUBJECT:
+			rules[rule_id].subject_tags.append(tag)
+		elif filter_type == OBJECT:
+			rules[rule_id].object_tags.append(tag)
+		else:
+			logger.warning("Unknown access rule filter type %r in rule %s", filter_type, rule_id)
+	return list(rules.values())
+
+# --- Управление правилами (только владелец директории) ---
+
+async def _owned_directory(session: AsyncSession, telegram_id: int, directory_id: int, user_id: int | None) -> bool:
+	user_id = await resolve_user_id(session, telegram_id, user_id)
+	if user_id is None:
+		return False
+	res = await session.execute(select(Directory.id).where(Directory.id == directory_id, Directory.owner_id == user_id))
+	return res.scalar_one_or_none() is not None
+
+async def create_rule(telegram_id: int, directory_id: int, permissions: Iterable[str], subject_tags: Iterable[str] = (), object_tags: Iterable[str] = (), user_id: int | None = None) -> int | None:
+	"""
+	Создаёт правило директории.
+	:param permissions: Права из PERMISSIONS.
+	:param subject_tags: Теги, которые должны быть у участника.
+	:param object_tags: Теги, которые должны быть у задачи.
+	:return: ID правила или None (директория не принадлежит пользователю, неизвестное право).
+	"""
+	permissions = sorted(set(permissions))
+	if not permissions or any(permission not in PERMISSIONS for permission in permissions):
+		logger.warning("Invalid access rule permissions %r for directory %s", permissions, directory_id)
+		return None
+	try:
+		async with get_session() as session:
+			if not await _owned_directory(session, telegram_id, directory_id, user_id):
+				return None
+			rule = AccessRule(directory_id=directory_id)
+			session.add(rule)
+			await session.flush()
+			session.add_all([AccessRulePermission(rule_id=rule.id, permission=permission) for permission in permissions])
+			session.add_all(
+				[AccessRuleFilter(rule_id=rule.id, filter_type=SUBJECT, tag=tag) for tag in sorted(set(subject_tags))]
+				+ [AccessRuleFilter(rule_id=rule.id, filter_type=OBJECT, tag=tag) for tag in sorted(set(object_tags))]
+			)
+			await commit(session)
+			invalidate_directory(directory_id)
+			logger.info("Access rule %s created in directory %s by %s", rule.id, directory_id, telegram_id)
+			return rule.id
+	except SQLAlchemyError as e:
+		logger.exception("Error while creating access rule in directory %s: %s", directory_id, e)
+		return None
+
+async def delete_rule(telegram_id: int, rule_id: int, user_id: int | None = None) -> bool:
+	"""Удаляет правило директории, принадлежащей пользователю."""
+	try:
+		async with get_session() as session:
+			res = await session.execute(select(AccessRule.directory_id).where(AccessRule.id == rule_id))
+			directory_id = res.scalar_one_or_none()
+			if directory_id is None or not await _owned_directory(session, telegram_id, directory_id, user_id):
+				return False
+			await session.execute(delete(AccessRulePermission).where(AccessRulePermission.rule_id == rule_id))
+			await session.execute(delete(AccessRuleFilter).where(AccessRuleFilter.rule_id == rule_id))
+			await session.execute(delete(AccessRule).where(AccessRule.id == rule_id))
+			await commit(session)
+			invalidate_directory(directory_id)
+			logger.info("Access rule %s deleted from directory %s by %s", rule_id, directory_id, telegram_id)
+			return True
+	except SQLAlchemyError as e:
+		logger.exception("Error while deleting access rule %s: %s", rule_id, e)
+		return False
+
+async def get_rules(telegram_id: int, directory_id: int, user_id: int | None = None) -> list[RuleInfo]:
+	"""Правила директории, принадлежащей пользователю."""
+	try:
+		async with get_session() as session:
+			if not await _owned_directory(session, telegram_id, directory_id, user_id):
+				return []
+			return await _load_rules(session, [directory_id])
+	except SQLAlchemyError as e:
+		logger.exception("Error while retrieving access rules of directory %s: %s", directory_id, e)
+		return []
+
+async def set_member_tag(telegram_id: int, directory_id: int, member_user_id: int, tag: str, present: bool = True, user_id: int | None = None) -> bool:
+	"""
+	Добавляет (present=True) или снимает тег активного участника директории — subject-тег правил.
+	Доступно владельцу директории.
+	"""
+	try:
+		async with get_session() as session:
+			if not await _owned_directory(session, telegram_id, directory_id, user_id):
+				return False
+			res = await session.execute(
+				select(Member.id).where(Member.directory_id == directory_id, Member.user_id == member_user_id, Member.is_active == True)
+			)
+			member_id = res.scalar_one_or_none()
+			if member_id is None:
+				return False
+			res = await session.execute(select(MemberTag).where(MemberTag.member_id == member_id, MemberTag.tag == tag))
+			existing = res.scalar_one_or_none()
+			if present and existing is None:
+				session.add(MemberTag(member_id=member_id, tag=tag))
+			elif not present and existing is not None:
+				await session.delete(existing)
+			await commit(session)
+			invalidate_directory(directory_id)
+			return True
+	except SQLAlchemyError as e:
+		logger.exception("Error while setting tag %r of member %s in directory %s: %s", tag, member_user_id, directory_id, e)
+		return False
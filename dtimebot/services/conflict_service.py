@@ -0,0 +1,130 @@
+"""
+Пересечения задач по времени: предупреждение о накладках при создании задачи и изменении её времени.
+
+Для каждого пользователя лениво строится индекс задач его директорий (своих и тех, где он участник),
+которые он может просматривать (правила доступа — dtimebot.services.access_service):
+дерево интервалов разовых задач (dtimebot.scheduling.intervals) и список повторяющихся задач,
+вхождения которых вычисляются на интервал запроса. Индекс сбрасывается при записи задач его директорий,
+изменении членства пользователя и правил доступа и по истечении CACHE_TTL (см. database.cache_invalidation).
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from dtimebot.database import cache_invalidation, get_session
+from dtimebot.logs import main_logger
+from dtimebot.models.tasks import Task
+from dtimebot.scheduling import recurrence
+from dtimebot.scheduling.intervals import IntervalTree
+from dtimebot.services import membership_service
+from dtimebot.services.user_service import resolve_user_id
+
+logger = main_logger.getChild('conflict_service')
+
+# Сколько индексов пользователей держать в памяти и как долго
+CACHE_SIZE = 1024
+CACHE_TTL = timedelta(minutes=1)
+
+
+@dataclass
+class Conflict:
+	"""Задача (или вхождение повторяющейся задачи), пересекающаяся с проверяемым интервалом."""
+	task_id: int
+	title: str
+	time_start: datetime
+	time_end: datetime | None
+	recurring: bool = False
+
+
+class _UserIndex:
+	def __init__(self, directory_ids: set[int], tasks: list[Task], built_at: datetime):
+		self.built_at = built_at
+		self.directory_ids = directory_ids
+		self.tree: IntervalTree[Conflict] = IntervalTree(
+			(task.time_start, task.time_end, Conflict(task.id, task.title, task.time_start, task.time_end))
+			for task in tasks if task.recurrence is None
+		)
+		self.recurring = [task for task in tasks if task.recurrence is not None]
+
+	def find(self, start: datetime, end: datetime | None) -> list[Conflict]:
+		result = self.tree.overlap(start, end)
+		until = end if end is not None and end > start else start + timedelta(microseconds=1)
+		for task in self.recurring:
+			for occurrence_start, occurrence_end in recurrence.iter_occurrences(task, start, until):
+				result.append(Conflict(task.id, task.title, occurrence_start, occurrence_end, recurring=True))
+		return result
+
+
+_indexes: OrderedDict[int, _UserIndex] = OrderedDict()
+# Растёт при каждом сбросе: индекс, построенный по данным до сброса, не попадает в кэш
+_generation = 0
+
+
+async def find_conflicts(telegram_id: int, start: datetime, end: datetime | None = None, exclude_task_id: int | None = None, user_id: int | None = None) -> list[Conflict]:
+	"""
+	Задачи из директорий пользователя, пересекающиеся с [start, end) (с моментом start, если end не задан).
+	Задачи без окончания пересекаются с интервалом, если начинаются в нём.
+	:param exclude_task_id: Не считать накладкой саму проверяемую задачу.
+	:return: Пересечения по возрастанию начала.
+	"""
+	index = await _get_index(telegram_id, user_id)
+	if index is None:
+		return []
+	conflicts = [c for c in index.find(start, end) if c.task_id != exclude_task_id]
+	conflicts.sort(key=lambda c: (c.time_start, c.task_id))
+	return conflicts
+
+@cache_invalidation
+def invalidate_directory(directory_id: int | None) -> None:
+	"""Сбрасывает индексы пользователей, у которых есть эта директория (после записи её задачи)."""
+	global _generation
+	_generation += 1
+	for key in [key for key, index in _indexes.items() if directory_id in index.directory_ids]:
+		del _indexes[key]
+
+@cache_invalidation
+def invalidate_user(user_id: int) -> None:
+	"""Сбрасывает индекс пользователя (после изменения его членства в директориях)."""
+	global _generation
+	_generation += 1
+	_indexes.pop(user_id, None)
+
+async def _get_index(telegram_id: int, user_id: int | None) -> _UserIndex | None:
+	now = datetime.utcnow()
+	if user_id is not None:
+		index = _indexes.get(user_id)
+		if index is not None and now - index.built_at < CACHE_TTL:
+			_indexes.move_to_end(user_id)
+			return index
+
+	generation = _generation
+	try:
+		async with get_session() as session:
+			user_id = await resolve_user_id(session, telegram_id, user_id)
+			if user_id is None:
+				return None
+			# access_service импортирует этот модуль (сброс индексов при изменении правил)
+			from dtimebot.services import access_service
+			directories = await membership_service.get_user_directories(session, user_id)
+			directory_ids = set(directories.directory_ids)
+			res = await session.execute(
+				select(Task).where(
+					Task.directory_id.in_(directory_ids), Task.time_start.is_not(None),
+					access_service.task_access_clause(user_id, access_service.VIEW, directories)
+				)
+			)
+			tasks = list(res.scalars())
+	except SQLAlchemyError as e:
+		logger.exception("Error while loading tasks for conflict detection for %s: %s", telegram_id, e)
+		return None
+
+	index = _UserIndex(directory_ids, tasks, now)
+	if generation == _generation and CACHE_SIZE > 0:
+		_indexes[user_id] = index
+		_indexes.move_to_end(user_id)
+		while len(_indexes) > CACHE_SIZE:
+			_indexes.popitem(last=False)
+	return index
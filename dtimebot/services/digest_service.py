@@ -0,0 +1,158 @@
+"""
+Данные утреннего дайджеста (см. dtimebot.scheduling.digest): пользователи захватываются пачками,
+задачи всех пользователей пачки загружаются тремя запросами независимо от размера пачки; в директориях
+с правилами доступа пользователь видит только задачи, которые может просматривать (access_service).
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, tzinfo
+
+from sqlalchemy import or_, select, union, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from dtimebot.database import commit, get_session
+from dtimebot.logs import main_logger
+from dtimebot.models.directories import Directory
+from dtimebot.models.members import Member
+from dtimebot.models.tasks import Task
+from dtimebot.models.users import User
+from dtimebot.scheduling import recurrence
+from dtimebot.services import access_service
+from dtimebot.services.task_service import tasks_in_range
+
+logger = main_logger.getChild('digest_service')
+
+
+@dataclass
+class DigestItem:
+	"""Задача (вхождение повторяющейся задачи) в дайджесте, время — UTC."""
+	task_id: int
+	title: str
+	time_start: datetime
+	time_end: datetime | None
+	recurring: bool = False
+	# Название общей директории; None — личная директория пользователя
+	directory: str | None = None
+
+
+@dataclass
+class Digest:
+	"""Дайджест одного пользователя на местные сутки [start, end) (UTC)."""
+	telegram_id: int
+	start: datetime
+	end: datetime
+	zone: tzinfo
+	items: list[DigestItem] = field(default_factory=list)
+
+
+async def get_digest_timezones() -> list[str | None]:
+	"""Различные часовые пояса пользователей (None — не задан), по индексу ix_user_timezone_id."""
+	try:
+		async with get_session() as session:
+			res = await session.execute(select(User.timezone).distinct())
+			return list(res.scalars())
+	except SQLAlchemyError as e:
+		logger.exception("Error while retrieving user timezones: %s", e)
+		return []
+
+async def claim_digest_users(timezone: str | None, after_id: int, limit: int, sent_before: datetime, now: datetime) -> list[tuple[int, int]]:
+	"""
+	Захватывает до limit пользователей часового пояса с id > after_id, которым дайджест
+	ещё не отправлялся с момента sent_before: их digest_sent_at становится now.
+	Пользователи, захваченные другим экземпляром бота, пропускаются (см. reminder_service._claim).
+	:return: (id, telegram_id) захваченных пользователей.
+	"""
+	candidates = (
+		select(User.id)
+		.where(
+			User.timezone == timezone if timezone is not None else User.timezone.is_(None),
+			User.id > after_id,
+			User.deleted_at.is_(None),
+			or_(User.digest_sent_at.is_(None), User.digest_sent_at < sent_before)
+		)
+		.order_by(User.id)
+		.limit(limit)
+		.with_for_update(skip_locked=True)
+	)
+	stmt = (
+		update(User)
+		.where(User.id.in_(candidates.scalar_subquery()))
+		.values(digest_sent_at=now)
+		.returning(User.id, User.telegram_id)
+		.execution_options(synchronize_session=False)
+	)
+	try:
+		async with get_session() as session:
+			res = await session.execute(stmt)
+			claimed = sorted(tuple(row) for row in res.all())
+			await commit(session)
+			return claimed
+	except SQLAlchemyError as e:
+		logger.exception("Error while claiming digest users: %s", e)
+		return []
+
+async def get_digests(users: list[tuple[int, int]], start: datetime, end: datetime, zone: tzinfo) -> list[Digest]:
+	"""
+	Дайджесты пользователей на [start, end): задачи их директорий (своих и тех, где они участники),
+	пересекающиеся с интервалом и доступные им для просмотра. Три запроса на всю пачку: пары пользователь —
+	директория, задачи этих директорий и наличие в них правил доступа (плюс компиляция политик директорий
+	с правилами, если их нет в кэше); повторяющиеся задачи разворачиваются один раз на директорию.
+	:param users: (id, telegram_id) пользователей.
+	:return: Непустые дайджесты, задачи по возрастанию начала.
+	"""
+	if not users:
+		return []
+	user_ids = [user_id for user_id, _ in users]
+	pairs = union(
+		select(Directory.owner_id.label('user_id'), Directory.id.label('directory_id')).where(Directory.owner_id.in_(user_ids)),
+		select(Member.user_id, Member.directory_id).where(Member.user_id.in_(user_ids), Member.is_active == True)
+	).subquery()
+	try:
+		async with get_session() as session:
+			res = await session.execute(
+				select(pairs.c.user_id, pairs.c.directory_id, Directory.name, Directory.is_self)
+				.join(Directory, Directory.id == pairs.c.directory_id)
+			)
+			memberships = res.all()
+			directories = {row.directory_id: (None if row.is_self else row.name) for row in memberships}
+			if not directories:
+				return []
+
+			res = await session.execute(
+				select(Task.id, Task.title, Task.time_start, Task.time_end, Task.recurrence, Task.directory_id, Task.owner_id)
+				.where(tasks_in_range(list(directories), start, end))
+			)
+			rows = res.all()
+			policies = await access_service.get_rule_policies(session, {row.directory_id for row in rows})
+	except SQLAlchemyError as e:
+		logger.exception("Error while loading digests of %d user(s): %s", len(users), e)
+		return []
+
+	owners = {row.id: row.owner_id for row in rows}
+	by_directory: dict[int, list[DigestItem]] = {}
+	for row in rows:
+		for occurrence_start, occurrence_end in recurrence.iter_occurrences(row, start, end):
+			by_directory.setdefault(row.directory_id, []).append(DigestItem(
+				task_id=row.id, title=row.title, time_start=occurrence_start, time_end=occurrence_end,
+				recurring=row.recurrence is not None, directory=directories[row.directory_id]
+			))
+
+	items: dict[int, list[DigestItem]] = {}
+	for row in memberships:
+		if row.directory_id not in by_directory:
+			continue
+		policy = policies.get(row.directory_id)
+		directory_items = by_directory[row.directory_id]
+		if policy is not None:
+			directory_items = [
+				item for item in directory_items
+				if policy.allows(row.user_id, item.task_id, owners[item.task_id], access_service.VIEW)
+			]
+		items.setdefault(row.user_id, []).extend(directory_items)
+
+	result = []
+	for user_id, telegram_id in users:
+		user_items = items.get(user_id)
+		if user_items:
+			user_items.sort(key=lambda item: (item.time_start, item.task_id))
+			result.append(Digest(telegram_id=telegram_id, start=start, end=end, zone=zone, items=user_items))
+	return result
@@ -6,104 +6,137 @@ from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List
 
-from dtimebot.database import get_session
+from dtimebot.database import commit, get_session
 from dtimebot.models.directories import Directory, DirectoryTag
 from dtimebot.models.members import Member
 from dtimebot.models.users import User
 from dtimebot.logs import main_logger
+from dtimebot.scheduling import reminders
+from dtimebot.services import access_service, conflict_service, membership_service
+from dtimebot.services.user_service import resolve_user_id
 
 logger = main_logger.getChild('directory_service')
 
-async def create_directory(telegram_id: int, name: str, description: str | None = None, owner_user: User | None = None, is_self: bool = False) -> Directory | None:
+async def create_directory(telegram_id: int, name: str, description: str | None = None, owner_user: User | None = None, is_self: bool = False, user_id: int | None = None) -> Directory | None:
 	"""
-	Создать директорию. Если owner_user не передан — попытаемся получить пользователя по telegram_id.
+	Создать директорию. Если не передан ни owner_user, ни user_id — попытаемся получить пользователя по telegram_id.
 	is_self=True — пометить директорию как личную (удалять нельзя).
 	"""
 	try:
 		async with get_session() as session:
 			# Получаем/передаём владельца
-			if owner_user is None:
-				stmt_user = select(User).where(User.telegram_id == telegram_id)
-				res = await session.execute(stmt_user)
-				owner_user = res.scalar_one_or_none()
-				if owner_user is None:
-					logger.warning("User not found for telegram_id=%s while creating directory", telegram_id)
-					return None
+			if owner_user is not None:
+				user_id = owner_user.id
+			user_id = await resolve_user_id(session, telegram_id, user_id)
+			if user_id is None:
+				logger.warning("User not found for telegram_id=%s while creating directory", telegram_id)
+				return None
 
 			# Проверка — не создаём дубликат self-директории
 			if is_self:
-				stmt_check = select(Directory).where(Directory.owner_id == owner_user.id, Directory.is_self == True)
+				stmt_check = select(Directory).where(Directory.owner_id == user_id, Directory.is_self == True)
 				res = await session.execute(stmt_check)
 				existing = res.scalar_one_or_none()
 				if existing:
 					return existing
 
 			directory = Directory(
-				owner_id=owner_user.id,
+				owner_id=user_id,
 				name=name,
 				description=description,
 				is_self=is_self
 			)
 			session.add(directory)
-			await session.commit()
+			await commit(session)
 			await session.refresh(directory)
 
 			# Добавим запись в Member (владелец — участник)
-			member = Member(directory_id=directory.id, user_id=owner_user.id, is_active=True)
+			member = Member(directory_id=directory.id, user_id=user_id, is_active=True)
 			session.add(member)
-			await session.commit()
+			await commit(session)
+			conflict_service.invalidate_user(user_id)
+			membership_service.invalidate_member(user_id, directory.id)
 
-			logger.info("Directory created id=%s owner=%s is_self=%s", directory.id, owner_user.telegram_id, is_self)
+			logger.info("Directory created id=%s owner=%s is_self=%s", directory.id, telegram_id, is_self)
 			return directory
 	except SQLAlchemyError as e:
 		logger.exception("An unexpected error occurred while creating directory for %s: %s", telegram_id, e)
 		return None
 
-async def get_user_directories(telegram_id: int) -> list[Directory]:
+async def get_user_directories(telegram_id: int, user_id: int | None = None) -> list[Directory]:
 	"""
-	Вернуть все директории, доступные пользователю, по членству (включая свои).
+	Вернуть все директории, доступные пользователю, по членству (включая свои), упорядоченные по id.
 	"""
 	try:
 		async with get_session() as session:
-			# Найдём user.id
-			stmt_user = select(User).where(User.telegram_id == telegram_id)
-			res = await session.execute(stmt_user)
-			user = res.scalar_one_or_none()
-			if user is None:
+			user_id = await resolve_user_id(session, telegram_id, user_id)
+			if user_id is None:
 				return []
 
-			# Директории, где пользователь является активным участником (включая владельца)
-			stmt = (
-				select(Directory)
-				.join(Member, Member.directory_id == Directory.id)
-				.where(Member.user_id == user.id, Member.is_active == True)
-			)
-			res = await session.execute(stmt)
-			rows = list(res.scalars().all())
-
-			# Убираем дубли по id
-			unique_by_id: dict[int, Directory] = {}
-			for d in rows:
-				unique_by_id[d.id] = d
-			return list(unique_by_id.values())
+			directories = await membership_service.get_user_directories(session, user_id)
+			res = await session.execute(_user_directories_stmt(directories).order_by(Directory.id))
+			return list(res.scalars().all())
 	except SQLAlchemyError as e:
 		logger.exception("An unexpected error occurred while retrieving directories for %s: %s", telegram_id, e)
 		return []
 
-async def delete_directory(telegram_id: int, directory_id: int) -> bool:
+def _user_directories_stmt(directories: membership_service.UserDirectories):
+	"""
+	Директории, где пользователь является активным участником (включая владельца), без дублей.
+	"""
+	return select(Directory).where(Directory.id.in_(directories.member))
+
+async def get_user_directories_page(
+	telegram_id: int,
+	after_id: int | None = None,
+	before_id: int | None = None,
+	limit: int = 10,
+	user_id: int | None = None
+) -> tuple[list[Directory], bool, bool]:
+	"""
+	Страница директорий пользователя с keyset-пагинацией по id.
+	Из БД читается только limit + 1 строка (лишняя — признак следующей/предыдущей страницы).
+	:param after_id: Вернуть страницу после директории с этим id.
+	:param before_id: Вернуть страницу до директории с этим id.
+	:return: (директории, есть_предыдущая_страница, есть_следующая_страница).
+	"""
+	try:
+		async with get_session() as session:
+			user_id = await resolve_user_id(session, telegram_id, user_id)
+			if user_id is None:
+				return [], False, False
+
+			stmt = _user_directories_stmt(await membership_service.get_user_directories(session, user_id))
+			if before_id is not None:
+				stmt = stmt.where(Directory.id < before_id).order_by(Directory.id.desc()).limit(limit + 1)
+				res = await session.execute(stmt)
+				directories = list(res.scalars().all())
+				has_prev = len(directories) > limit
+				directories = directories[:limit]
+				directories.reverse()
+				return directories, has_prev, True
+
+			if after_id is not None:
+				stmt = stmt.where(Directory.id > after_id)
+			stmt = stmt.order_by(Directory.id).limit(limit + 1)
+			res = await session.execute(stmt)
+			directories = list(res.scalars().all())
+			return directories[:limit], after_id is not None, len(directories) > limit
+	except SQLAlchemyError as e:
+		logger.exception("An unexpected error occurred while retrieving directories page for %s: %s", telegram_id, e)
+		return [], False, False
+
+async def delete_directory(telegram_id: int, directory_id: int, user_id: int | None = None) -> bool:
 	"""
 	Удаление директории — запрещено, если is_self=True. Допускается только владельцу.
 	"""
 	try:
 		async with get_session() as session:
-			# Определяем пользователя
-			stmt_user = select(User).where(User.telegram_id == telegram_id)
-			res_user = await session.execute(stmt_user)
-			user = res_user.scalar_one_or_none()
-			if user is None:
+			user_id = await resolve_user_id(session, telegram_id, user_id)
+			if user_id is None:
 				return False
 
-			stmt = select(Directory).where(Directory.id == directory_id, Directory.owner_id == user.id)
+			stmt = select(Directory).where(Directory.id == directory_id, Directory.owner_id == user_id)
 			res = await session.execute(stmt)
 			directory = res.scalar_one_or_none()
 			if directory is None:
@@ -113,35 +146,38 @@ async def delete_directory(telegram_id: int, directory_id: int) -> bool:
 				logger.warning("Attempt to delete self directory id=%s by telegram=%s", directory_id, telegram_id)
 				return False
 
+			# Задачи директории после её удаления недоступны — их напоминания не должны приходить
+			await reminders.forget_directory(session, directory_id)
 			await session.delete(directory)
-			await session.commit()
+			await commit(session)
+			conflict_service.invalidate_directory(directory_id)
+			access_service.invalidate_directory(directory_id)
+			membership_service.invalidate_directory(directory_id)
 			return True
 	except SQLAlchemyError as e:
 		logger.exception("Error deleting directory %s: %s", directory_id, e)
 		return False
 
 
-async def add_tag_to_directory(owner_telegram_id: int, directory_id: int, tag: str) -> bool:
+async def add_tag_to_directory(owner_telegram_id: int, directory_id: int, tag: str, user_id: int | None = None) -> bool:
 	"""
 	Добавляет тег к директории.
 	:param owner_telegram_id: Telegram ID владельца директории.
 	:param directory_id: ID директории.
 	:param tag: Тег для добавления.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: True, если успешно, иначе False.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"Пользователь с telegram_id={owner_telegram_id} не найден.")
 				return False
 
 			# Найти директорию, принадлежащую этому пользователю
-			stmt_dir = select(Directory).where(Directory.id == directory_id, Directory.owner_id == user.id)
+			stmt_dir = select(Directory).where(Directory.id == directory_id, Directory.owner_id == user_id)
 			result_dir = await session.execute(stmt_dir)
 			directory = result_dir.scalar_one_or_none()
 
@@ -164,7 +200,7 @@ async def add_tag_to_directory(owner_telegram_id: int, directory_id: int, tag: s
 			# Добавить тег
 			new_tag = DirectoryTag(directory_id=directory_id, tag=tag)
 			session.add(new_tag)
-			await session.commit()
+			await commit(session)
 			logger.info(f"Тег '{tag}' добавлен к директории {directory_id}.")
 			return True
 
@@ -175,27 +211,25 @@ async def add_tag_to_directory(owner_telegram_id: int, directory_id: int, tag: s
 		logger.error(f"Неожиданная ошибка при добавлении тега '{tag}' к директории {directory_id}: {e}", exc_info=True)
 		return False
 
-async def remove_tag_from_directory(owner_telegram_id: int, directory_id: int, tag: str) -> bool:
+async def remove_tag_from_directory(owner_telegram_id: int, directory_id: int, tag: str, user_id: int | None = None) -> bool:
 	"""
 	Удаляет тег из директории.
 	:param owner_telegram_id: Telegram ID владельца директории.
 	:param directory_id: ID директории.
 	:param tag: Тег для удаления.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: True, если успешно, иначе False.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"Пользователь с telegram_id={owner_telegram_id} не найден.")
 				return False
 
 			# Найти директорию, принадлежащую этому пользователю
-			stmt_dir = select(Directory).where(Directory.id == directory_id, Directory.owner_id == user.id)
+			stmt_dir = select(Directory).where(Directory.id == directory_id, Directory.owner_id == user_id)
 			result_dir = await session.execute(stmt_dir)
 			directory = result_dir.scalar_one_or_none()
 
@@ -217,7 +251,7 @@ async def remove_tag_from_directory(owner_telegram_id: int, directory_id: int, t
 
 			# Удалить тег
 			await session.delete(tag_to_remove)
-			await session.commit()
+			await commit(session)
 			logger.info(f"Тег '{tag}' удален из директории {directory_id}.")
 			return True
 
@@ -228,34 +262,25 @@ async def remove_tag_from_directory(owner_telegram_id: int, directory_id: int, t
 		logger.error(f"Неожиданная ошибка при удалении тега '{tag}' из директории {directory_id}: {e}", exc_info=True)
 		return False
 
-async def get_directory_tags(owner_telegram_id: int, directory_id: int) -> List[str]:
+async def get_directory_tags(owner_telegram_id: int, directory_id: int, user_id: int | None = None) -> List[str]:
 	"""
 	Получает список тегов директории.
 	:param owner_telegram_id: Telegram ID пользователя (владельца или участника).
 	:param directory_id: ID директории.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: Список тегов.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"Пользователь с telegram_id={owner_telegram_id} не найден.")
 				return []
 
 			# Проверить, что пользователь имеет доступ к директории (владелец или участник)
-			from dtimebot.models.members import Member
-			stmt_access = (
-				select(Directory)
-				.outerjoin(Member, (Member.directory_id == Directory.id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					(Directory.id == directory_id) & 
-					((Directory.owner_id == user.id) | (Member.user_id == user.id))
-				)
-			)
+			directories = await membership_service.get_user_directories(session, user_id)
+			stmt_access = select(Directory).where(Directory.id == directory_id, Directory.id.in_(directories.directory_ids))
 			result_access = await session.execute(stmt_access)
 			directory = result_access.scalar_one_or_none()
 
@@ -277,34 +302,28 @@ async def get_directory_tags(owner_telegram_id: int, directory_id: int) -> List[
 		logger.error(f"Неожиданная ошибка при получении тегов директории {directory_id}: {e}", exc_info=True)
 		return []
 	
-async def get_user_directories_by_tag(owner_telegram_id: int, tag: str) -> List[Directory]:
+async def get_user_directories_by_tag(owner_telegram_id: int, tag: str, user_id: int | None = None) -> List[Directory]:
 	"""
 	Получает список директорий пользователя, у которых есть указанный тег.
 	:param owner_telegram_id: Telegram ID пользователя (владельца или участника).
 	:param tag: Тег для фильтрации.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: Список объектов Directory.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"Пользователь с telegram_id={owner_telegram_id} не найден.")
 				return []
 
 			# Найти директории пользователя (владельца или участника), у которых есть тег
-			from dtimebot.models.members import Member
+			directories = await membership_service.get_user_directories(session, user_id)
 			stmt_dirs = (
 				select(Directory)
 				.join(DirectoryTag, Directory.id == DirectoryTag.directory_id)
-				.outerjoin(Member, (Member.directory_id == Directory.id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					DirectoryTag.tag == tag,
-					((Directory.owner_id == user.id) | (Member.user_id == user.id))
-				)
+				.where(DirectoryTag.tag == tag, Directory.id.in_(directories.directory_ids))
 			)
 			result_dirs = await session.execute(stmt_dirs)
 			directories = list(result_dirs.scalars().all())
@@ -324,28 +343,26 @@ async def get_user_directories_by_tag(owner_telegram_id: int, tag: str) -> List[
 		logger.error(f"Неожиданная ошибка при фильтрации директорий по тегу '{tag}' для {owner_telegram_id}: {e}", exc_info=True)
 		return []
 
-async def update_directory(owner_telegram_id: int, directory_id: int, name: str = None, description: str = None) -> bool:
+async def update_directory(owner_telegram_id: int, directory_id: int, name: str = None, description: str = None, user_id: int | None = None) -> bool:
 	"""
 	Обновляет информацию о директории.
 	:param owner_telegram_id: Telegram ID владельца директории.
 	:param directory_id: ID директории.
 	:param name: Новое название (None = не изменять).
 	:param description: Новое описание (None = не изменять).
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: True, если успешно, иначе False.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"Пользователь с telegram_id={owner_telegram_id} не найден.")
 				return False
 
 			# Найти директорию, принадлежащую этому пользователю
-			stmt_dir = select(Directory).where(Directory.id == directory_id, Directory.owner_id == user.id)
+			stmt_dir = select(Directory).where(Directory.id == directory_id, Directory.owner_id == user_id)
 			result_dir = await session.execute(stmt_dir)
 			directory = result_dir.scalar_one_or_none()
 
@@ -359,7 +376,7 @@ async def update_directory(owner_telegram_id: int, directory_id: int, name: str
 			if description is not None:
 				directory.description = description
 
-			await session.commit()
+			await commit(session)
 			logger.info(f"Директория {directory_id} обновлена пользователем {owner_telegram_id}.")
 			return True
 
@@ -370,33 +387,24 @@ async def update_directory(owner_telegram_id: int, directory_id: int, name: str
 		logger.error(f"Неожиданная ошибка при обновлении директории {directory_id}: {e}", exc_info=True)
 		return False
 
-async def get_directory_by_id(owner_telegram_id: int, directory_id: int) -> Directory | None:
+async def get_directory_by_id(owner_telegram_id: int, directory_id: int, user_id: int | None = None) -> Directory | None:
 	"""
 	Получает директорию по ID с проверкой прав доступа.
 	:param owner_telegram_id: Telegram ID пользователя (владельца или участника).
 	:param directory_id: ID директории.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: Объект Directory или None.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				return None
 
 			# Найти директорию с проверкой прав доступа (владелец или участник)
-			from dtimebot.models.members import Member
-			stmt_dir = (
-				select(Directory)
-				.outerjoin(Member, (Member.directory_id == Directory.id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					(Directory.id == directory_id) & 
-					((Directory.owner_id == user.id) | (Member.user_id == user.id))
-				)
-			)
+			directories = await membership_service.get_user_directories(session, user_id)
+			stmt_dir = select(Directory).where(Directory.id == directory_id, Directory.id.in_(directories.directory_ids))
 			result_dir = await session.execute(stmt_dir)
 			directory = result_dir.scalar_one_or_none()
 
@@ -409,21 +417,84 @@ async def get_directory_by_id(owner_telegram_id: int, directory_id: int) -> Dire
 		return None
 
 
-async def get_owned_directories(telegram_id: int) -> list[Directory]:
+async def get_owned_directories(telegram_id: int, user_id: int | None = None) -> list[Directory]:
 	"""
 	Вернуть директории, где пользователь является владельцем.
 	"""
 	try:
 		async with get_session() as session:
-			stmt_user = select(User).where(User.telegram_id == telegram_id)
-			res_user = await session.execute(stmt_user)
-			user = res_user.scalar_one_or_none()
-			if not user:
+			user_id = await resolve_user_id(session, telegram_id, user_id)
+			if user_id is None:
 				return []
 
-			stmt = select(Directory).where(Directory.owner_id == user.id)
+			stmt = select(Directory).where(Directory.owner_id == user_id)
 			res = await session.execute(stmt)
 			return list(res.scalars().all())
 	except SQLAlchemyError as e:
 		logger.exception("An unexpected error occurred while retrieving owned directories for %s: %s", telegram_id, e)
-		return []
\ No newline at end of file
+		return []
+
+async def get_directories_by_ids(owner_telegram_id: int, directory_ids: list[int], user_id: int | None = None) -> dict[int, Directory]:
+	"""
+	Получает несколько директорий по ID одним запросом с проверкой прав доступа.
+	:param owner_telegram_id: Telegram ID пользователя (владельца или участника).
+	:param directory_ids: Список ID директорий.
+	:param user_id: Внутренний ID пользователя, если уже известен.
+	:return: Словарь {directory_id: Directory} только для доступных директорий.
+	"""
+	if not directory_ids:
+		return {}
+	try:
+		async with get_session() as session:
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
+
+			if user_id is None:
+				return {}
+
+			directories = await membership_service.get_user_directories(session, user_id)
+			stmt_dirs = select(Directory).where(Directory.id.in_(directories.directory_ids.intersection(directory_ids)))
+			result_dirs = await session.execute(stmt_dirs)
+			return {directory.id: directory for directory in result_dirs.scalars().all()}
+	except SQLAlchemyError as e:
+		logger.error(f"Ошибка SQLAlchemy при получении директорий {directory_ids}: {e}", exc_info=True)
+		return {}
+	except Exception as e:
+		logger.error(f"Неожиданная ошибка при получении директорий {directory_ids}: {e}", exc_info=True)
+		return {}
+
+async def get_tags_for_directories(owner_telegram_id: int, directory_ids: list[int], user_id: int | None = None) -> dict[int, list[str]]:
+	"""
+	Получает теги сразу для нескольких директорий одним запросом.
+	:param owner_telegram_id: Telegram ID пользователя (владельца или участника).
+	:param directory_ids: Список ID директорий.
+	:param user_id: Внутренний ID пользователя, если уже известен.
+	:return: Словарь {directory_id: [теги]} только для доступных директорий.
+	"""
+	if not directory_ids:
+		return {}
+	try:
+		async with get_session() as session:
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
+
+			if user_id is None:
+				logger.warning(f"Пользователь с telegram_id={owner_telegram_id} не найден.")
+				return {}
+
+			directories = await membership_service.get_user_directories(session, user_id)
+			stmt_tags = (
+				select(DirectoryTag.directory_id, DirectoryTag.tag)
+				.where(DirectoryTag.directory_id.in_(directories.directory_ids.intersection(directory_ids)))
+				.distinct()
+			)
+			result_tags = await session.execute(stmt_tags)
+			tags: dict[int, list[str]] = {}
+			for directory_id, tag in result_tags.all():
+				tags.setdefault(directory_id, []).append(tag)
+			return tags
+
+	except SQLAlchemyError as e:
+		logger.error(f"Ошибка SQLAlchemy при получении тегов директорий {directory_ids}: {e}", exc_info=True)
+		return {}
+	except Exception as e:
+		logger.error(f"Неожиданная ошибка при получении тегов директорий {directory_ids}: {e}", exc_info=True)
+		return {}
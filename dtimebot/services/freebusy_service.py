@@ -0,0 +1,89 @@
+"""
+Свободное и занятое время участников директории: когда свободны все сразу.
+
+Занятость участника — задачи с окончанием, автор которых он сам, в директориях, где он сейчас владелец
+или участник; повторяющиеся задачи разворачиваются во вхождения. Чужие задачи, даже видимые участнику
+по правилам доступа, его не занимают: иначе большая общая директория одного участника закрывала бы
+всё время, а время задач людей вне директории было бы видно через её занятость. Задачи всех участников загружаются одним запросом
+по индексам интервала (см. task_service.tasks_in_range) — без названий, только время, — и объединяются
+проходом по отсортированным началам (dtimebot.scheduling.intervals).
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, or_, select, union
+from sqlalchemy.exc import SQLAlchemyError
+
+from dtimebot.database import get_session
+from dtimebot.logs import main_logger
+from dtimebot.models.directories import Directory
+from dtimebot.models.members import Member
+from dtimebot.models.tasks import Task
+from dtimebot.scheduling import intervals, recurrence
+from dtimebot.services import membership_service
+from dtimebot.services.task_service import tasks_in_range
+from dtimebot.services.user_service import resolve_user_id
+
+logger = main_logger.getChild('freebusy_service')
+
+
+@dataclass
+class FreeBusy:
+	"""Занятость участников директории на интервале."""
+	members: int
+	# Объединённые интервалы, когда занят хотя бы один участник, и свободные промежутки между ними
+	busy: list[tuple[datetime, datetime]] = field(default_factory=list)
+	free: list[tuple[datetime, datetime]] = field(default_factory=list)
+
+
+async def get_free_busy(telegram_id: int, directory_id: int, start: datetime, end: datetime, min_free: timedelta | None = None, user_id: int | None = None) -> FreeBusy | None:
+	"""
+	Когда на [start, end) свободны все активные участники директории.
+	Доступно владельцу и участникам директории.
+	:param min_free: Не возвращать свободные промежутки короче.
+	:return: None, если директория не найдена или недоступна пользователю.
+	"""
+	try:
+		async with get_session() as session:
+			user_id = await resolve_user_id(session, telegram_id, user_id)
+			if user_id is None:
+				return None
+
+			directory = await membership_service.get_directory_members(session, directory_id)
+			if directory is None or not directory.has_access(user_id) or not directory.user_ids:
+				return None
+			members = list(directory.user_ids)
+			member_directory_ids = union(
+				select(Directory.id).where(Directory.owner_id.in_(members)),
+				select(Member.directory_id).where(Member.user_id.in_(members), Member.is_active == True)
+			)
+
+			res = await session.execute(
+				select(Task.time_start, Task.time_end, Task.recurrence)
+				.where(
+					tasks_in_range(member_directory_ids, start, end), Task.time_end.is_not(None),
+					Task.owner_id.in_(members), _author_in_directory()
+				)
+			)
+			rows = res.all()
+	except SQLAlchemyError as e:
+		logger.exception("Error while loading busy time of directory %s for %s: %s", directory_id, telegram_id, e)
+		return None
+
+	# Разовые задачи запрос уже отобрал по пересечению с интервалом, разворачивать нужно только
+	# повторяющиеся (строки (time_start, time_end, recurrence) разворачиваются так же, как задачи)
+	busy = [(row.time_start, row.time_end) for row in rows if row.recurrence is None]
+	for row in rows:
+		if row.recurrence is not None:
+			busy.extend(occurrence for occurrence in recurrence.iter_occurrences(row, start, end) if occurrence[1] is not None)
+	busy = intervals.merge(busy)
+	free = intervals.gaps(busy, start, end, min_free)
+	busy = [(max(busy_start, start), min(busy_end, end)) for busy_start, busy_end in busy if busy_start < end and busy_end > start]
+	return FreeBusy(members=len(members), busy=busy, free=free)
+
+def _author_in_directory():
+	"""Условие: автор задачи — владелец или активный участник её директории (а не вышедший из неё)."""
+	return or_(
+		exists().where(Directory.id == Task.directory_id, Directory.owner_id == Task.owner_id),
+		exists().where(Member.directory_id == Task.directory_id, Member.user_id == Task.owner_id, Member.is_active == True)
+	)
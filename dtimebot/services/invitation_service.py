@@ -5,12 +5,14 @@ from typing import Optional, List
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 
-from dtimebot.database import get_session
+from dtimebot.database import commit, get_session
 from dtimebot.models.invitations import Invitation
 from dtimebot.models.members import Member
 from dtimebot.models.users import User
 from dtimebot.models.directories import Directory
 from dtimebot.logs import main_logger
+from dtimebot.services import access_service, conflict_service, membership_service
+from dtimebot.services.user_service import resolve_user_id
 
 logger = main_logger.getChild('invitation_service')
 
@@ -24,7 +26,8 @@ async def create_invitation(
     directory_id: int, 
     max_uses: Optional[int] = None,
     valid_until: Optional[datetime] = None,
-    filter_tag: Optional[str] = None
+    filter_tag: Optional[str] = None,
+    user_id: int | None = None
 ) -> Optional[Invitation]:
     """
     Создает приглашение в директорию.
@@ -35,25 +38,23 @@ async def create_invitation(
         max_uses: Максимальное количество использований (None = без ограничений)
         valid_until: Дата истечения приглашения (None = без ограничений)
         filter_tag: Тег для фильтрации доступа к задачам
+        user_id: Внутренний ID пользователя, если уже известен
     
     Returns:
         Объект приглашения или None при ошибке
     """
     try:
         async with get_session() as session:
-            # Проверяем, что пользователь существует и является владельцем директории
-            stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-            result_user = await session.execute(stmt_user)
-            user = result_user.scalar_one_or_none()
+            user_id = await resolve_user_id(session, owner_telegram_id, user_id)
             
-            if not user:
+            if user_id is None:
                 logger.warning(f"User with telegram_id={owner_telegram_id} not found")
                 return None
             
             # Проверяем, что директория существует и принадлежит пользователю
             stmt_dir = select(Directory).where(
                 Directory.id == directory_id,
-                Directory.owner_id == user.id
+                Directory.owner_id == user_id
             )
             result_dir = await session.execute(stmt_dir)
             directory = result_dir.scalar_one_or_none()
@@ -72,7 +73,7 @@ async def create_invitation(
             
             # Создаем приглашение
             invitation = Invitation(
-                owner_id=user.id,
+                owner_id=user_id,
                 directory_id=directory_id,
                 code=code,
                 max_uses=max_uses,
@@ -82,7 +83,7 @@ async def create_invitation(
             )
             
             session.add(invitation)
-            await session.commit()
+            await commit(session)
             await session.refresh(invitation)
             
             logger.info(f"Invitation created: code={code}, directory={directory_id}, owner={owner_telegram_id}")
@@ -95,25 +96,23 @@ async def create_invitation(
         logger.error(f"Unexpected error while creating invitation: {e}", exc_info=True)
         return None
 
-async def join_directory_by_code(telegram_id: int, code: str) -> bool:
+async def join_directory_by_code(telegram_id: int, code: str, user_id: int | None = None) -> bool:
     """
     Присоединяет пользователя к директории по коду приглашения.
     
     Args:
         telegram_id: Telegram ID пользователя
         code: Код приглашения
+        user_id: Внутренний ID пользователя, если уже известен
     
     Returns:
         True если успешно присоединился, False в противном случае
     """
     try:
         async with get_session() as session:
-            # Находим пользователя
-            stmt_user = select(User).where(User.telegram_id == telegram_id)
-            result_user = await session.execute(stmt_user)
-            user = result_user.scalar_one_or_none()
+            user_id = await resolve_user_id(session, telegram_id, user_id)
             
-            if not user:
+            if user_id is None:
                 logger.warning(f"User with telegram_id={telegram_id} not found")
                 return False
             
@@ -139,7 +138,7 @@ async def join_directory_by_code(telegram_id: int, code: str) -> bool:
             # Проверяем, не является ли пользователь уже участником
             stmt_member = select(Member).where(
                 Member.directory_id == invitation.directory_id,
-                Member.user_id == user.id,
+                Member.user_id == user_id,
                 Member.is_active == True
             )
             result_member = await session.execute(stmt_member)
@@ -152,7 +151,7 @@ async def join_directory_by_code(telegram_id: int, code: str) -> bool:
             # Добавляем пользователя как участника
             member = Member(
                 directory_id=invitation.directory_id,
-                user_id=user.id,
+                user_id=user_id,
                 invitation_id=invitation.id,
                 is_active=True
             )
@@ -162,7 +161,10 @@ async def join_directory_by_code(telegram_id: int, code: str) -> bool:
             # Увеличиваем счетчик использований
             invitation.used_count += 1
             
-            await session.commit()
+            await commit(session)
+            conflict_service.invalidate_user(user_id)
+            access_service.invalidate_directory(invitation.directory_id)
+            membership_service.invalidate_member(user_id, invitation.directory_id)
             
             logger.info(f"User {telegram_id} successfully joined directory via invitation {code}")
             return True
@@ -174,30 +176,28 @@ async def join_directory_by_code(telegram_id: int, code: str) -> bool:
         logger.error(f"Unexpected error while joining directory: {e}", exc_info=True)
         return False
 
-async def get_directory_members(owner_telegram_id: int, directory_id: int) -> List[User]:
+async def get_directory_members(owner_telegram_id: int, directory_id: int, user_id: int | None = None) -> List[User]:
     """
     Получает список участников директории.
     
     Args:
         owner_telegram_id: Telegram ID владельца директории
         directory_id: ID директории
+        user_id: Внутренний ID пользователя, если уже известен
     
     Returns:
         Список пользователей-участников
     """
     try:
         async with get_session() as session:
-            # Проверяем права доступа
-            stmt_owner = select(User).where(User.telegram_id == owner_telegram_id)
-            result_owner = await session.execute(stmt_owner)
-            owner = result_owner.scalar_one_or_none()
+            user_id = await resolve_user_id(session, owner_telegram_id, user_id)
             
-            if not owner:
+            if user_id is None:
                 return []
             
             stmt_dir = select(Directory).where(
                 Directory.id == directory_id,
-                Directory.owner_id == owner.id
+                Directory.owner_id == user_id
             )
             result_dir = await session.execute(stmt_dir)
             directory = result_dir.scalar_one_or_none()
@@ -226,31 +226,29 @@ async def get_directory_members(owner_telegram_id: int, directory_id: int) -> Li
         logger.error(f"Unexpected error while getting directory members: {e}", exc_info=True)
         return []
 
-async def leave_directory(telegram_id: int, directory_id: int) -> bool:
+async def leave_directory(telegram_id: int, directory_id: int, user_id: int | None = None) -> bool:
     """
     Покидает директорию.
     
     Args:
         telegram_id: Telegram ID пользователя
         directory_id: ID директории
+        user_id: Внутренний ID пользователя, если уже известен
     
     Returns:
         True если успешно покинул, False в противном случае
     """
     try:
         async with get_session() as session:
-            # Находим пользователя
-            stmt_user = select(User).where(User.telegram_id == telegram_id)
-            result_user = await session.execute(stmt_user)
-            user = result_user.scalar_one_or_none()
+            user_id = await resolve_user_id(session, telegram_id, user_id)
             
-            if not user:
+            if user_id is None:
                 return False
             
             # Проверяем, что пользователь не является владельцем
             stmt_dir = select(Directory).where(
                 Directory.id == directory_id,
-                Directory.owner_id == user.id
+                Directory.owner_id == user_id
             )
             result_dir = await session.execute(stmt_dir)
             directory = result_dir.scalar_one_or_none()
@@ -262,7 +260,7 @@ async def leave_directory(telegram_id: int, directory_id: int) -> bool:
             # Находим и деактивируем членство
             stmt_member = select(Member).where(
                 Member.directory_id == directory_id,
-                Member.user_id == user.id,
+                Member.user_id == user_id,
                 Member.is_active == True
             )
             result_member = await session.execute(stmt_member)
@@ -275,7 +273,10 @@ async def leave_directory(telegram_id: int, directory_id: int) -> bool:
             member.is_active = False
             member.deleted_at = datetime.utcnow()
             
-            await session.commit()
+            await commit(session)
+            conflict_service.invalidate_user(user_id)
+            access_service.invalidate_directory(directory_id)
+            membership_service.invalidate_member(user_id, directory_id)
             
             logger.info(f"User {telegram_id} left directory {directory_id}")
             return True
@@ -287,26 +288,25 @@ async def leave_directory(telegram_id: int, directory_id: int) -> bool:
         logger.error(f"Unexpected error while leaving directory: {e}", exc_info=True)
         return False
 
-async def get_user_invitations(owner_telegram_id: int) -> List[Invitation]:
+async def get_user_invitations(owner_telegram_id: int, user_id: int | None = None) -> List[Invitation]:
     """
     Получает список приглашений пользователя.
     
     Args:
         owner_telegram_id: Telegram ID владельца
+        user_id: Внутренний ID пользователя, если уже известен
     
     Returns:
         Список приглашений
     """
     try:
         async with get_session() as session:
-            stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-            result_user = await session.execute(stmt_user)
-            user = result_user.scalar_one_or_none()
+            user_id = await resolve_user_id(session, owner_telegram_id, user_id)
             
-            if not user:
+            if user_id is None:
                 return []
             
-            stmt_inv = select(Invitation).where(Invitation.owner_id == user.id)
+            stmt_inv = select(Invitation).where(Invitation.owner_id == user_id)
             result_inv = await session.execute(stmt_inv)
             invitations = list(result_inv.scalars().all())
             
@@ -319,26 +319,24 @@ async def get_user_invitations(owner_telegram_id: int) -> List[Invitation]:
         logger.error(f"Unexpected error while getting user invitations: {e}", exc_info=True)
         return []
 
-async def delete_invitation(owner_telegram_id: int, invitation_id: int) -> bool:
+async def delete_invitation(owner_telegram_id: int, invitation_id: int, user_id: int | None = None) -> bool:
     """
     Удаляет приглашение, если оно принадлежит пользователю.
     """
     try:
         async with get_session() as session:
-            stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-            res_user = await session.execute(stmt_user)
-            user = res_user.scalar_one_or_none()
-            if not user:
+            user_id = await resolve_user_id(session, owner_telegram_id, user_id)
+            if user_id is None:
                 return False
 
-            stmt_inv = select(Invitation).where(Invitation.id == invitation_id, Invitation.owner_id == user.id)
+            stmt_inv = select(Invitation).where(Invitation.id == invitation_id, Invitation.owner_id == user_id)
             res_inv = await session.execute(stmt_inv)
             invitation = res_inv.scalar_one_or_none()
             if not invitation:
                 return False
 
             await session.delete(invitation)
-            await session.commit()
+            await commit(session)
             logger.info(f"Invitation {invitation_id} deleted by {owner_telegram_id}")
             return True
     except SQLAlchemyError as e:
@@ -0,0 +1,109 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+from dtimebot.models.directories import Directory
+from dtimebot.services import directory_service, task_service
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class DataLoader(Generic[K, V]):
+	"""
+	Загрузчик в стиле DataLoader: собирает ключи, запрошенные в одном такте event loop,
+	и получает их одним вызовом batch_fn. Результаты (в том числе отсутствующие — None)
+	кэшируются до конца жизни загрузчика.
+	Пакет выполняет первая ожидающая его корутина, а не отдельная задача: batch_fn идёт через
+	get_session, и в задаче, которая уже держит сессию (UnitOfWork.use()), блокировка
+	переиспользуется, а не ждёт сама себя. asyncio.gather оборачивает корутины в новые задачи,
+	поэтому под uow.use() загрузчики ожидаются по очереди, а не через gather.
+	"""
+
+	def __init__(self, batch_fn: Callable[[list[K]], Awaitable[dict[K, V]]]):
+		self._batch_fn = batch_fn
+		self._cache: dict[K, asyncio.Future] = {}
+		self._queue: list[tuple[K, asyncio.Future]] = []
+		# Есть корутина, которая заберёт текущую очередь; пока очередь не пуста, флаг установлен
+		self._scheduled = False
+
+	async def load(self, key: K) -> Optional[V]:
+		return (await self.load_many([key]))[key]
+
+	async def load_many(self, keys: Iterable[K]) -> dict[K, Optional[V]]:
+		futures = {key: self._enqueue(key) for key in keys}
+		if self._queue and not self._scheduled:
+			self._scheduled = True
+			await self._run_batch()
+		if futures:
+			await asyncio.gather(*futures.values())
+		return {key: future.result() for key, future in futures.items()}
+
+	def clear(self, key: Optional[K] = None) -> None:
+		"""Сбросить кэш (целиком или для одного ключа), например после записи."""
+		if key is None:
+			self._cache.clear()
+		else:
+			self._cache.pop(key, None)
+
+	def _enqueue(self, key: K) -> asyncio.Future:
+		future = self._cache.get(key)
+		if future is None:
+			future = asyncio.get_running_loop().create_future()
+			self._cache[key] = future
+			self._queue.append((key, future))
+		return future
+
+	def _take_queue(self) -> list[tuple[K, asyncio.Future]]:
+		queue, self._queue = self._queue, []
+		self._scheduled = False
+		return queue
+
+	async def _run_batch(self) -> None:
+		queue: Optional[list[tuple[K, asyncio.Future]]] = None
+		try:
+			# Один такт, чтобы ключи успели запросить остальные корутины апдейта
+			await asyncio.sleep(0)
+			queue = self._take_queue()
+			result = await self._batch_fn([key for key, _ in queue])
+		except BaseException as e:
+			if queue is None:
+				queue = self._take_queue()
+			self._fail(queue, e)
+			if isinstance(e, Exception):
+				# Ошибку получат все ожидающие через свои future
+				return
+			raise
+
+		for key, future in queue:
+			if not future.done():
+				future.set_result(result.get(key))
+
+	def _fail(self, queue: list[tuple[K, asyncio.Future]], error: BaseException) -> None:
+		for key, future in queue:
+			if self._cache.get(key) is future:
+				del self._cache[key]
+			if future.done():
+				continue
+			if isinstance(error, asyncio.CancelledError):
+				future.cancel()
+			else:
+				future.set_exception(error)
+
+
+class Loaders:
+	"""
+	Набор загрузчиков одного апдейта. Создаётся в LoadersMiddleware и передаётся в обработчики как `loaders`.
+	Проверка доступа выполняется от имени пользователя апдейта.
+	"""
+
+	def __init__(self, telegram_id: int, user_id: int):
+		self.task_tags: DataLoader[int, list[str]] = DataLoader(
+			lambda ids: task_service.get_tags_for_tasks(telegram_id, ids, user_id=user_id)
+		)
+		self.directories: DataLoader[int, Directory] = DataLoader(
+			lambda ids: directory_service.get_directories_by_ids(telegram_id, ids, user_id=user_id)
+		)
+		self.directory_tags: DataLoader[int, list[str]] = DataLoader(
+			lambda ids: directory_service.get_tags_for_directories(telegram_id, ids, user_id=user_id)
+		)
@@ -0,0 +1,121 @@
+"""
+Кэш членства в директориях: директории пользователя (свои и те, где он активный участник)
+и владелец с активными участниками директории.
+
+Проверки доступа к задачам и директориям берут членство отсюда вместо соединения с member в каждом запросе.
+Записи сбрасываются при изменении членства (создание и удаление директории, вступление по приглашению
+и выход из неё) и по истечении CACHE_TTL (см. database.cache_invalidation).
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dtimebot.database import cache_invalidation
+from dtimebot.models.directories import Directory
+from dtimebot.models.members import Member
+
+# Сколько записей пользователей (и отдельно директорий) держать в памяти и как долго
+CACHE_SIZE = 4096
+CACHE_TTL = timedelta(minutes=1)
+
+
+@dataclass(frozen=True)
+class UserDirectories:
+	"""Директории пользователя."""
+	owned: frozenset[int]
+	# Директории, где пользователь — активный участник (владелец — участник своих директорий)
+	member: frozenset[int]
+	built_at: datetime
+
+	@property
+	def directory_ids(self) -> frozenset[int]:
+		"""Свои директории и директории, где пользователь участник (как user_service.user_directory_ids())."""
+		return self.owned | self.member
+
+	def has_access(self, directory_id: int | None) -> bool:
+		return directory_id in self.owned or directory_id in self.member
+
+
+@dataclass(frozen=True)
+class DirectoryMembers:
+	"""Владелец и активные участники директории."""
+	owner_id: int
+	user_ids: frozenset[int]
+	built_at: datetime
+
+	def has_access(self, user_id: int) -> bool:
+		return user_id == self.owner_id or user_id in self.user_ids
+
+
+_users: OrderedDict[int, UserDirectories] = OrderedDict()
+_directories: OrderedDict[int, DirectoryMembers] = OrderedDict()
+# Растёт при каждом сбросе: запись, прочитанная из БД до сброса, не попадает в кэш
+_generation = 0
+
+
+async def get_user_directories(session: AsyncSession, user_id: int) -> UserDirectories:
+	"""Директории пользователя из кэша или из БД (в сессии вызывающего)."""
+	now = datetime.utcnow()
+	entry = _recall(_users, user_id, now)
+	if entry is not None:
+		return entry
+
+	generation = _generation
+	res = await session.execute(select(Directory.id).where(Directory.owner_id == user_id))
+	owned = frozenset(res.scalars())
+	res = await session.execute(select(Member.directory_id).where(Member.user_id == user_id, Member.is_active == True))
+	entry = UserDirectories(owned=owned, member=frozenset(res.scalars()), built_at=now)
+	_remember(_users, user_id, entry, generation)
+	return entry
+
+async def get_directory_members(session: AsyncSession, directory_id: int) -> DirectoryMembers | None:
+	"""Владелец и активные участники директории из кэша или из БД; None, если директории нет."""
+	now = datetime.utcnow()
+	entry = _recall(_directories, directory_id, now)
+	if entry is not None:
+		return entry
+
+	generation = _generation
+	res = await session.execute(select(Directory.owner_id).where(Directory.id == directory_id))
+	owner_id = res.scalar_one_or_none()
+	if owner_id is None:
+		return None
+	res = await session.execute(select(Member.user_id).where(Member.directory_id == directory_id, Member.is_active == True))
+	entry = DirectoryMembers(owner_id=owner_id, user_ids=frozenset(res.scalars()), built_at=now)
+	_remember(_directories, directory_id, entry, generation)
+	return entry
+
+@cache_invalidation
+def invalidate_member(user_id: int, directory_id: int | None) -> None:
+	"""Сбрасывает записи пользователя и директории (после создания директории, вступления в неё или выхода)."""
+	global _generation
+	_generation += 1
+	_users.pop(user_id, None)
+	_directories.pop(directory_id, None)
+
+@cache_invalidation
+def invalidate_directory(directory_id: int) -> None:
+	"""Сбрасывает запись директории и записи всех пользователей, у которых она есть (после её удаления)."""
+	global _generation
+	_generation += 1
+	_directories.pop(directory_id, None)
+	for key in [key for key, entry in _users.items() if entry.has_access(directory_id)]:
+		del _users[key]
+
+def _recall(cache: OrderedDict, key: int, now: datetime):
+	entry = cache.get(key)
+	if entry is None or now - entry.built_at >= CACHE_TTL:
+		return None
+	cache.move_to_end(key)
+	return entry
+
+def _remember(cache: OrderedDict, key: int, entry, generation: int) -> None:
+	if generation != _generation or CACHE_SIZE <= 0:
+		return
+	cache[key] = entry
+	cache.move_to_end(key)
+	while len(cache) > CACHE_SIZE:
+		cache.popitem(last=False)
@@ -0,0 +1,250 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dtimebot.database import commit, get_session
+from dtimebot.logs import main_logger
+from dtimebot.models.members import Member
+from dtimebot.models.reminders import Reminder
+from dtimebot.models.tasks import Task
+from dtimebot.models.users import User
+from dtimebot.services import access_service
+
+logger = main_logger.getChild('reminder_service')
+
+
+@dataclass
+class DueReminder:
+	"""Напоминание, время которого наступило, вместе с данными задачи и получателями."""
+	id: int
+	kind: str
+	fire_at: datetime
+	task_id: int
+	title: str
+	time_start: datetime | None
+	time_end: datetime | None
+	# Задача повторяющаяся: time_start/time_end — время вхождения, о котором напоминание
+	recurring: bool = False
+	# Telegram ID владельца задачи и активных участников её директории, которым правила доступа разрешают её просмотр
+	recipients: list[int] = field(default_factory=list)
+	# Часовые пояса получателей (User.timezone) для показа времени: telegram_id -> имя IANA или None
+	recipient_timezones: dict[int, str | None] = field(default_factory=dict)
+
+
+async def replace_task_reminders(session: AsyncSession, task_id: int, fire_times: dict[str, datetime]) -> None:
+	"""
+	Заменяет напоминания задачи в транзакции вызывающего (create_task/update_task).
+	:param fire_times: Время отправки по видам напоминаний ('start', 'end').
+	"""
+	await session.execute(delete(Reminder).where(Reminder.task_id == task_id))
+	if fire_times:
+		await session.execute(
+			insert(Reminder),
+			[{'task_id': task_id, 'kind': kind, 'fire_at': fire_at} for kind, fire_at in fire_times.items()]
+		)
+
+async def reschedule_tasks(task_ids: set[int], fire_times: Callable[[Task], dict[str, datetime]]) -> datetime | None:
+	"""
+	Пересоздаёт напоминания задач (следующее вхождение повторяющихся задач после отправки напоминаний).
+	:param fire_times: Время напоминаний задачи, см. scheduling.reminders.fire_times().
+	:return: Время самого раннего нового напоминания.
+	"""
+	try:
+		async with get_session() as session:
+			res = await session.execute(select(Task).where(Task.id.in_(task_ids)))
+			earliest = None
+			for task in res.scalars():
+				times = fire_times(task)
+				await replace_task_reminders(session, task.id, times)
+				if times:
+					earliest = min(times.values()) if earliest is None else min(earliest, *times.values())
+			await commit(session)
+			return earliest
+	except SQLAlchemyError as e:
+		logger.exception("Error while rescheduling reminders of %d task(s): %s", len(task_ids), e)
+		return None
+
+async def delete_task_reminders(session: AsyncSession, task_id: int) -> None:
+	"""
+	Удаляет напоминания задачи в транзакции вызывающего (delete_task).
+	"""
+	await session.execute(delete(Reminder).where(Reminder.task_id == task_id))
+
+async def delete_directory_reminders(session: AsyncSession, directory_id: int) -> None:
+	"""
+	Удаляет напоминания всех задач директории в транзакции вызывающего (delete_directory).
+	"""
+	await session.execute(
+		delete(Reminder)
+		.where(Reminder.task_id.in_(select(Task.id).where(Task.directory_id == directory_id)))
+		.execution_options(synchronize_session=False)
+	)
+
+async def claim_due_reminders(now: datetime, limit: int, owner: str, lease_until: datetime) -> list[int]:
+	"""
+	Захватывает для экземпляра owner до limit наступивших напоминаний, самые ранние первыми.
+	Напоминания, захваченные другим экземпляром (аренда ещё не истекла), пропускаются,
+	поэтому несколько экземпляров бота делят наступившие напоминания между собой.
+	:return: ID захваченных напоминаний.
+	"""
+	return await _claim(Reminder.fire_at <= now, now, limit, owner, lease_until)
+
+async def claim_reminders(reminder_ids: list[int], now: datetime, owner: str, lease_until: datetime) -> list[int]:
+	"""
+	Захватывает для экземпляра owner напоминания по ID (из колеса времени), кроме уже захваченных другими.
+	:return: ID захваченных напоминаний.
+	"""
+	if not reminder_ids:
+		return []
+	return await _claim(Reminder.id.in_(reminder_ids), now, len(reminder_ids), owner, lease_until)
+
+async def _claim(condition, now: datetime, limit: int, owner: str, lease_until: datetime) -> list[int]:
+	# PostgreSQL: FOR UPDATE SKIP LOCKED — строки, которые в этот момент захватывает другой экземпляр,
+	# пропускаются без ожидания его транзакции. SQLite предложение не поддерживает, но там UPDATE
+	# выполняется под блокировкой записи всей БД, так что выбор и захват строк и так атомарны
+	candidates = (
+		select(Reminder.id)
+		.where(condition, _unclaimed(now))
+		.order_by(Reminder.fire_at, Reminder.id)
+		.limit(limit)
+		.with_for_update(skip_locked=True)
+	)
+	stmt = (
+		update(Reminder)
+		.where(Reminder.id.in_(candidates.scalar_subquery()))
+		.values(claimed_by=owner, claimed_until=lease_until)
+		.returning(Reminder.id)
+		.execution_options(synchronize_session=False)
+	)
+	try:
+		async with get_session() as session:
+			res = await session.execute(stmt)
+			claimed = list(res.scalars())
+			await commit(session)
+			return claimed
+	except SQLAlchemyError as e:
+		logger.exception("Error while claiming reminders: %s", e)
+		return []
+
+def _unclaimed(now: datetime):
+	return or_(Reminder.claimed_until.is_(None), Reminder.claimed_until < now)
+
+async def get_reminders_by_ids(reminder_ids: list[int]) -> list[DueReminder]:
+	"""
+	Возвращает напоминания по ID; удалённые (задача изменена или уже отправлено) пропускаются.
+	"""
+	if not reminder_ids:
+		return []
+	try:
+		async with get_session() as session:
+			return await _load_reminders(session, Reminder.id.in_(reminder_ids), len(reminder_ids))
+	except SQLAlchemyError as e:
+		logger.exception("Error while retrieving %d reminder(s) by id: %s", len(reminder_ids), e)
+		return []
+
+async def get_reminder_schedule(after: tuple[datetime, int] | None, until: datetime, limit: int) -> list[tuple[datetime, int]]:
+	"""
+	Расписание напоминаний без данных задач: (fire_at, id) с fire_at <= until по возрастанию.
+	Постраничная выборка по индексу ix_reminder_fire_at.
+	:param after: Позиция (fire_at, id) последнего полученного напоминания.
+	"""
+	try:
+		async with get_session() as session:
+			stmt = select(Reminder.fire_at, Reminder.id).where(Reminder.fire_at <= until)
+			if after is not None:
+				fire_at, reminder_id = after
+				stmt = stmt.where(or_(Reminder.fire_at > fire_at, and_(Reminder.fire_at == fire_at, Reminder.id > reminder_id)))
+			res = await session.execute(stmt.order_by(Reminder.fire_at, Reminder.id).limit(limit))
+			return [tuple(row) for row in res.all()]
+	except SQLAlchemyError as e:
+		logger.exception("Error while retrieving reminder schedule: %s", e)
+		return []
+
+async def _load_reminders(session: AsyncSession, condition, limit: int) -> list[DueReminder]:
+	stmt = (
+		select(
+			Reminder.id, Reminder.kind, Reminder.fire_at,
+			Task.id.label('task_id'), Task.title, Task.time_start, Task.time_end, Task.recurrence, Task.directory_id, Task.owner_id,
+			User.telegram_id.label('owner_telegram_id'), User.timezone.label('owner_timezone')
+		)
+		.join(Task, Task.id == Reminder.task_id)
+		.join(User, User.id == Task.owner_id)
+		.where(condition)
+		.order_by(Reminder.fire_at, Reminder.id)
+		.limit(limit)
+	)
+	rows = (await session.execute(stmt)).all()
+	if not rows:
+		return []
+
+	directory_ids = {row.directory_id for row in rows if row.directory_id is not None}
+	# Участники директории: (id, telegram_id)
+	members: dict[int, list[tuple[int, int]]] = {}
+	zones: dict[int, str | None] = {row.owner_telegram_id: row.owner_timezone for row in rows}
+	policies = {}
+	if directory_ids:
+		res = await session.execute(
+			select(Member.directory_id, Member.user_id, User.telegram_id, User.timezone)
+			.join(User, User.id == Member.user_id)
+			.where(Member.directory_id.in_(directory_ids), Member.is_active == True)
+		)
+		for directory_id, user_id, telegram_id, timezone in res.all():
+			members.setdefault(directory_id, []).append((user_id, telegram_id))
+			zones[telegram_id] = timezone
+		policies = await access_service.get_rule_policies(session, directory_ids)
+
+	result = []
+	for row in rows:
+		policy = policies.get(row.directory_id)
+		recipients = [row.owner_telegram_id]
+		recipients += [
+			telegram_id for user_id, telegram_id in members.get(row.directory_id, [])
+			if telegram_id != row.owner_telegram_id
+			and (policy is None or policy.allows(user_id, row.task_id, row.owner_id, access_service.VIEW))
+		]
+		time_start, time_end = row.time_start, row.time_end
+		if row.recurrence is not None and time_start is not None:
+			# Время вхождения, о котором напоминание: длительность как у первого вхождения
+			duration = time_end - time_start if time_end is not None else None
+			if row.kind == 'start':
+				time_start, time_end = row.fire_at, (row.fire_at + duration if duration else None)
+			else:
+				time_start, time_end = (row.fire_at - duration if duration else None), row.fire_at
+		result.append(DueReminder(
+			id=row.id, kind=row.kind, fire_at=row.fire_at, task_id=row.task_id, title=row.title,
+			time_start=time_start, time_end=time_end, recurring=row.recurrence is not None, recipients=recipients,
+			recipient_timezones={telegram_id: zones.get(telegram_id) for telegram_id in recipients}
+		))
+	return result
+
+async def delete_reminders(reminder_ids: list[int]) -> bool:
+	"""
+	Удаляет обработанные напоминания.
+	"""
+	if not reminder_ids:
+		return True
+	try:
+		async with get_session() as session:
+			await session.execute(delete(Reminder).where(Reminder.id.in_(reminder_ids)))
+			await commit(session)
+			return True
+	except SQLAlchemyError as e:
+		logger.exception("Error while deleting %d reminder(s): %s", len(reminder_ids), e)
+		return False
+
+async def get_next_fire_at() -> datetime | None:
+	"""
+	Время ближайшего незахваченного напоминания (по индексу ix_reminder_fire_at) или None, если таких нет.
+	Захваченные другим экземпляром не учитываются: иначе их опоздание будило бы движок без остановки.
+	"""
+	try:
+		async with get_session() as session:
+			res = await session.execute(select(func.min(Reminder.fire_at)).where(_unclaimed(datetime.utcnow())))
+			return res.scalar_one_or_none()
+	except SQLAlchemyError as e:
+		logger.exception("Error while retrieving next reminder time: %s", e)
+		return None
@@ -1,39 +1,44 @@
 from typing import List
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 
-from dtimebot.database import get_session
+from dtimebot.database import commit, get_session
 from dtimebot.models.tasks import Task, TaskTag
-from dtimebot.models.users import User
 from dtimebot.models.directories import Directory
 from dtimebot.logs import main_logger
+from dtimebot.scheduling import recurrence as recurrence_rules, reminders
+from dtimebot.scheduling.triggers import JobTrigger
+from dtimebot.services import access_service, conflict_service, membership_service
+from dtimebot.services.membership_service import UserDirectories
+from dtimebot.services.user_service import resolve_user_id
 
 logger = main_logger.getChild('task_service')
 
-async def create_task(telegram_id: int, title: str, description: str | None = None, directory_id: int | None = None, time_start: datetime | None = None, time_end: datetime | None = None, embed=None) -> Task | None:
+async def create_task(telegram_id: int, title: str, description: str | None = None, directory_id: int | None = None, time_start: datetime | None = None, time_end: datetime | None = None, embed=None, user_id: int | None = None, recurrence: JobTrigger | None = None) -> Task | None:
     """
     Создать задачу. Если directory_id не передан — использовать self-директорию пользователя.
+    :param recurrence: Правило повторения (IntervalTrigger или CronTrigger), первое вхождение — time_start.
     """
+    if recurrence is not None and not recurrence_rules.is_supported(recurrence):
+        logger.warning("Unsupported recurrence rule %r when creating task for %s", recurrence.type, telegram_id)
+        return None
     try:
         async with get_session() as session:
-            # Получаем user
-            stmt_user = select(User).where(User.telegram_id == telegram_id)
-            res = await session.execute(stmt_user)
-            user = res.scalar_one_or_none()
-            if user is None:
+            user_id = await resolve_user_id(session, telegram_id, user_id)
+            if user_id is None:
                 logger.warning("User not found when creating task for telegram_id=%s", telegram_id)
                 return None
 
             # Если directory_id не указан — найти self
             if directory_id is None:
-                stmt_dir = select(Directory).where(Directory.owner_id == user.id, Directory.is_self == True)
+                stmt_dir = select(Directory).where(Directory.owner_id == user_id, Directory.is_self == True)
                 res2 = await session.execute(stmt_dir)
                 self_dir = res2.scalar_one_or_none()
                 if self_dir is None:
                     # создаём self-директорию автоматически
                     from dtimebot.services.directory_service import create_directory
-                    self_dir = await create_directory(telegram_id=telegram_id, name='Моя директория', description='Личная директория', owner_user=user, is_self=True)
+                    self_dir = await create_directory(telegram_id=telegram_id, name='Моя директория', description='Личная директория', is_self=True, user_id=user_id)
                     if self_dir is None:
                         logger.error("Failed to create self directory for user %s", telegram_id)
                         return None
@@ -48,100 +53,227 @@ async def create_task(telegram_id: int, title: str, description: str | None = No
                 return None
 
             task = Task(
-                owner_id=user.id,
+                owner_id=user_id,
                 directory_id=directory_id,
                 title=title,
                 description=description,
                 time_start=time_start or datetime.utcnow(),
                 time_end=time_end,
-                embed=embed
+                embed=embed,
+                recurrence=recurrence
             )
             session.add(task)
-            await session.commit()
+            await session.flush()
+            await reminders.sync_task(session, task)
+            await commit(session)
+            conflict_service.invalidate_directory(directory_id)
             await session.refresh(task)
-            logger.info("Task created id=%s owner=%s directory=%s", task.id, user.telegram_id, directory_id)
+            logger.info("Task created id=%s owner=%s directory=%s", task.id, telegram_id, directory_id)
             return task
     except SQLAlchemyError as e:
         logger.exception("Unexpected error while creating task for %s: %s", telegram_id, e)
         return None
 
 
-async def get_user_tasks(telegram_id: int, directory_id: int | None = None) -> list[Task]:
+TaskCursor = tuple[datetime | None, int]
+"""Позиция в списке задач: (time_start, id) последней показанной задачи."""
+
+def _task_visible_to(user_id: int, directories: UserDirectories):
+    """
+    Условие видимости задачи: у пользователя есть право просмотра (см. access_service).
+    Членство берётся из кэша (membership_service), а не соединением с member.
+    """
+    return access_service.task_access_clause(user_id, access_service.VIEW, directories)
+
+def _task_after(cursor: TaskCursor):
+    """
+    Условие «задача идёт после cursor» для порядка (time_start NULLS LAST, id).
+    """
+    time_start, task_id = cursor
+    if time_start is None:
+        return and_(Task.time_start.is_(None), Task.id > task_id)
+    return or_(
+        Task.time_start > time_start,
+        and_(Task.time_start == time_start, Task.id > task_id),
+        Task.time_start.is_(None)
+    )
+
+async def get_user_tasks(telegram_id: int, directory_id: int | None = None, limit: int | None = None, cursor: TaskCursor | None = None, user_id: int | None = None) -> list[Task]:
+    """
+    Вернуть задачи, видимые пользователю (свои и из директорий, где он участник), одним запросом.
+    Результат уникален и упорядочен по (time_start, id).
+    :param limit: Максимальное количество задач (None = без ограничений).
+    :param cursor: Вернуть только задачи после этой позиции — (time_start, id) последней полученной задачи.
+    """
     try:
         async with get_session() as session:
-            # Получаем user
-            stmt_user = select(User).where(User.telegram_id == telegram_id)
-            res = await session.execute(stmt_user)
-            user = res.scalar_one_or_none()
-            if user is None:
+            user_id = await resolve_user_id(session, telegram_id, user_id)
+            if user_id is None:
                 return []
 
-            # Получаем задачи, где пользователь является владельцем
-            stmt_owned_tasks = select(Task).where(Task.owner_id == user.id)
+            directories = await membership_service.get_user_directories(session, user_id)
+            stmt = select(Task).where(_task_visible_to(user_id, directories))
+            if directory_id:
+                stmt = stmt.where(Task.directory_id == directory_id)
+            if cursor is not None:
+                stmt = stmt.where(_task_after(cursor))
+            stmt = stmt.order_by(Task.time_start.asc().nulls_last(), Task.id)
+            if limit is not None:
+                stmt = stmt.limit(limit)
+
+            res = await session.execute(stmt)
+            return list(res.scalars().all())
+    except SQLAlchemyError as e:
+        logger.exception("Unexpected error while retrieving tasks for %s: %s", telegram_id, e)
+        return []
+
+def _task_before(cursor: TaskCursor):
+    """
+    Условие «задача идёт до cursor» для порядка (time_start NULLS LAST, id).
+    """
+    time_start, task_id = cursor
+    if time_start is None:
+        return or_(Task.time_start.is_not(None), and_(Task.time_start.is_(None), Task.id < task_id))
+    return and_(
+        Task.time_start.is_not(None),
+        or_(Task.time_start < time_start, and_(Task.time_start == time_start, Task.id < task_id))
+    )
+
+def task_cursor(task: Task) -> TaskCursor:
+    return (task.time_start, task.id)
+
+async def get_user_tasks_page(
+    telegram_id: int,
+    after: TaskCursor | None = None,
+    before: TaskCursor | None = None,
+    limit: int = 5,
+    directory_id: int | None = None,
+    user_id: int | None = None
+) -> tuple[list[Task], bool, bool]:
+    """
+    Страница задач пользователя с keyset-пагинацией по (time_start, id).
+    Из БД читается только limit + 1 строка (лишняя — признак следующей/предыдущей страницы).
+    :param after: Вернуть страницу после этой позиции (навигация «вперёд»).
+    :param before: Вернуть страницу до этой позиции (навигация «назад»).
+    :return: (задачи, есть_предыдущая_страница, есть_следующая_страница).
+    """
+    try:
+        async with get_session() as session:
+            user_id = await resolve_user_id(session, telegram_id, user_id)
+            if user_id is None:
+                return [], False, False
+
+            directories = await membership_service.get_user_directories(session, user_id)
+            stmt = select(Task).where(_task_visible_to(user_id, directories))
             if directory_id:
-                stmt_owned_tasks = stmt_owned_tasks.where(Task.directory_id == directory_id)
-            
-            res_owned_tasks = await session.execute(stmt_owned_tasks)
-            owned_tasks = list(res_owned_tasks.scalars().all())
-
-            # Получаем задачи в директориях, где пользователь является участником
-            from dtimebot.models.members import Member
-            stmt_member_tasks = (
-                select(Task)
-                .join(Member, Member.directory_id == Task.directory_id)
-                .where(
-                    Member.user_id == user.id,
-                    Member.is_active == True,
-                    Task.owner_id != user.id  # Исключаем задачи, которые пользователь уже видит как владелец
+                stmt = stmt.where(Task.directory_id == directory_id)
+
+            if before is not None:
+                stmt = (
+                    stmt.where(_task_before(before))
+                    .order_by(Task.time_start.desc().nulls_first(), Task.id.desc())
+                    .limit(limit + 1)
                 )
+                res = await session.execute(stmt)
+                tasks = list(res.scalars().all())
+                has_prev = len(tasks) > limit
+                tasks = tasks[:limit]
+                tasks.reverse()
+                return tasks, has_prev, True
+
+            if after is not None:
+                stmt = stmt.where(_task_after(after))
+            stmt = stmt.order_by(Task.time_start.asc().nulls_last(), Task.id).limit(limit + 1)
+            res = await session.execute(stmt)
+            tasks = list(res.scalars().all())
+            return tasks[:limit], after is not None, len(tasks) > limit
+    except SQLAlchemyError as e:
+        logger.exception("Unexpected error while retrieving tasks page for %s: %s", telegram_id, e)
+        return [], False, False
+
+
+TaskOccurrence = tuple[Task, datetime, datetime | None]
+"""Задача в интервале: (задача, начало, окончание) — для повторяющейся задачи время её вхождения."""
+
+def tasks_in_range(directory_ids, start: datetime, end: datetime):
+    """
+    Условие «задача пересекается с [start, end)» (задача без окончания — если начинается в интервале)
+    или «повторяющаяся задача началась до end».
+    Условие на директорию повторено в каждой ветке OR: так каждая ветка читает свой индекс
+    (ix_task_directory_id_time_start, ix_task_directory_id_time_end, ix_task_recurring_directory_id_time_start).
+    """
+    return or_(
+        and_(Task.directory_id.in_(directory_ids), Task.time_start >= start, Task.time_start < end),
+        # coalesce() не даёт планировщику выбрать для этой ветки индекс по time_start: интервал обычно
+        # начинается около текущего момента, и time_start < start охватывает всю растущую историю директории,
+        # а time_end > start — только ещё не закончившиеся задачи
+        and_(Task.directory_id.in_(directory_ids), Task.time_end > start, func.coalesce(Task.time_start, start) < start),
+        and_(Task.directory_id.in_(directory_ids), Task.recurrence.is_not(None), Task.time_start < end),
+    )
+
+async def get_tasks_in_range(telegram_id: int, start: datetime, end: datetime, user_id: int | None = None) -> list[TaskOccurrence]:
+    """
+    Доступные пользователю задачи из его директорий (своих и тех, где он участник), пересекающиеся с [start, end),
+    одним запросом по индексам независимо от общего числа задач.
+    Повторяющиеся задачи разворачиваются во вхождения, попавшие в интервал.
+    :return: Вхождения по возрастанию начала.
+    """
+    try:
+        async with get_session() as session:
+            user_id = await resolve_user_id(session, telegram_id, user_id)
+            if user_id is None:
+                return []
+
+            directories = await membership_service.get_user_directories(session, user_id)
+            res = await session.execute(
+                select(Task).where(tasks_in_range(directories.directory_ids, start, end), _task_visible_to(user_id, directories))
             )
-            if directory_id:
-                stmt_member_tasks = stmt_member_tasks.where(Task.directory_id == directory_id)
-            
-            res_member_tasks = await session.execute(stmt_member_tasks)
-            member_tasks = list(res_member_tasks.scalars().all())
-
-            # Объединяем и убираем дубли
-            all_tasks = owned_tasks + member_tasks
-            unique_tasks = {}
-            for task in all_tasks:
-                unique_tasks[task.id] = task
-            
-            return list(unique_tasks.values())
+            tasks = res.scalars().all()
     except SQLAlchemyError as e:
-        logger.exception("Unexpected error while retrieving tasks for %s: %s", telegram_id, e)
+        logger.exception("Unexpected error while retrieving tasks in range for %s: %s", telegram_id, e)
         return []
 
-async def delete_task(owner_telegram_id: int, task_id: int) -> bool:
+    result = [
+        (task, occurrence_start, occurrence_end)
+        for task in tasks
+        for occurrence_start, occurrence_end in recurrence_rules.iter_occurrences(task, start, end)
+    ]
+    result.sort(key=lambda item: (item[1], item[0].id))
+    return result
+
+async def delete_task(owner_telegram_id: int, task_id: int, user_id: int | None = None) -> bool:
 	"""
 	Удаляет задачу пользователя по ID.
 	:param owner_telegram_id: Telegram ID владельца.
 	:param task_id: ID задачи.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: True, если успешно удалено, иначе False.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"User with telegram_id={owner_telegram_id} not found.")
 				return False
 
-			# Найти задачу, принадлежащую этому пользователю
-			stmt_task = select(Task).where(Task.id == task_id, Task.owner_id == user.id)
+			# Найти задачу с проверкой права удаления (по умолчанию — только автор задачи, см. access_service)
+			stmt_task = select(Task).where(Task.id == task_id)
 			result_task = await session.execute(stmt_task)
 			task = result_task.scalar_one_or_none()
+			if task is not None and not await access_service.can_access_task(session, user_id, task, access_service.DELETE):
+				task = None
 
 			if not task:
-				logger.warning(f"Task with ID={task_id} not found or does not belong to user {owner_telegram_id}.")
+				logger.warning(f"Task with ID={task_id} not found or user {owner_telegram_id} cannot delete it.")
 				return False
 
-			# Удалить задачу
+			# Удалить задачу вместе с её напоминаниями
+			await reminders.forget_task(session, task.id)
 			await session.delete(task)
-			await session.commit()
+			await commit(session)
+			conflict_service.invalidate_directory(task.directory_id)
+			access_service.invalidate_directory(task.directory_id)
 			logger.info(f"Task '{task.title}' (ID: {task_id}) deleted by user {owner_telegram_id}.")
 			return True
 
@@ -152,37 +284,29 @@ async def delete_task(owner_telegram_id: int, task_id: int) -> bool:
 		logger.error(f"Unexpected error while deleting task {task_id} for {owner_telegram_id}: {e}", exc_info=True)
 		return False
 
-async def add_tag_to_task(owner_telegram_id: int, task_id: int, tag: str) -> bool:
+async def add_tag_to_task(owner_telegram_id: int, task_id: int, tag: str, user_id: int | None = None) -> bool:
 	"""
 	Добавляет тег к задаче.
 	:param owner_telegram_id: Telegram ID пользователя (владельца задачи или участника директории).
 	:param task_id: ID задачи.
 	:param tag: Тег для добавления.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: True, если успешно, иначе False.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"User with telegram_id={owner_telegram_id} not found.")
 				return False
 
-			# Найти задачу с проверкой прав доступа (владелец задачи или участник директории)
-			from dtimebot.models.members import Member
-			stmt_task = (
-				select(Task)
-				.outerjoin(Member, (Member.directory_id == Task.directory_id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					(Task.id == task_id) & 
-					((Task.owner_id == user.id) | (Member.user_id == user.id))
-				)
-			)
+			# Найти задачу с проверкой прав доступа (см. access_service)
+			stmt_task = select(Task).where(Task.id == task_id)
 			result_task = await session.execute(stmt_task)
 			task = result_task.scalar_one_or_none()
+			if task is not None and not await access_service.can_access_task(session, user_id, task, access_service.EDIT):
+				task = None
 
 			if not task:
 				logger.warning(f"Task with ID={task_id} not found or user {owner_telegram_id} does not have access to it.")
@@ -203,7 +327,8 @@ async def add_tag_to_task(owner_telegram_id: int, task_id: int, tag: str) -> boo
 			# Добавить тег
 			new_tag = TaskTag(task_id=task_id, tag=tag)
 			session.add(new_tag)
-			await session.commit()
+			await commit(session)
+			access_service.invalidate_directory(task.directory_id)
 			logger.info(f"Tag '{tag}' added to task {task_id}.")
 			return True
 
@@ -214,37 +339,29 @@ async def add_tag_to_task(owner_telegram_id: int, task_id: int, tag: str) -> boo
 		logger.error(f"Unexpected error while adding tag '{tag}' to task {task_id}: {e}", exc_info=True)
 		return False
 
-async def remove_tag_from_task(owner_telegram_id: int, task_id: int, tag: str) -> bool:
+async def remove_tag_from_task(owner_telegram_id: int, task_id: int, tag: str, user_id: int | None = None) -> bool:
 	"""
 	Удаляет тег из задачи.
 	:param owner_telegram_id: Telegram ID пользователя (владельца задачи или участника директории).
 	:param task_id: ID задачи.
 	:param tag: Тег для удаления.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: True, если успешно, иначе False.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"User with telegram_id={owner_telegram_id} not found.")
 				return False
 
-			# Найти задачу с проверкой прав доступа (владелец задачи или участник директории)
-			from dtimebot.models.members import Member
-			stmt_task = (
-				select(Task)
-				.outerjoin(Member, (Member.directory_id == Task.directory_id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					(Task.id == task_id) & 
-					((Task.owner_id == user.id) | (Member.user_id == user.id))
-				)
-			)
+			# Найти задачу с проверкой прав доступа (см. access_service)
+			stmt_task = select(Task).where(Task.id == task_id)
 			result_task = await session.execute(stmt_task)
 			task = result_task.scalar_one_or_none()
+			if task is not None and not await access_service.can_access_task(session, user_id, task, access_service.EDIT):
+				task = None
 
 			if not task:
 				logger.warning(f"Task with ID={task_id} not found or user {owner_telegram_id} does not have access to it.")
@@ -264,7 +381,8 @@ async def remove_tag_from_task(owner_telegram_id: int, task_id: int, tag: str) -
 
 			# Удалить тег
 			await session.delete(tag_to_remove)
-			await session.commit()
+			await commit(session)
+			access_service.invalidate_directory(task.directory_id)
 			logger.info(f"Tag '{tag}' removed from task {task_id}.")
 			return True
 
@@ -275,36 +393,28 @@ async def remove_tag_from_task(owner_telegram_id: int, task_id: int, tag: str) -
 		logger.error(f"Unexpected error while removing tag '{tag}' from task {task_id}: {e}", exc_info=True)
 		return False
 
-async def get_task_tags(owner_telegram_id: int, task_id: int) -> List[str]:
+async def get_task_tags(owner_telegram_id: int, task_id: int, user_id: int | None = None) -> List[str]:
 	"""
 	Получает список тегов задачи.
 	:param owner_telegram_id: Telegram ID пользователя (владельца задачи или участника директории).
 	:param task_id: ID задачи.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: Список тегов.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"User with telegram_id={owner_telegram_id} not found.")
 				return []
 
-			# Найти задачу с проверкой прав доступа (владелец задачи или участник директории)
-			from dtimebot.models.members import Member
-			stmt_task = (
-				select(Task)
-				.outerjoin(Member, (Member.directory_id == Task.directory_id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					(Task.id == task_id) & 
-					((Task.owner_id == user.id) | (Member.user_id == user.id))
-				)
-			)
+			# Найти задачу с проверкой прав доступа (см. access_service)
+			stmt_task = select(Task).where(Task.id == task_id)
 			result_task = await session.execute(stmt_task)
 			task = result_task.scalar_one_or_none()
+			if task is not None and not await access_service.can_access_task(session, user_id, task, access_service.VIEW):
+				task = None
 
 			if not task:
 				logger.warning(f"Task with ID={task_id} not found or user {owner_telegram_id} does not have access to it.")
@@ -324,34 +434,28 @@ async def get_task_tags(owner_telegram_id: int, task_id: int) -> List[str]:
 		logger.error(f"Unexpected error while retrieving tags for task {task_id}: {e}", exc_info=True)
 		return []
 	
-async def get_user_tasks_by_tag(owner_telegram_id: int, tag: str) -> List[Task]:
+async def get_user_tasks_by_tag(owner_telegram_id: int, tag: str, user_id: int | None = None) -> List[Task]:
 	"""
 	Получает список задач пользователя, у которых есть указанный тег.
 	:param owner_telegram_id: Telegram ID пользователя (владельца задачи или участника директории).
 	:param tag: Тег для фильтрации.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: Список объектов Task.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"User with telegram_id={owner_telegram_id} not found.")
 				return []
 
-			# Найти задачи пользователя (владельца или участника директории), у которых есть тег
-			from dtimebot.models.members import Member
+			# Найти доступные пользователю задачи, у которых есть тег
+			directories = await membership_service.get_user_directories(session, user_id)
 			stmt_tasks = (
 				select(Task)
 				.join(TaskTag, Task.id == TaskTag.task_id)
-				.outerjoin(Member, (Member.directory_id == Task.directory_id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					TaskTag.tag == tag,
-					((Task.owner_id == user.id) | (Member.user_id == user.id))
-				)
+				.where(TaskTag.tag == tag, _task_visible_to(user_id, directories))
 			)
 			result_tasks = await session.execute(stmt_tasks)
 			tasks = list(result_tasks.scalars().all())
@@ -377,7 +481,8 @@ async def update_task(
 	title: str = None, 
 	description: str = None,
 	time_start: datetime = None,
-	time_end: datetime = None
+	time_end: datetime = None,
+	user_id: int | None = None
 ) -> bool:
 	"""
 	Обновляет информацию о задаче.
@@ -387,31 +492,23 @@ async def update_task(
 	:param description: Новое описание (None = не изменять).
 	:param time_start: Новое время начала (None = не изменять).
 	:param time_end: Новое время окончания (None = не изменять).
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: True, если успешно, иначе False.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				logger.warning(f"User with telegram_id={owner_telegram_id} not found.")
 				return False
 
-			# Найти задачу с проверкой прав доступа (владелец задачи или участник директории)
-			from dtimebot.models.members import Member
-			stmt_task = (
-				select(Task)
-				.outerjoin(Member, (Member.directory_id == Task.directory_id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					(Task.id == task_id) & 
-					((Task.owner_id == user.id) | (Member.user_id == user.id))
-				)
-			)
+			# Найти задачу с проверкой прав доступа (см. access_service)
+			stmt_task = select(Task).where(Task.id == task_id)
 			result_task = await session.execute(stmt_task)
 			task = result_task.scalar_one_or_none()
+			if task is not None and not await access_service.can_access_task(session, user_id, task, access_service.EDIT):
+				task = None
 
 			if not task:
 				logger.warning(f"Task with ID={task_id} not found or user {owner_telegram_id} does not have access to it.")
@@ -426,8 +523,11 @@ async def update_task(
 				task.time_start = time_start
 			if time_end is not None:
 				task.time_end = time_end
+			if time_start is not None or time_end is not None:
+				await reminders.sync_task(session, task)
 
-			await session.commit()
+			await commit(session)
+			conflict_service.invalidate_directory(task.directory_id)
 			logger.info(f"Task {task_id} updated by user {owner_telegram_id}.")
 			return True
 
@@ -438,35 +538,72 @@ async def update_task(
 		logger.error(f"Unexpected error while updating task {task_id}: {e}", exc_info=True)
 		return False
 
-async def get_task_by_id(owner_telegram_id: int, task_id: int) -> Task | None:
+async def set_task_recurrence(owner_telegram_id: int, task_id: int, recurrence: JobTrigger | None, user_id: int | None = None) -> bool:
+	"""
+	Задаёт или снимает правило повторения задачи. Вхождения не сохраняются, а вычисляются
+	по правилу при показе (см. dtimebot.scheduling.recurrence); напоминания переносятся на ближайшее вхождение.
+	:param owner_telegram_id: Telegram ID пользователя (владельца задачи или участника директории).
+	:param task_id: ID задачи.
+	:param recurrence: IntervalTrigger или CronTrigger; None — сделать задачу разовой.
+	:param user_id: Внутренний ID пользователя, если уже известен.
+	:return: True, если успешно, иначе False (в том числе у задачи нет времени начала).
+	"""
+	if recurrence is not None and not recurrence_rules.is_supported(recurrence):
+		logger.warning(f"Unsupported recurrence rule {recurrence.type!r} for task {task_id}.")
+		return False
+	try:
+		async with get_session() as session:
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
+
+			if user_id is None:
+				logger.warning(f"User with telegram_id={owner_telegram_id} not found.")
+				return False
+
+			stmt_task = select(Task).where(Task.id == task_id)
+			result_task = await session.execute(stmt_task)
+			task = result_task.scalar_one_or_none()
+			if task is not None and not await access_service.can_access_task(session, user_id, task, access_service.EDIT):
+				task = None
+
+			if not task:
+				logger.warning(f"Task with ID={task_id} not found or user {owner_telegram_id} does not have access to it.")
+				return False
+			if recurrence is not None and task.time_start is None:
+				logger.warning(f"Task {task_id} has no start time, recurrence cannot be set.")
+				return False
+
+			task.recurrence = recurrence
+			await reminders.sync_task(session, task)
+			await commit(session)
+			conflict_service.invalidate_directory(task.directory_id)
+			logger.info(f"Task {task_id} recurrence set to {recurrence.type if recurrence else None} by user {owner_telegram_id}.")
+			return True
+
+	except SQLAlchemyError as e:
+		logger.error(f"SQLAlchemy error while setting recurrence of task {task_id}: {e}", exc_info=True)
+		return False
+
+async def get_task_by_id(owner_telegram_id: int, task_id: int, user_id: int | None = None) -> Task | None:
 	"""
 	Получает задачу по ID с проверкой прав доступа.
 	:param owner_telegram_id: Telegram ID пользователя (владельца задачи или участника директории).
 	:param task_id: ID задачи.
+	:param user_id: Внутренний ID пользователя, если уже известен.
 	:return: Объект Task или None.
 	"""
 	try:
 		async with get_session() as session:
-			# Найти пользователя
-			stmt_user = select(User).where(User.telegram_id == owner_telegram_id)
-			result_user = await session.execute(stmt_user)
-			user = result_user.scalar_one_or_none()
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
 
-			if not user:
+			if user_id is None:
 				return None
 
-			# Найти задачу с проверкой прав доступа (владелец задачи или участник директории)
-			from dtimebot.models.members import Member
-			stmt_task = (
-				select(Task)
-				.outerjoin(Member, (Member.directory_id == Task.directory_id) & (Member.user_id == user.id) & (Member.is_active == True))
-				.where(
-					(Task.id == task_id) & 
-					((Task.owner_id == user.id) | (Member.user_id == user.id))
-				)
-			)
+			# Найти задачу с проверкой прав доступа (см. access_service)
+			stmt_task = select(Task).where(Task.id == task_id)
 			result_task = await session.execute(stmt_task)
 			task = result_task.scalar_one_or_none()
+			if task is not None and not await access_service.can_access_task(session, user_id, task, access_service.VIEW):
+				task = None
 
 			return task
 
@@ -475,4 +612,43 @@ async def get_task_by_id(owner_telegram_id: int, task_id: int) -> Task | None:
 		return None
 	except Exception as e:
 		logger.error(f"Unexpected error while getting task {task_id}: {e}", exc_info=True)
-		return None
\ No newline at end of file
+		return None
+
+async def get_tags_for_tasks(owner_telegram_id: int, task_ids: list[int], user_id: int | None = None) -> dict[int, list[str]]:
+	"""
+	Получает теги сразу для нескольких задач одним запросом.
+	Задачи, к которым у пользователя нет доступа, в результат не попадают.
+	:param owner_telegram_id: Telegram ID пользователя (владельца задачи или участника директории).
+	:param task_ids: Список ID задач.
+	:param user_id: Внутренний ID пользователя, если уже известен.
+	:return: Словарь {task_id: [теги]}.
+	"""
+	if not task_ids:
+		return {}
+	try:
+		async with get_session() as session:
+			user_id = await resolve_user_id(session, owner_telegram_id, user_id)
+
+			if user_id is None:
+				logger.warning(f"User with telegram_id={owner_telegram_id} not found.")
+				return {}
+
+			directories = await membership_service.get_user_directories(session, user_id)
+			stmt_tags = (
+				select(TaskTag.task_id, TaskTag.tag)
+				.join(Task, Task.id == TaskTag.task_id)
+				.where(TaskTag.task_id.in_(task_ids), _task_visible_to(user_id, directories))
+				.distinct()
+			)
+			result_tags = await session.execute(stmt_tags)
+			tags: dict[int, list[str]] = {}
+			for task_id, tag in result_tags.all():
+				tags.setdefault(task_id, []).append(tag)
+			return tags
+
+	except SQLAlchemyError as e:
+		logger.error(f"SQLAlchemy error while retrieving tags for tasks {task_ids}: {e}", exc_info=True)
+		return {}
+	except Exception as e:
+		logger.error(f"Unexpected error while retrieving tags for tasks {task_ids}: {e}", exc_info=True)
+		return {}
@@ -1,16 +1,41 @@
-from sqlalchemy import select
+from sqlalchemy import literal, select, text, true, union, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from dtimebot.database import get_session
+from dtimebot.database import commit, get_session, insert_ignore, supports_upsert, upsert
+from dtimebot.models.directories import Directory
+from dtimebot.models.members import Member
 from dtimebot.models.users import User
 from dtimebot.logs import main_logger
-from dtimebot.services.directory_service import create_directory
 
 logger = main_logger.getChild('user_service')
 
+async def resolve_user_id(session: AsyncSession, telegram_id: int, user_id: int | None = None) -> int | None:
+    """
+    Вернуть внутренний id пользователя по telegram_id.
+    Если user_id уже известен (например, получен из UserMiddleware) — запрос к БД не выполняется.
+    """
+    if user_id is not None:
+        return user_id
+    res = await session.execute(select(User.id).where(User.telegram_id == telegram_id))
+    return res.scalar_one_or_none()
+
+def user_directory_ids(user_id: int):
+    """
+    Подзапрос ID директорий пользователя: своих и тех, где он активный участник.
+    """
+    return union(
+        select(Directory.id).where(Directory.owner_id == user_id),
+        select(Member.directory_id).where(Member.user_id == user_id, Member.is_active == True)
+    )
+
 async def get_or_create_user(tg_user) -> User | None:
     """
     tg_user — объект aiogram.from_user (или подобный), должен иметь id, first_name, username и т.д.
+    Для уже зарегистрированного пользователя — один SELECT. Иначе регистрация (пользователь,
+    личная директория и членство владельца в ней) выполняется в одной транзакции через
+    INSERT ... ON CONFLICT (на диалектах без него — см. _register_user_portable()), поэтому
+    параллельные /start не создают дублей.
     """
     try:
         async with get_session() as session:
@@ -20,21 +45,102 @@ async def get_or_create_user(tg_user) -> User | None:
             if user:
                 return user
 
-            user = User(
-                telegram_id=tg_user.id,
-                first_name=getattr(tg_user, 'first_name', None),
-                username=getattr(tg_user, 'username', None)
-            )
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
-
-            logger.info("Creating a new user with telegram_id=%s", tg_user.id)
-
-            # Создаём личную директорию (self) для пользователя
-            await create_directory(telegram_id=tg_user.id, name='Моя директория', description='Личная директория', owner_user=user, is_self=True)
+            user = await _register_user(session, tg_user)
+            await commit(session)
 
+            logger.info("Registered user with telegram_id=%s", tg_user.id)
             return user
     except SQLAlchemyError as e:
         logger.exception("Error creating/getting user %s: %s", getattr(tg_user, 'id', 'unknown'), e)
-        return None
\ No newline at end of file
+        return None
+
+async def set_user_timezone(telegram_id: int, timezone: str | None, user_id: int | None = None) -> bool:
+    """
+    Сохраняет часовой пояс пользователя.
+    :param timezone: Имя IANA, проверенное timezones.parse_zone_name(); None — часовой пояс планировщика.
+    """
+    try:
+        async with get_session() as session:
+            stmt = update(User).values(timezone=timezone)
+            stmt = stmt.where(User.id == user_id) if user_id is not None else stmt.where(User.telegram_id == telegram_id)
+            res = await session.execute(stmt)
+            await commit(session)
+            return res.rowcount > 0
+    except SQLAlchemyError as e:
+        logger.exception("Error while setting timezone of user %s: %s", telegram_id, e)
+        return False
+
+async def _register_user(session: AsyncSession, tg_user) -> User:
+    """
+    Идемпотентно создаёт пользователя, его личную директорию и запись Member владельца.
+    Если параллельная регистрация уже вставила строку, ON CONFLICT пропускает вставку.
+    """
+    if not supports_upsert(session):
+        return await _register_user_portable(session, tg_user)
+
+    stmt = upsert(session, User).values(
+        telegram_id=tg_user.id,
+        first_name=getattr(tg_user, 'first_name', None),
+        username=getattr(tg_user, 'username', None)
+    )
+    # DO UPDATE без изменений, чтобы RETURNING вернул строку и при конфликте
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={'telegram_id': stmt.excluded.telegram_id}
+    ).returning(User)
+    res = await session.scalars(stmt, execution_options={'populate_existing': True})
+    user = res.one()
+
+    await session.execute(
+        upsert(session, Directory).values(
+            owner_id=user.id,
+            name='Моя директория',
+            description='Личная директория',
+            is_self=True
+        ).on_conflict_do_nothing(index_elements=[Directory.owner_id], index_where=text('is_self'))
+    )
+
+    self_directory = select(Directory.id, literal(user.id), true()).where(
+        Directory.owner_id == user.id,
+        Directory.is_self == True
+    )
+    await session.execute(
+        upsert(session, Member).from_select(['directory_id', 'user_id', 'is_active'], self_directory)
+        .on_conflict_do_nothing(index_elements=[Member.directory_id, Member.user_id], index_where=text('is_active'))
+    )
+    return user
+
+async def _register_user_portable(session: AsyncSession, tg_user) -> User:
+    """
+    _register_user() для диалектов без INSERT ... ON CONFLICT: для каждой строки SELECT, при её отсутствии
+    INSERT, а если его опередила параллельная регистрация (IntegrityError) — повторный SELECT.
+    Без частичных уникальных индексов (их нет вне PostgreSQL и SQLite) параллельные регистрации одного
+    пользователя могут создать лишнюю личную директорию; пользователь при этом один (unique telegram_id).
+    """
+    user_query = select(User).where(User.telegram_id == tg_user.id).execution_options(populate_existing=True)
+    user = (await session.execute(user_query)).scalar_one_or_none()
+    if user is None:
+        await insert_ignore(session, User, {
+            'telegram_id': tg_user.id,
+            'first_name': getattr(tg_user, 'first_name', None),
+            'username': getattr(tg_user, 'username', None),
+        })
+        user = (await session.execute(user_query)).scalar_one()
+
+    directory_query = select(Directory.id).where(Directory.owner_id == user.id, Directory.is_self == True).order_by(Directory.id)
+    directory_id = (await session.execute(directory_query)).scalars().first()
+    if directory_id is None:
+        await insert_ignore(session, Directory, {
+            'owner_id': user.id,
+            'name': 'Моя директория',
+            'description': 'Личная директория',
+            'is_self': True,
+        })
+        directory_id = (await session.execute(directory_query)).scalars().first()
+
+    res = await session.execute(
+        select(Member.id).where(Member.directory_id == directory_id, Member.user_id == user.id, Member.is_active == True)
+    )
+    if res.first() is None:
+        await insert_ignore(session, Member, {'directory_id': directory_id, 'user_id': user.id, 'is_active': True})
+    return user